@@ -0,0 +1,87 @@
+"""
+Latency benchmark for the global content index at catalog scale.
+
+Builds a throwaway in-memory Chroma collection with synthetic unit vectors
+(no model, no network), added book by book the way embedding does, then
+times top-k queries plus per-book grouping.
+
+    python bench_global_search.py                      # 1k, 10k and 100k books
+    python bench_global_search.py --books 1000 --chunks-per-book 20
+"""
+import time
+import json
+import argparse
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+DIM = 384
+ADD_BATCH_SIZE = 5000
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q))
+
+
+def bench(n_books: int, chunks_per_book: int, n_queries: int, n_results: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    client = chromadb.Client(Settings(is_persistent=False, allow_reset=True))
+    client.reset()
+    collection = client.create_collection(name="bench_global_chunks")
+
+    started = time.perf_counter()
+    pending_ids, pending_vectors, pending_meta = [], [], []
+    for book in range(n_books):
+        vectors = rng.standard_normal((chunks_per_book, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        pending_ids.extend(f"book{book}_{i}" for i in range(chunks_per_book))
+        pending_vectors.append(vectors)
+        pending_meta.extend({"book_id": f"book{book}"} for _ in range(chunks_per_book))
+        if len(pending_ids) >= ADD_BATCH_SIZE or book == n_books - 1:
+            collection.add(ids=pending_ids, embeddings=np.vstack(pending_vectors), metadatas=pending_meta)
+            pending_ids, pending_vectors, pending_meta = [], [], []
+    build_seconds = time.perf_counter() - started
+
+    queries = rng.standard_normal((n_queries, DIM)).astype(np.float32)
+    latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        results = collection.query(query_embeddings=[query], n_results=n_results, include=["metadatas", "distances"])
+        books = {}
+        for metadata, distance in zip(results["metadatas"][0], results["distances"][0]):
+            books.setdefault(metadata["book_id"], distance)
+        latencies.append(1000 * (time.perf_counter() - t0))
+
+    client.reset()
+    return {
+        "books": n_books,
+        "chunks": n_books * chunks_per_book,
+        "build_seconds": round(build_seconds, 2),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Global index latency benchmark")
+    parser.add_argument("--books", type=int, action="append", help="Catalog size (repeatable)")
+    parser.add_argument("--chunks-per-book", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-results", type=int, default=60)
+    parser.add_argument("--json", help="Also write results to this path")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'books':>8} {'chunks':>10} {'build s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for n_books in args.books or [1_000, 10_000, 100_000]:
+        row = bench(n_books, args.chunks_per_book, args.queries, args.n_results)
+        rows.append(row)
+        print(f"{row['books']:>8} {row['chunks']:>10} {row['build_seconds']:>9} {row['p50_ms']:>8} {row['p99_ms']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Offline retrieval quality-vs-latency benchmark over the sample books in data/.
+
+Generates a question/answer-span set from each book's summary.json (or loads
+one with --questions), then sweeps retrieval configurations and reports
+recall@k, MRR and p50/p99 search latency:
+
+    chunk size       how embed_book_content slices content (default 250, 500, 1000)
+    index            exact NumPy search or Chroma's HNSW index
+    quantisation     float32, float16 or int8 vectors (exact search only)
+    hybrid           dense ranking alone, or fused with BM25 by reciprocal rank fusion
+
+A question's relevant chunks are the ones overlapping its answer span.
+Nothing touches the network: the SentenceTransformer is loaded from the local
+cache only, and if it is not there a hashing encoder is used instead.
+
+    python bench_retrieval.py
+    python bench_retrieval.py --chunk-size 500 --k 3 --json results.json
+    python bench_retrieval.py --encoder hashing --scope global
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+HASHING_DIM = 384
+RRF_K = 60
+STOPWORDS = set("""
+a an and are as at be been but by for from had has have he her his in into is it its of on or that the their
+them they this to was were which who with would not also after before than then there these those when where
+while what will can could one two its our out over such only other more most some any all about up
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def load_books(data_dir: str = DATA_DIR) -> dict[str, str]:
+    """Book ID -> summary content, skipping books whose content duplicates another's."""
+    books, seen = {}, {}
+    for book_id in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, book_id, "summary.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            content = json.load(f).get("content") or ""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if not content:
+            continue
+        if digest in seen:
+            print(f"Skipping {book_id}: same content as {seen[digest]}")
+            continue
+        seen[digest] = book_id
+        books[book_id] = content
+    return books
+
+
+def generate_questions(books: dict[str, str], per_book: int = 10, seed: int = 0) -> list[dict]:
+    """Keyword-style questions, each paired with the sentence it was drawn from as the answer span.
+
+    A random ~60% of each sentence's content words are kept, so questions do not
+    repeat their answer verbatim.
+    """
+    rng = np.random.default_rng(seed)
+    questions = []
+    for book_id, content in books.items():
+        sentences = [
+            m for m in re.finditer(r"[^.!?\n]+[.!?]", content)
+            if 80 <= len(m.group().strip()) <= 400 and len(m.group().split()) >= 8
+        ]
+        picks = rng.choice(len(sentences), size=min(per_book, len(sentences)), replace=False) if sentences else []
+        for index in sorted(picks):
+            match = sentences[index]
+            answer = match.group().strip()
+            words = [w for w in re.findall(r"[A-Za-z0-9'-]+", answer) if w.lower() not in STOPWORDS and len(w) > 2]
+            keep = sorted(rng.choice(len(words), size=max(3, int(len(words) * 0.6)), replace=False))
+            questions.append({
+                "book_id": book_id,
+                "question": " ".join(words[i] for i in keep),
+                "answer": answer,
+                "answer_start": match.start() + (len(match.group()) - len(match.group().lstrip()))
+            })
+    return questions
+
+
+class HashingEncoder:
+    """Offline stand-in for the SentenceTransformer: L2-normalised hashed unigram+bigram counts."""
+
+    name = "hashing"
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = [t for t in tokenize(text) if t not in STOPWORDS]
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                digest = hashlib.md5(feature.encode("utf-8")).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vectors
+
+
+class SentenceEncoder:
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, local_files_only=True)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=64), dtype=np.float32)
+
+
+def load_encoder(choice: str, model_name: str):
+    if choice in ("auto", "model"):
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        try:
+            return SentenceEncoder(model_name)
+        except Exception as e:
+            if choice == "model":
+                raise
+            print(f"Model {model_name} not available offline ({type(e).__name__}); using the hashing encoder")
+    return HashingEncoder()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def chunk_content(content: str, chunk_size: int) -> list[tuple[int, str]]:
+    # Same slicing as embed_book_content
+    return [(i, content[i:i + chunk_size]) for i in range(0, len(content), chunk_size)]
+
+
+class BM25:
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.docs = [Counter(tokenize(d)) for d in documents]
+        self.lengths = np.array([sum(d.values()) for d in self.docs], dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(self.docs) else 0.0
+        df = Counter(term for d in self.docs for term in d)
+        n = len(self.docs)
+        self.idf = {term: np.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            tf = np.array([d.get(term, 0) for d in self.docs], dtype=np.float32)
+            scores += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class ExactIndex:
+    """Brute-force inner product over normalised vectors, optionally quantised."""
+
+    def __init__(self, vectors: np.ndarray, quantisation: str = "float32"):
+        self.quantisation = quantisation
+        if quantisation == "float16":
+            self.vectors = vectors.astype(np.float16)
+        elif quantisation == "int8":
+            self.scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            self.vectors = np.round(vectors / self.scales[:, None]).astype(np.int8)
+        else:
+            self.vectors = vectors
+
+    def memory_bytes(self) -> int:
+        return self.vectors.nbytes + (self.scales.nbytes if self.quantisation == "int8" else 0)
+
+    def search(self, query: np.ndarray, n: int) -> list[int]:
+        if self.quantisation == "int8":
+            scores = (self.vectors.astype(np.float32) @ query) * self.scales
+        else:
+            scores = self.vectors @ query.astype(self.vectors.dtype)
+        n = min(n, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+class HnswIndex:
+    """Chroma's HNSW index, the one the chat service queries."""
+
+    def __init__(self, client, name: str, vectors: np.ndarray):
+        self.collection = client.create_collection(name=name)
+        ids = [str(i) for i in range(len(vectors))]
+        for start in range(0, len(ids), 5000):
+            self.collection.add(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000])
+        self.size = len(ids)
+
+    def memory_bytes(self) -> int:
+        return 0
+
+    def search(self, query: np.ndarray, n: int) -> list[int]:
+        results = self.collection.query(query_embeddings=[query], n_results=min(n, self.size), include=[])
+        return [int(i) for i in results["ids"][0]]
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], n: int) -> list[int]:
+    fused = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)[:n]
+
+
+def build_corpora(books: dict[str, str], chunk_size: int, encoder, scope: str) -> dict:
+    """Per-book corpora (scope=book) or one corpus over every book (scope=global)."""
+    corpora = {}
+    for book_id, content in books.items():
+        key = book_id if scope == "book" else "*"
+        corpus = corpora.setdefault(key, {"labels": [], "texts": []})
+        for start, text in chunk_content(content, chunk_size):
+            corpus["labels"].append((book_id, start, start + len(text)))
+            corpus["texts"].append(text)
+    for corpus in corpora.values():
+        corpus["vectors"] = normalize(encoder.encode(corpus["texts"]))
+        corpus["bm25"] = BM25(corpus["texts"])
+    return corpora
+
+
+def relevant_positions(corpus: dict, question: dict) -> set[int]:
+    start = question["answer_start"]
+    end = start + len(question["answer"])
+    relevant = set()
+    for position, (book_id, chunk_start, chunk_end) in enumerate(corpus["labels"]):
+        overlap = min(end, chunk_end) - max(start, chunk_start)
+        # Count a chunk if it holds at least a third of the answer (or is mostly answer)
+        if book_id == question["book_id"] and overlap > 0 and overlap >= min(end - start, chunk_end - chunk_start) / 3:
+            relevant.add(position)
+    return relevant
+
+
+def evaluate(questions, query_vectors, corpora, indexes, scope, hybrid, ks) -> dict:
+    max_k = max(ks)
+    recalls = {k: [] for k in ks}
+    reciprocal_ranks, latencies = [], []
+    for question, query_vector in zip(questions, query_vectors):
+        corpus_key = question["book_id"] if scope == "book" else "*"
+        corpus, index = corpora[corpus_key], indexes[corpus_key]
+        relevant = relevant_positions(corpus, question)
+        if not relevant:
+            continue
+
+        started = time.perf_counter()
+        if hybrid:
+            candidates = index.search(query_vector, max(max_k * 4, 20))
+            lexical = corpus["bm25"].scores(question["question"])
+            lexical_top = np.argsort(-lexical)[:max(max_k * 4, 20)].tolist()
+            ranking = reciprocal_rank_fusion([candidates, lexical_top], max_k)
+        else:
+            ranking = index.search(query_vector, max_k)
+        latencies.append(1000 * (time.perf_counter() - started))
+
+        for k in ks:
+            recalls[k].append(len(relevant & set(ranking[:k])) / len(relevant))
+        first = next((rank for rank, doc in enumerate(ranking) if doc in relevant), None)
+        reciprocal_ranks.append(0.0 if first is None else 1.0 / (first + 1))
+
+    return {
+        "questions": len(latencies),
+        **{f"recall@{k}": round(float(np.mean(recalls[k])), 4) for k in ks},
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+
+def run(books, questions, encoder, chunk_sizes, ks, indexes_to_run, quantisations, hybrid_modes, scope) -> list[dict]:
+    query_vectors = normalize(encoder.encode([q["question"] for q in questions]))
+    client = chromadb.Client(Settings(is_persistent=False, allow_reset=True))
+    rows = []
+    for chunk_size in chunk_sizes:
+        corpora = build_corpora(books, chunk_size, encoder, scope)
+        chunks = sum(len(c["texts"]) for c in corpora.values())
+        configs = []
+        if "exact" in indexes_to_run:
+            configs += [("exact", q) for q in quantisations]
+        if "hnsw" in indexes_to_run:
+            configs.append(("hnsw", "float32"))
+
+        for index_kind, quantisation in configs:
+            client.reset()
+            started = time.perf_counter()
+            if index_kind == "exact":
+                indexes = {key: ExactIndex(c["vectors"], quantisation) for key, c in corpora.items()}
+            else:
+                indexes = {
+                    key: HnswIndex(client, f"bench_{n}", c["vectors"])
+                    for n, (key, c) in enumerate(corpora.items())
+                }
+            build_seconds = time.perf_counter() - started
+            for hybrid in hybrid_modes:
+                row = {
+                    "chunk_size": chunk_size,
+                    "chunks": chunks,
+                    "index": index_kind,
+                    "quantisation": quantisation,
+                    "hybrid": hybrid,
+                    "build_seconds": round(build_seconds, 3),
+                    "index_bytes": sum(i.memory_bytes() for i in indexes.values()) or None,
+                    **evaluate(questions, query_vectors, corpora, indexes, scope, hybrid, ks)
+                }
+                rows.append(row)
+                print_row(row, ks)
+    client.reset()
+    return rows
+
+
+def print_header(ks) -> None:
+    recall_cols = " ".join(f"{'R@' + str(k):>6}" for k in ks)
+    print(f"{'chunk':>6} {'index':>6} {'quant':>8} {'hybrid':>6} {recall_cols} {'MRR':>6} {'p50 ms':>8} {'p99 ms':>8}")
+
+
+def print_row(row: dict, ks) -> None:
+    recall_cols = " ".join(f"{row[f'recall@{k}']:>6.3f}" for k in ks)
+    print(f"{row['chunk_size']:>6} {row['index']:>6} {row['quantisation']:>8} {str(row['hybrid']):>6} "
+          f"{recall_cols} {row['mrr']:>6.3f} {row['p50_ms']:>8} {row['p99_ms']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval quality-vs-latency benchmark")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--questions", help="JSON list of {book_id, question, answer, answer_start}; generated if omitted")
+    parser.add_argument("--save-questions", help="Write the generated question set to this path")
+    parser.add_argument("--per-book", type=int, default=10, help="Generated questions per book")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--encoder", choices=["auto", "model", "hashing"], default="auto")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--scope", choices=["book", "global"], default="book",
+                        help="Search each question's own book (like /chat/query) or every book (like /search-content)")
+    parser.add_argument("--chunk-size", type=int, action="append", help="Repeatable; default 250, 500, 1000")
+    parser.add_argument("--k", type=int, action="append", help="Repeatable; default 1, 3, 5, 10")
+    parser.add_argument("--index", choices=["exact", "hnsw"], action="append")
+    parser.add_argument("--quantisation", choices=["float32", "float16", "int8"], action="append")
+    parser.add_argument("--hybrid", choices=["off", "on"], action="append")
+    parser.add_argument("--json", help="Also write results to this path")
+    args = parser.parse_args()
+
+    books = load_books(args.data_dir)
+    if args.questions:
+        with open(args.questions, "r") as f:
+            questions = [q for q in json.load(f) if q["book_id"] in books]
+    else:
+        questions = generate_questions(books, args.per_book, args.seed)
+        if args.save_questions:
+            with open(args.save_questions, "w") as f:
+                json.dump(questions, f, indent=2)
+
+    encoder = load_encoder(args.encoder, args.model)
+    ks = sorted(set(args.k or [1, 3, 5, 10]))
+    print(f"{len(books)} books, {len(questions)} questions, encoder {encoder.name}, scope {args.scope}")
+    print_header(ks)
+    rows = run(
+        books,
+        questions,
+        encoder,
+        args.chunk_size or [250, 500, 1000],
+        ks,
+        args.index or ["exact", "hnsw"],
+        args.quantisation or ["float32", "float16", "int8"],
+        [mode == "on" for mode in (args.hybrid or ["off", "on"])],
+        args.scope
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "encoder": encoder.name,
+                "scope": args.scope,
+                "books": len(books),
+                "questions": len(questions),
+                "results": rows
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Bounded LRU cache of Chroma collection handles.
+
+Every book queried used to stay resident for the life of the worker. The cache
+keeps at most `max_entries` handles and, when `max_bytes` is non-zero, at most that
+many estimated index bytes; the least recently used unpinned collection is
+dropped first. The same byte budget is handed to Chroma's own segment LRU
+(see embedder.py) so evicted indexes are actually released.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+# Chroma's default HNSW max_neighbors; each node keeps ~2*M int32 links on layer 0
+HNSW_M = 16
+DEFAULT_DIM = 384
+
+
+def estimate_collection_bytes(collection) -> int:
+    """Rough resident size of a collection's HNSW index: vectors plus neighbour links."""
+    dim = (collection.metadata or {}).get("embedding_dim", DEFAULT_DIM)
+    return collection.count() * (dim * 4 + HNSW_M * 2 * 4 + 16)
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size on Linux, None elsewhere."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class CollectionCache:
+    def __init__(
+        self,
+        loader: Callable,
+        max_entries: int = 64,
+        max_bytes: int = 0,
+        pinned_books: Iterable[str] = ()
+    ):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.pinned_books = set(pinned_books)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_pinned(self, name: str) -> bool:
+        # Pins are by book ID so they survive a switch to a new model version
+        return name.split("__", 1)[0] in self.pinned_books
+
+    def get(self, name: str):
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return self._entries[name][0]
+            self.misses += 1
+
+        collection = self.loader(name)
+        self.put(name, collection)
+        return collection
+
+    def put(self, name: str, collection) -> None:
+        size = estimate_collection_bytes(collection)
+        with self._lock:
+            self._entries[name] = (collection, size)
+            self._entries.move_to_end(name)
+            self._evict()
+
+    def _evict(self) -> None:
+        def over_budget():
+            if self.max_entries and len(self._entries) > self.max_entries:
+                return True
+            return bool(self.max_bytes) and sum(size for _, size in self._entries.values()) > self.max_bytes
+
+        for name in list(self._entries):
+            if not over_budget():
+                break
+            if self.is_pinned(name):
+                continue
+            del self._entries[name]
+            self.evictions += 1
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def pin(self, book_id: str) -> None:
+        self.pinned_books.add(book_id)
+
+    def unpin(self, book_id: str) -> None:
+        self.pinned_books.discard(book_id)
+        with self._lock:
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = sum(size for _, size in self._entries.values())
+            entries = len(self._entries)
+            pinned = sum(1 for name in self._entries if self.is_pinned(name))
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "pinned_entries": pinned,
+            "pinned_books": sorted(self.pinned_books),
+            "estimated_resident_bytes": resident,
+            "process_rss_bytes": process_rss_bytes(),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions
+        }
@@ -1,19 +1,185 @@
 import os
+import re
 import json
-from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
+from embedding_function import (
+    DEFAULT_EMBEDDING_MODEL,
+    GLOBAL_INDEX_NAME,
+    get_model,
+    get_embedding_function,
+    collection_model_name,
+    check_query_compatible,
+)
+from collection_cache import CollectionCache
+from embedding_cache import encode_cached
 
 # Ensure vectorstore directory exists
 VECTORSTORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vectorstore")
 os.makedirs(VECTORSTORE_DIR, exist_ok=True)
 
+# Bounds on resident collections for long-running workers (COLLECTION_CACHE_MAX_BYTES=0 = unlimited bytes)
+COLLECTION_CACHE_MAX_ENTRIES = int(os.getenv("COLLECTION_CACHE_MAX_ENTRIES", "64"))
+COLLECTION_CACHE_MAX_BYTES = int(os.getenv("COLLECTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+COLLECTION_CACHE_PINNED = [b for b in os.getenv("COLLECTION_CACHE_PINNED", "").split(",") if b]
+
 # Set persistent storage with absolute path
+cache_settings = {}
+if COLLECTION_CACHE_MAX_BYTES:
+    # Let Chroma release evicted segment indexes under the same budget
+    cache_settings = {
+        "chroma_segment_cache_policy": "LRU",
+        "chroma_memory_limit_bytes": COLLECTION_CACHE_MAX_BYTES
+    }
 chroma_client = chromadb.Client(Settings(
     persist_directory=VECTORSTORE_DIR,
-    is_persistent=True
+    is_persistent=True,
+    **cache_settings
 ))
-model = SentenceTransformer("all-MiniLM-L6-v2")
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+ALIASES_PATH = os.path.join(VECTORSTORE_DIR, "aliases.json")
+CHUNK_SIZE = 500
+
+model = get_model(EMBEDDING_MODEL_NAME)
+EMBEDDING_DIM = model.get_sentence_embedding_dimension()
+
+_aliases = {"mtime": None, "map": {}}
+
+
+def model_metadata(model_name: str = EMBEDDING_MODEL_NAME) -> dict:
+    """Collection metadata recording which model produced its vectors."""
+    return {
+        "embedding_model": model_name,
+        "embedding_dim": get_model(model_name).get_sentence_embedding_dimension()
+    }
+
+
+def collection_name_for(book_id: str, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    """Versioned collection name; the default model keeps the bare book ID."""
+    if model_name == DEFAULT_EMBEDDING_MODEL:
+        return book_id
+    slug = re.sub(r"[^a-zA-Z0-9._-]+", "-", model_name.split("/")[-1]).strip("-._")
+    return f"{book_id}__{slug}"
+
+
+def load_aliases() -> dict:
+    """Book ID -> live collection name, re-read whenever aliases.json changes."""
+    try:
+        mtime = os.path.getmtime(ALIASES_PATH)
+    except OSError:
+        return {}
+    if mtime != _aliases["mtime"]:
+        with open(ALIASES_PATH, "r") as f:
+            _aliases["map"] = json.load(f)
+        _aliases["mtime"] = mtime
+    return _aliases["map"]
+
+
+def set_alias(book_id: str, collection_name: str) -> None:
+    """Point a book at a collection. The file is swapped in with os.replace, so readers never see a partial write."""
+    aliases = dict(load_aliases())
+    aliases[book_id] = collection_name
+    tmp_path = f"{ALIASES_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(aliases, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, ALIASES_PATH)
+
+
+def resolve_collection_name(book_id: str) -> str:
+    return load_aliases().get(book_id, book_id)
+
+
+def load_collection(name: str):
+    """Open a collection bound to the shared encoder for its model."""
+    collection = chroma_client.get_collection(name=name)
+    try:
+        return chroma_client.get_collection(
+            name=name,
+            embedding_function=get_embedding_function(collection_model_name(collection))
+        )
+    except ValueError:
+        # Created with Chroma's default function; `maintenance.py compact` rebinds it
+        print(f"Warning: collection {name} is not bound to the shared encoder; run maintenance.py compact")
+        return collection
+
+
+collection_cache = CollectionCache(
+    load_collection,
+    max_entries=COLLECTION_CACHE_MAX_ENTRIES,
+    max_bytes=COLLECTION_CACHE_MAX_BYTES,
+    pinned_books=COLLECTION_CACHE_PINNED
+)
+
+
+def get_book_collection(book_id: str):
+    """The collection queries for this book should read from."""
+    return collection_cache.get(resolve_collection_name(book_id))
+
+
+def drop_collection(name: str) -> None:
+    """Delete a collection and forget any cached handle to it."""
+    collection_cache.invalidate(name)
+    chroma_client.delete_collection(name=name)
+
+
+def query_collection(collection, question: str, n_results: int = 3) -> dict:
+    """Encode with the collection's own model and query by vector, so Chroma never embeds on its own."""
+    model_name = collection_model_name(collection)
+    query_embeddings = get_model(model_name).encode([question]).tolist()
+    check_query_compatible(collection, query_embeddings)
+    return collection.query(query_embeddings=query_embeddings, n_results=n_results)
+
+
+def get_or_create_book_collection(book_id: str):
+    """Collection that new vectors for this book are written to.
+
+    A book that already has an alias (e.g. switched over by a re-embed job) keeps its live
+    collection, whatever model that is; only a book without one gets a collection stamped
+    with the current model.
+    """
+    live_name = load_aliases().get(book_id)
+    if live_name:
+        try:
+            return collection_cache.get(live_name)
+        except Exception:
+            print(f"Warning: alias for {book_id} points at missing collection {live_name}; recreating")
+    collection_name = collection_name_for(book_id)
+    try:
+        collection = chroma_client.get_or_create_collection(
+            name=collection_name,
+            metadata=model_metadata(),
+            embedding_function=get_embedding_function(EMBEDDING_MODEL_NAME)
+        )
+    except ValueError:
+        # A legacy collection persisted with another embedding function; vectors are always
+        # passed in explicitly, so it is still usable as is
+        collection = load_collection(collection_name)
+    if collection_name != book_id or live_name:
+        set_alias(book_id, collection_name)
+    collection_cache.put(collection_name, collection)
+    return collection
+
+
+def get_global_collection(model_name: str = EMBEDDING_MODEL_NAME):
+    """The catalog-wide index for one model version."""
+    return chroma_client.get_or_create_collection(
+        name=collection_name_for(GLOBAL_INDEX_NAME, model_name),
+        metadata=model_metadata(model_name),
+        embedding_function=get_embedding_function(model_name)
+    )
+
+
+def add_to_global_index(book_id: str, ids: list, documents: list, embeddings: list, metadatas: list,
+                        model_name: str = EMBEDDING_MODEL_NAME) -> None:
+    """Mirror a book's freshly embedded chunks into the global index, tagged with the book ID."""
+    get_global_collection(model_name).upsert(
+        ids=ids,
+        documents=documents,
+        embeddings=embeddings,
+        metadatas=[{**(m or {}), "book_id": book_id} for m in metadatas]
+    )
+
 
 def embed_book_content(book_id):
     path = f"data/{book_id}/summary.json"
@@ -28,17 +194,21 @@ def embed_book_content(book_id):
         raise ValueError("No content found in summary.json")
 
     # Chunking
-    chunks = [content[i:i+500] for i in range(0, len(content), 500)]
-    embeddings = model.encode(chunks).tolist()
-
-    # Store in vector DB
-    collection = chroma_client.get_or_create_collection(name=book_id)
+    chunks = [content[i:i+CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)]
+    # Store in vector DB, encoded with the model the book's live collection is stamped with
+    collection = get_or_create_book_collection(book_id)
+    model_name = collection_model_name(collection)
+    # Identical chunks (e.g. another edition of the same work) come from the cache
+    embeddings = encode_cached(chunks, model_name)
+    ids = [f"{book_id}_{i}" for i in range(len(chunks))]
+    metadatas = [{"source": "wiki"} for _ in chunks]
     collection.add(
         documents=chunks,
         embeddings=embeddings,
-        ids=[f"{book_id}_{i}" for i in range(len(chunks))],
-        metadatas=[{"source": "wiki"} for _ in chunks]
+        ids=ids,
+        metadatas=metadatas
     )
+    add_to_global_index(book_id, ids, chunks, embeddings, metadatas, model_name)
 
     # Persist changes
     try:
@@ -0,0 +1,202 @@
+"""
+Persistent cache of chunk embeddings, shared by every book.
+
+Editions and reprints of one work have different Google Books IDs but resolve
+to the same Wikipedia article, so they produce identical chunks. Vectors are
+stored in vectorstore/embedding_cache.sqlite3 keyed by model name plus the
+SHA-256 of the chunk text; only chunks not already in the cache are encoded.
+
+    python embedding_cache.py report          # hit rate and encode time avoided, per model
+    python embedding_cache.py clear [--model MODEL]
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import numpy as np
+from embedding_function import get_model
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "false"
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vectorstore", "embedding_cache.sqlite3")
+)
+# SQLite's default limit on bound parameters is 999
+LOOKUP_BATCH_SIZE = 500
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        # Counters for this process only; cumulative counters live in the stats table
+        self.session = {"hits": 0, "misses": 0, "encode_seconds": 0.0, "lookup_seconds": 0.0}
+
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, hash))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats ("
+                "model TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0, "
+                "encode_seconds REAL NOT NULL DEFAULT 0, lookup_seconds REAL NOT NULL DEFAULT 0)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, model_name: str, hashes: list[str]) -> dict:
+        found = {}
+        with self._lock:
+            conn = self.conn()
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                rows = conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [model_name, *batch]
+                ).fetchall()
+                found.update((h, np.frombuffer(blob, dtype=np.float32)) for h, blob in rows)
+        return found
+
+    def store(self, model_name: str, vectors: dict, hits: int, misses: int,
+              encode_seconds: float, lookup_seconds: float) -> None:
+        with self._lock:
+            conn = self.conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model_name, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in vectors.items()]
+            )
+            conn.execute(
+                "INSERT INTO stats (model, hits, misses, encode_seconds, lookup_seconds) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(model) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses, "
+                "encode_seconds = encode_seconds + excluded.encode_seconds, "
+                "lookup_seconds = lookup_seconds + excluded.lookup_seconds",
+                (model_name, hits, misses, encode_seconds, lookup_seconds)
+            )
+            conn.commit()
+            self.session["hits"] += hits
+            self.session["misses"] += misses
+            self.session["encode_seconds"] += encode_seconds
+            self.session["lookup_seconds"] += lookup_seconds
+
+    def encode(self, texts: list[str], model_name: str, batch_size: int = 32) -> list[list[float]]:
+        """Embeddings for `texts`, encoding only chunks the cache has not seen for this model."""
+        if not texts:
+            return []
+        hashes = [chunk_hash(text) for text in texts]
+        started = time.perf_counter()
+        vectors = self.lookup(model_name, list(set(hashes)))
+        lookup_seconds = time.perf_counter() - started
+
+        # Duplicate chunks within one call are encoded once
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in vectors:
+                missing.setdefault(h, text)
+
+        encode_seconds = 0.0
+        encoded = {}
+        if missing:
+            started = time.perf_counter()
+            new_vectors = get_model(model_name).encode(list(missing.values()), batch_size=batch_size)
+            encode_seconds = time.perf_counter() - started
+            encoded = dict(zip(missing.keys(), np.asarray(new_vectors, dtype=np.float32)))
+            vectors.update(encoded)
+
+        self.store(model_name, encoded, len(texts) - len(missing), len(missing), encode_seconds, lookup_seconds)
+        return [vectors[h].tolist() for h in hashes]
+
+    def report(self) -> list[dict]:
+        """Cumulative counters per model, across every process that used the cache."""
+        with self._lock:
+            conn = self.conn()
+            counts = dict(conn.execute("SELECT model, COUNT(*) FROM embeddings GROUP BY model").fetchall())
+            stats = conn.execute(
+                "SELECT model, hits, misses, encode_seconds, lookup_seconds FROM stats ORDER BY model"
+            ).fetchall()
+        return [
+            {**summarize(hits, misses, encode_seconds, lookup_seconds), "model": model_name,
+             "cached_vectors": counts.get(model_name, 0)}
+            for model_name, hits, misses, encode_seconds, lookup_seconds in stats
+        ]
+
+    def session_since(self, before: dict, model_name: str) -> dict:
+        """Counters for this process since `before`, a copy of `session` taken earlier."""
+        delta = [self.session[k] - before[k] for k in ("hits", "misses", "encode_seconds", "lookup_seconds")]
+        if not delta[1]:
+            # Nothing was encoded in this window; price the hits at the model's historical rate
+            with self._lock:
+                row = self.conn().execute(
+                    "SELECT encode_seconds, misses FROM stats WHERE model = ?", (model_name,)
+                ).fetchone()
+            return summarize(*delta, per_chunk=row[0] / row[1] if row and row[1] else 0.0)
+        return summarize(*delta)
+
+    def clear(self, model_name: str = None) -> int:
+        with self._lock:
+            conn = self.conn()
+            where, params = ("WHERE model = ?", (model_name,)) if model_name else ("", ())
+            removed = conn.execute(f"DELETE FROM embeddings {where}", params).rowcount
+            conn.execute(f"DELETE FROM stats {where}", params)
+            conn.commit()
+        return removed
+
+
+def summarize(hits: int, misses: int, encode_seconds: float, lookup_seconds: float, per_chunk: float = None) -> dict:
+    if per_chunk is None:
+        per_chunk = encode_seconds / misses if misses else 0.0
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+        "encode_seconds": round(encode_seconds, 2),
+        # What the hits would have cost at the measured per-chunk encode rate, less lookup overhead
+        "encode_seconds_saved": round(hits * per_chunk - lookup_seconds, 2)
+    }
+
+
+embedding_cache = EmbeddingCache()
+
+
+def encode_cached(texts: list[str], model_name: str, batch_size: int = 32) -> list[list[float]]:
+    """Encode through the shared cache, or directly when EMBEDDING_CACHE_ENABLED=false."""
+    if not EMBEDDING_CACHE_ENABLED:
+        return get_model(model_name).encode(texts, batch_size=batch_size).tolist()
+    return embedding_cache.encode(texts, model_name, batch_size=batch_size)
+
+
+def print_report(rows: list[dict]) -> None:
+    print(f"{'model':<28} {'cached':>8} {'hits':>8} {'misses':>8} {'hit rate':>9} {'encode s':>9} {'saved s':>9}")
+    for row in rows:
+        hit_rate = f"{100 * row['hit_rate']:.1f}%" if row["hit_rate"] is not None else "-"
+        print(f"{row['model']:<28} {row['cached_vectors']:>8} {row['hits']:>8} {row['misses']:>8} {hit_rate:>9} "
+              f"{row['encode_seconds']:>9} {row['encode_seconds_saved']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared chunk embedding cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("report", help="Hit rate and encode time avoided, per model")
+    clear_parser = sub.add_parser("clear", help="Drop cached vectors and counters")
+    clear_parser.add_argument("--model", help="Only this model")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        print_report(embedding_cache.report())
+    else:
+        print(f"Removed {embedding_cache.clear(args.model)} cached vectors")
+
+
+if __name__ == "__main__":
+    main()
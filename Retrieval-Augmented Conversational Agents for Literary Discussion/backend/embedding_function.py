@@ -0,0 +1,76 @@
+import threading
+from chromadb import Documents, EmbeddingFunction
+
+try:
+    from chromadb.utils.embedding_functions import register_embedding_function
+except ImportError:  # Chroma releases before embedding function configs
+    def register_embedding_function(cls):
+        return cls
+
+# Collections created before model stamping were all embedded with this model
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Catalog-wide collection holding every book's chunks; not a book itself
+GLOBAL_INDEX_NAME = "global_chunks"
+
+_models = {}
+_models_lock = threading.Lock()
+_embedding_functions = {}
+
+
+class EmbeddingMismatchError(ValueError):
+    """A query vector's dimension differs from that of the collection it targets."""
+
+
+def get_model(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """Return a loaded SentenceTransformer, loading each model at most once per process."""
+    with _models_lock:
+        if model_name not in _models:
+            from sentence_transformers import SentenceTransformer
+            _models[model_name] = SentenceTransformer(model_name)
+        return _models[model_name]
+
+
+@register_embedding_function
+class SharedEncoderEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Chroma embedding function that encodes with the process-wide model from get_model()."""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+
+    def __call__(self, input: Documents):
+        return get_model(self.model_name).encode(list(input)).tolist()
+
+    @staticmethod
+    def name() -> str:
+        return "readingroom_shared_encoder"
+
+    def get_config(self) -> dict:
+        return {"model_name": self.model_name}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "SharedEncoderEmbeddingFunction":
+        return get_embedding_function(config["model_name"])
+
+
+def get_embedding_function(model_name: str = DEFAULT_EMBEDDING_MODEL) -> SharedEncoderEmbeddingFunction:
+    if model_name not in _embedding_functions:
+        _embedding_functions[model_name] = SharedEncoderEmbeddingFunction(model_name)
+    return _embedding_functions[model_name]
+
+
+def collection_model_name(collection) -> str:
+    return (collection.metadata or {}).get("embedding_model", DEFAULT_EMBEDDING_MODEL)
+
+
+def check_query_compatible(collection, query_embeddings: list) -> None:
+    """Refuse query vectors whose dimension differs from the collection's stamped embedding_dim.
+
+    Only the dimension is guarded: callers encode with collection_model_name(collection), so the
+    model always matches by construction. Collections without a stamped dimension are not checked.
+    """
+    expected_dim = (collection.metadata or {}).get("embedding_dim")
+    for embedding in query_embeddings:
+        if expected_dim is not None and len(embedding) != expected_dim:
+            raise EmbeddingMismatchError(
+                f"Collection {collection.name} stores {expected_dim}-d vectors, query has {len(embedding)}"
+            )
@@ -0,0 +1,125 @@
+"""
+Precomputed answer packs for the questions most chats open with.
+
+A pack is built after a book is embedded and stored next to its summary as
+data/<book_id>/faq.json. It records the hash of the summary content it was
+built from; once summary.json (or the embedding model) changes the pack is
+ignored until rebuilt.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+from typing import Any, Dict, Optional
+from embedder import EMBEDDING_MODEL_NAME, get_model
+from query_engine import query_book, compress_response
+
+DEFAULT_FAQ_QUESTIONS = [
+    "What is the plot summary of this book?",
+    "Who are the main characters?",
+    "What are the main themes of the book?",
+    "How does the book end?",
+]
+# Optional JSON file containing a list of questions to use instead of the defaults
+FAQ_QUESTIONS_PATH = os.getenv("FAQ_QUESTIONS_PATH")
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.85"))
+
+_packs = {}
+
+
+def faq_questions() -> list[str]:
+    if FAQ_QUESTIONS_PATH and os.path.exists(FAQ_QUESTIONS_PATH):
+        with open(FAQ_QUESTIONS_PATH, "r") as f:
+            return json.load(f)
+    return DEFAULT_FAQ_QUESTIONS
+
+
+def pack_path(book_id: str) -> str:
+    return f"data/{book_id}/faq.json"
+
+
+def content_hash(book_id: str) -> Optional[str]:
+    path = f"data/{book_id}/summary.json"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        content = json.load(f).get("content") or ""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def encode_normalized(texts: list[str], model_name: str = EMBEDDING_MODEL_NAME) -> np.ndarray:
+    vectors = np.asarray(get_model(model_name).encode(texts), dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def build_faq_pack(book_id: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Answer every FAQ question through the normal RAG path and store the results."""
+    current_hash = content_hash(book_id)
+    if current_hash is None:
+        raise FileNotFoundError(f"No summary found for book_id: {book_id}")
+
+    questions = faq_questions()
+    # Pack builds are not user traffic, so they stay out of the router stats
+    answers = [query_book(book_id=book_id, question=q, history=[], metadata=metadata, record_stats=False)
+               for q in questions]
+    pack = {
+        "book_id": book_id,
+        "content_hash": current_hash,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "questions": questions,
+        "answers": answers,
+        # Short forms for the chat history, so a pack hit needs no LLM call at all
+        "history_answers": [compress_response(answer) for answer in answers],
+        "question_embeddings": encode_normalized(questions).tolist()
+    }
+
+    tmp_path = f"{pack_path(book_id)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(pack, f)
+    os.replace(tmp_path, pack_path(book_id))
+    _packs.pop(book_id, None)
+
+    print(f"✅ FAQ pack for {book_id}: {len(questions)} answers")
+    return {"book_id": book_id, "questions": len(questions), "content_hash": current_hash}
+
+
+def load_faq_pack(book_id: str) -> Optional[Dict[str, Any]]:
+    """The book's pack if it exists and was built from the current summary content."""
+    path = pack_path(book_id)
+    if not os.path.exists(path):
+        return None
+    summary_path = f"data/{book_id}/summary.json"
+    summary_mtime = os.path.getmtime(summary_path) if os.path.exists(summary_path) else None
+    key = (os.path.getmtime(path), summary_mtime)
+
+    cached = _packs.get(book_id)
+    if cached is None or cached["key"] != key:
+        with open(path, "r") as f:
+            pack = json.load(f)
+        pack["question_embeddings"] = np.asarray(pack["question_embeddings"], dtype=np.float32)
+        pack["valid"] = (
+            pack.get("content_hash") == content_hash(book_id)
+            and pack.get("embedding_model") == EMBEDDING_MODEL_NAME
+        )
+        if not pack["valid"]:
+            print(f"FAQ pack for {book_id} is stale (content or model changed); ignoring until rebuilt")
+        cached = {"key": key, "pack": pack}
+        _packs[book_id] = cached
+    return cached["pack"] if cached["pack"]["valid"] else None
+
+
+def match_faq(book_id: str, question: str) -> Optional[Dict[str, Any]]:
+    """Serve a precomputed answer if the question is close enough to one in the pack."""
+    pack = load_faq_pack(book_id)
+    if pack is None:
+        return None
+    scores = pack["question_embeddings"] @ encode_normalized([question])[0]
+    best = int(np.argmax(scores))
+    if scores[best] < FAQ_MATCH_THRESHOLD:
+        return None
+    return {
+        "question": pack["questions"][best],
+        "answer": pack["answers"][best],
+        "history_answer": pack["history_answers"][best],
+        "score": float(scores[best])
+    }
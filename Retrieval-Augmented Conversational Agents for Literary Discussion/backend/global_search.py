@@ -0,0 +1,114 @@
+"""
+Catalog-wide "which books discuss X?" search over the global chunk index.
+
+Books are added to the index as they are embedded (see add_to_global_index).
+Books embedded before the index existed can be copied in without re-encoding:
+
+    python global_search.py rebuild
+    python global_search.py search "totalitarian propaganda"
+"""
+import os
+import json
+import argparse
+from typing import Any, Dict
+from embedder import (
+    GLOBAL_INDEX_NAME,
+    EMBEDDING_MODEL_NAME,
+    chroma_client,
+    collection_model_name,
+    get_global_collection,
+    add_to_global_index,
+    resolve_collection_name,
+    query_collection,
+)
+
+COPY_BATCH_SIZE = 1000
+_titles = {}
+
+
+def book_title(book_id: str):
+    if book_id not in _titles:
+        path = f"data/{book_id}/summary.json"
+        title = None
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                title = json.load(f).get("book_title")
+        _titles[book_id] = title
+    return _titles[book_id]
+
+
+def search_content(query: str, n_books: int = 5, passages_per_book: int = 3) -> Dict[str, Any]:
+    """Best-matching books for a free-text query, each with its closest passages."""
+    collection = get_global_collection()
+    # Over-fetch so one long book cannot crowd every other book out of the top hits
+    n_results = min(max(n_books * passages_per_book * 4, 20), max(collection.count(), 1))
+    results = query_collection(collection, query, n_results=n_results)
+
+    books = {}
+    for chunk_id, document, metadata, distance in zip(
+        results["ids"][0], results["documents"][0], results["metadatas"][0], results["distances"][0]
+    ):
+        book_id = metadata["book_id"]
+        entry = books.setdefault(book_id, {
+            "book_id": book_id,
+            "title": book_title(book_id),
+            "score": distance,
+            "passages": []
+        })
+        if len(entry["passages"]) < passages_per_book:
+            entry["passages"].append({"chunk_id": chunk_id, "text": document, "distance": distance})
+
+    ranked = sorted(books.values(), key=lambda b: b["score"])[:n_books]
+    return {"query": query, "results": ranked}
+
+
+def rebuild_global_index() -> int:
+    """Copy every book collection's stored vectors into the global index (no re-encoding)."""
+    names = [c if isinstance(c, str) else c.name for c in chroma_client.list_collections()]
+    book_ids = sorted({name.split("__", 1)[0] for name in names} - {GLOBAL_INDEX_NAME})
+    copied = 0
+    for book_id in book_ids:
+        name = resolve_collection_name(book_id)
+        if name not in names:
+            continue
+        collection = chroma_client.get_collection(name=name)
+        if collection_model_name(collection) != EMBEDDING_MODEL_NAME:
+            print(f"Skipping {book_id}: embedded with {collection_model_name(collection)}")
+            continue
+        total = collection.count()
+        for offset in range(0, total, COPY_BATCH_SIZE):
+            batch = collection.get(
+                limit=COPY_BATCH_SIZE,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            add_to_global_index(
+                book_id,
+                batch["ids"],
+                batch["documents"],
+                [list(e) for e in batch["embeddings"]],
+                batch["metadatas"]
+            )
+        copied += total
+        print(f"Indexed {book_id}: {total} chunks")
+    print(f"✅ Global index: {get_global_collection().count()} chunks")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Global content index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="Backfill the global index from existing book collections")
+    search_parser = sub.add_parser("search", help="Run a query against the global index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--books", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rebuild_global_index()
+    else:
+        print(json.dumps(search_content(args.query, n_books=args.books), indent=2))
+
+
+if __name__ == "__main__":
+    main()
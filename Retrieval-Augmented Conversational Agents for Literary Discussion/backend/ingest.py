@@ -0,0 +1,211 @@
+"""
+Streaming ingestion of full-length book texts.
+
+Unlike embed_book_content, nothing here holds the whole book: the file is read
+in fixed-size blocks, cut into CHUNK_SIZE chunks as it goes, and every
+`batch_size` chunks are encoded and written before the next batch is read.
+Peak memory therefore depends on the batch size, not the book length.
+
+    python ingest.py BOOK_ID path/to/book.txt
+    python ingest.py BOOK_ID path/to/book.epub --batch-size 64
+"""
+import os
+import sys
+import time
+import codecs
+import zipfile
+import argparse
+import resource
+import posixpath
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import Iterator, Optional
+from embedder import CHUNK_SIZE, chroma_client, collection_model_name, get_or_create_book_collection, add_to_global_index
+from embedding_cache import EMBEDDING_CACHE_ENABLED, embedding_cache, encode_cached
+
+READ_BLOCK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 64
+BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "blockquote", "section"}
+SKIP_TAGS = {"script", "style", "head"}
+
+
+class _TextExtractor(HTMLParser):
+    """Incremental XHTML -> text. Text is collected in `pending` and drained by the caller after each feed()."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pending = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.pending.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self.pending.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.pending.append(data)
+
+    def drain(self) -> str:
+        text = "".join(self.pending)
+        self.pending = []
+        return text
+
+
+class Progress:
+    def __init__(self):
+        self.bytes_done = 0
+        self.bytes_total = 0
+
+
+def read_plaintext(path: str, progress: Progress) -> Iterator[str]:
+    progress.bytes_total = os.path.getsize(path)
+    with open(path, "rb") as f:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            progress.bytes_done += len(block)
+            yield decoder.decode(block)
+        yield decoder.decode(b"", final=True)
+
+
+def epub_spine(archive: zipfile.ZipFile) -> list[str]:
+    """Paths of the EPUB's content documents, in reading order."""
+    container = ET.fromstring(archive.read("META-INF/container.xml"))
+    rootfile = container.find(".//{*}rootfile").get("full-path")
+    opf = ET.fromstring(archive.read(rootfile))
+    base = posixpath.dirname(rootfile)
+    manifest = {item.get("id"): item.get("href") for item in opf.find("{*}manifest")}
+    return [
+        posixpath.normpath(posixpath.join(base, manifest[ref.get("idref")]))
+        for ref in opf.find("{*}spine")
+        if ref.get("idref") in manifest
+    ]
+
+
+def read_epub(path: str, progress: Progress) -> Iterator[str]:
+    with zipfile.ZipFile(path) as archive:
+        spine = epub_spine(archive)
+        progress.bytes_total = sum(archive.getinfo(name).file_size for name in spine)
+        for name in spine:
+            parser = _TextExtractor()
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            with archive.open(name) as f:
+                while True:
+                    block = f.read(READ_BLOCK_SIZE)
+                    if not block:
+                        break
+                    progress.bytes_done += len(block)
+                    parser.feed(decoder.decode(block))
+                    yield parser.drain()
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+            yield parser.drain() + "\n"
+
+
+def iter_chunks(pieces: Iterator[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Re-cut a stream of text pieces into chunk_size-character chunks."""
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        cut = len(buffer) - len(buffer) % chunk_size
+        for start in range(0, cut, chunk_size):
+            yield buffer[start:start + chunk_size]
+        buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def ingest_book_file(
+    book_id: str,
+    path: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    source: Optional[str] = None,
+    report_every: int = 10
+) -> dict:
+    """Stream a local .txt or .epub file into the book's collection."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such file: {path}")
+    is_epub = path.lower().endswith(".epub")
+    source = source or ("epub" if is_epub else "text")
+    progress = Progress()
+    pieces = read_epub(path, progress) if is_epub else read_plaintext(path, progress)
+
+    collection = get_or_create_book_collection(book_id)
+    # Re-embedded books keep their live collection, so encode with the model it is stamped with
+    model_name = collection_model_name(collection)
+    cache_before = dict(embedding_cache.session)
+    started = time.perf_counter()
+    stored = 0
+    batches = 0
+    batch = []
+
+    def flush():
+        nonlocal stored, batches
+        embeddings = encode_cached(batch, model_name, batch_size=batch_size)
+        ids = [f"{book_id}_{source}_{stored + i}" for i in range(len(batch))]
+        metadatas = [{"source": source} for _ in batch]
+        collection.upsert(documents=batch, embeddings=embeddings, ids=ids, metadatas=metadatas)
+        add_to_global_index(book_id, ids, batch, embeddings, metadatas, model_name)
+        stored += len(batch)
+        batches += 1
+        if batches % report_every == 0:
+            elapsed = time.perf_counter() - started
+            percent = 100 * progress.bytes_done / progress.bytes_total if progress.bytes_total else 0
+            print(f"  {percent:5.1f}%  {stored} chunks  {stored / elapsed:.1f} chunks/s  peak RSS {peak_rss_mb():.0f} MB")
+        batch.clear()
+
+    for chunk in iter_chunks(pieces):
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    try:
+        chroma_client.persist()
+    except Exception:
+        pass
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Ingested {stored} chunks from {path} in {elapsed:.1f}s (peak RSS {peak_rss_mb():.0f} MB)")
+    result = {
+        "book_id": book_id,
+        "chunks_stored": stored,
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+    if EMBEDDING_CACHE_ENABLED:
+        cache = embedding_cache.session_since(cache_before, model_name)
+        print(f"   Embedding cache: {cache['hits']} hits, {cache['misses']} encoded, "
+              f"net encode time saved {cache['encode_seconds_saved']:.1f}s")
+        result["embedding_cache"] = cache
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a full book text into the vectorstore")
+    parser.add_argument("book_id")
+    parser.add_argument("path", help=".txt (UTF-8) or .epub file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    ingest_book_file(args.book_id, args.path, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,26 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 import requests
 from dotenv import load_dotenv
 import os
 from wiki_fetch import fetch_wikipedia_summary
-from embedder import embed_book_content
-from query_engine import query_book, ensure_vectors_exist
+from embedder import embed_book_content, collection_cache
+from query_engine import answer_question, router_stats, ensure_vectors_exist
 from pydantic import BaseModel
+from typing import Optional
 from query_engine import compress_response
+from reembed import start_job, job_status, stop_job
+from faq import build_faq_pack, load_faq_pack, match_faq
+from global_search import search_content
+from embedding_cache import embedding_cache
+from sharding import owns_book, shard_for, shard_info, SHARD_COUNT
 
 class ChatRequest(BaseModel):
     book_id: str
     question: str
     history: list[str] = []
+    # Book details the client already has (title, authors, publishedDate, ...); lets the router answer metadata questions
+    metadata: Optional[dict] = None
 # load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 load_dotenv()
 GOOGLE_BOOKS_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -33,6 +41,19 @@ app.add_middleware(
 def read_root():
     return {"message": "Hello, World!"}
 
+def wrong_shard(book_id: str):
+    """Error response if this node does not own the book, else None."""
+    if owns_book(book_id):
+        return None
+    return {
+        "status": "error",
+        "message": f"Book {book_id} belongs to shard {shard_for(book_id)} of {SHARD_COUNT}; send it through the router"
+    }
+
+@app.get("/shard")
+def get_shard():
+    return shard_info()
+
 
 
 @app.get("/search-books")
@@ -59,6 +80,18 @@ def search_books(q: str = Query(..., description="Search query for books")):
 
 
 
+@app.get("/search-content")
+def search_book_content(
+    q: str = Query(..., description="Free-text topic to look for across all prepared books"),
+    books: int = Query(5, ge=1, le=50),
+    passages: int = Query(3, ge=1, le=10)
+):
+    try:
+        return {"status": "success", **search_content(q, n_books=books, passages_per_book=passages)}
+    except Exception as e:
+        return {"status": "error", "message": str(e), "results": []}
+
+
 @app.post("/books/fetch-wiki")
 def fetch_wiki(book_title: str = Query(...), book_id: str = Query(...), author: str = Query(None)):
     result = fetch_wikipedia_summary(book_title, book_id, author)
@@ -67,11 +100,17 @@ def fetch_wiki(book_title: str = Query(...), book_id: str = Query(...), author:
 
 @app.post("/books/embed")
 async def embed_book(book_id: str = Query(...)):
+    misrouted = wrong_shard(book_id)
+    if misrouted:
+        return misrouted
     result = embed_book_content(book_id)
     return result
 
 @app.get("/books/check")
 def check_book(book_id: str = Query(...)):
+    misrouted = wrong_shard(book_id)
+    if misrouted:
+        return misrouted
     try:
         # Check if vectors exist for the book
         exists = ensure_vectors_exist(book_id)
@@ -87,14 +126,41 @@ def check_book(book_id: str = Query(...)):
             "message": str(e)
         }
 
+def build_faq_in_background(book_id: str, metadata: dict):
+    try:
+        build_faq_pack(book_id, metadata)
+    except Exception as e:
+        print(f"Warning: FAQ pack for {book_id} failed: {str(e)}")
+
+@app.post("/books/faq")
+def prepare_faq(background_tasks: BackgroundTasks, book_id: str = Query(...), book_title: str = Query(None), author: str = Query(None)):
+    misrouted = wrong_shard(book_id)
+    if misrouted:
+        return misrouted
+    metadata = {"title": book_title, "authors": [author] if author else []} if book_title else None
+    background_tasks.add_task(build_faq_in_background, book_id, metadata)
+    return {"status": "success", "message": "FAQ pack build scheduled"}
+
 @app.post("/books/prepare")
-async def prepare_book(book_id: str = Query(...), book_title: str = Query(...), author: str = Query(None)):
+async def prepare_book(
+    background_tasks: BackgroundTasks,
+    book_id: str = Query(...),
+    book_title: str = Query(...),
+    author: str = Query(None),
+    with_faq: bool = Query(False, description="Also precompute answers to the FAQ question set")
+):
     try:
         print(f"Preparing book: {book_title} (ID: {book_id})")
+        misrouted = wrong_shard(book_id)
+        if misrouted:
+            return misrouted
+        metadata = {"title": book_title, "authors": [author] if author else []}
         
         # First check if book is already prepared
         check_response = check_book(book_id)
         if check_response["status"] == "success" and check_response["exists"]:
+            if with_faq and load_faq_pack(book_id) is None:
+                background_tasks.add_task(build_faq_in_background, book_id, metadata)
             return {
                 "status": "success",
                 "message": "Book data already exists",
@@ -121,6 +187,8 @@ async def prepare_book(book_id: str = Query(...), book_title: str = Query(...),
         # Step 2: Embed the book
         try:
             embed_result = embed_book_content(book_id)
+            if with_faq:
+                background_tasks.add_task(build_faq_in_background, book_id, metadata)
             return {
                 "status": "success",
                 "message": "Book prepared successfully",
@@ -147,15 +215,33 @@ async def prepare_book(book_id: str = Query(...), book_title: str = Query(...),
 async def ask_question(payload: ChatRequest):
     try:
         print(f"Received query for book {payload.book_id}")
+        misrouted = wrong_shard(payload.book_id)
+        if misrouted:
+            return {**misrouted, "response": None, "history": payload.history}
+
+        # Serve common opening questions from the precomputed pack: no retrieval, no LLM
+        faq_hit = match_faq(payload.book_id, payload.question)
+        if faq_hit:
+            return {
+                "status": "success",
+                "response": faq_hit["answer"],
+                "history": payload.history + [
+                    f"User: {payload.question}",
+                    f"Bot: {faq_hit['history_answer']}"
+                ],
+                "source": "faq"
+            }
         
         # Try to query the book
         try:
-            answer = query_book(
+            result = answer_question(
                 book_id=payload.book_id,
                 question=payload.question,
-                history=payload.history
+                history=payload.history,
+                metadata=payload.metadata
             )
-            print("Query successful")
+            answer = result["answer"]
+            print(f"Query successful ({result['route']})")
         except Exception as e:
             print(f"Query failed: {str(e)}")
             return {
@@ -175,7 +261,8 @@ async def ask_question(payload: ChatRequest):
         return {
             "status": "success",
             "response": answer,
-            "history": updated_history
+            "history": updated_history,
+            "source": result["route"]
         }
     except Exception as e:
         error_message = str(e)
@@ -185,4 +272,41 @@ async def ask_question(payload: ChatRequest):
             "message": error_message,
             "response": None,
             "history": payload.history
-        }
\ No newline at end of file
+        }
+
+@app.get("/chat/stats")
+def chat_stats():
+    return router_stats()
+
+@app.get("/admin/cache")
+def cache_stats():
+    return collection_cache.stats()
+
+@app.get("/admin/embedding-cache")
+def embedding_cache_stats():
+    return {"models": embedding_cache.report()}
+
+@app.post("/admin/cache/pin")
+def pin_book(book_id: str = Query(...), pinned: bool = Query(True)):
+    if pinned:
+        collection_cache.pin(book_id)
+    else:
+        collection_cache.unpin(book_id)
+    return collection_cache.stats()
+
+@app.post("/admin/reembed")
+def start_reembed(
+    model: str = Query(..., description="SentenceTransformer model to re-embed into"),
+    chunks_per_second: float = Query(20.0, description="Throttle so live chat keeps priority"),
+    batch_size: int = Query(16),
+    drop_old: bool = Query(False)
+):
+    return start_job(model, chunks_per_second=chunks_per_second, batch_size=batch_size, drop_old=drop_old)
+
+@app.get("/admin/reembed")
+def reembed_status():
+    return job_status()
+
+@app.post("/admin/reembed/stop")
+def stop_reembed():
+    return stop_job()
@@ -0,0 +1,336 @@
+"""
+Offline maintenance for the Chroma vectorstore.
+
+Stop the chat service before running this: it opens the same persistent
+directory and rewrites collections in place.
+
+    python maintenance.py report            # collections, chunk counts, disk usage
+    python maintenance.py gc [--dry-run]    # remove orphaned segment directories and log rows
+    python maintenance.py compact [--book BOOK_ID]
+    python maintenance.py check             # content store <-> vectors integrity
+    python maintenance.py all               # gc + compact + vacuum + check
+"""
+import os
+import re
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import chromadb
+from chromadb.config import Settings
+from embedding_function import GLOBAL_INDEX_NAME, get_embedding_function, collection_model_name
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+VECTORSTORE_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "vectorstore")
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+SQLITE_PATH = os.path.join(VECTORSTORE_DIR, "chroma.sqlite3")
+ALIASES_PATH = os.path.join(VECTORSTORE_DIR, "aliases.json")
+
+COPY_BATCH_SIZE = 1000
+COMPACT_SUFFIX = "__compact"
+UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def get_client():
+    return chromadb.Client(Settings(
+        persist_directory=VECTORSTORE_DIR,
+        is_persistent=True
+    ))
+
+
+def reset_client():
+    """Drop the cached Chroma system so the next client reloads every segment from disk."""
+    try:
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+    except Exception:
+        pass
+
+
+def collection_names(client) -> list[str]:
+    # list_collections() returns names on some Chroma releases and objects on others
+    return sorted(c if isinstance(c, str) else c.name for c in client.list_collections())
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def vector_segments() -> dict[str, str]:
+    """Map live vector segment IDs (the on-disk directory names) to collection names."""
+    if not os.path.exists(SQLITE_PATH):
+        return {}
+    conn = sqlite3.connect(f"file:{SQLITE_PATH}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT s.id, c.name FROM segments s JOIN collections c ON s.collection = c.id "
+            "WHERE s.scope = 'VECTOR'"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {segment_id: name for segment_id, name in rows}
+
+
+def segment_dirs() -> list[str]:
+    if not os.path.isdir(VECTORSTORE_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(VECTORSTORE_DIR)
+        if UUID_RE.match(name) and os.path.isdir(os.path.join(VECTORSTORE_DIR, name))
+    )
+
+
+def content_books() -> dict[str, str]:
+    """Map book IDs in the content store to their summary content."""
+    books = {}
+    if not os.path.isdir(DATA_DIR):
+        return books
+    for book_id in sorted(os.listdir(DATA_DIR)):
+        path = os.path.join(DATA_DIR, book_id, "summary.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            books[book_id] = json.load(f).get("content") or ""
+    return books
+
+
+def load_aliases() -> dict:
+    if not os.path.exists(ALIASES_PATH):
+        return {}
+    with open(ALIASES_PATH, "r") as f:
+        return json.load(f)
+
+
+def measure_load_time(names: list[str]) -> float:
+    """Seconds for a cold client to open every collection and load its index."""
+    reset_client()
+    client = get_client()
+    start = time.perf_counter()
+    for name in names:
+        collection = client.get_collection(name=name)
+        sample = collection.get(limit=1, include=["embeddings"])
+        if len(sample["ids"]):
+            collection.query(query_embeddings=[list(sample["embeddings"][0])], n_results=1)
+    return time.perf_counter() - start
+
+
+def report(client) -> list[dict]:
+    segments = {name: segment_id for segment_id, name in vector_segments().items()}
+    rows = []
+    for name in collection_names(client):
+        segment_id = segments.get(name)
+        segment_path = os.path.join(VECTORSTORE_DIR, segment_id) if segment_id else None
+        rows.append({
+            "collection": name,
+            "chunks": client.get_collection(name=name).count(),
+            "segment": segment_id,
+            "disk_bytes": dir_size(segment_path) if segment_path and os.path.isdir(segment_path) else 0,
+        })
+
+    print(f"{'collection':<24} {'chunks':>8} {'disk':>10}  segment")
+    for row in rows:
+        print(f"{row['collection']:<24} {row['chunks']:>8} {format_bytes(row['disk_bytes']):>10}  {row['segment']}")
+    sqlite_size = os.path.getsize(SQLITE_PATH) if os.path.exists(SQLITE_PATH) else 0
+    print(f"Collections: {len(rows)}  |  chroma.sqlite3: {format_bytes(sqlite_size)}  |  "
+          f"vectorstore total: {format_bytes(dir_size(VECTORSTORE_DIR))}")
+    return rows
+
+
+def collect_orphans(dry_run: bool = False) -> int:
+    """Remove segment directories that no collection references. Returns bytes reclaimed."""
+    live = vector_segments()
+    reclaimed = 0
+    for name in segment_dirs():
+        if name in live:
+            continue
+        path = os.path.join(VECTORSTORE_DIR, name)
+        size = dir_size(path)
+        reclaimed += size
+        print(f"{'Would remove' if dry_run else 'Removing'} orphaned segment {name} ({format_bytes(size)})")
+        if not dry_run:
+            shutil.rmtree(path)
+    if not reclaimed:
+        print("No orphaned segments found")
+    return reclaimed
+
+
+def purge_orphaned_log(dry_run: bool = False) -> int:
+    """Delete write-ahead log rows left behind by collections that no longer exist."""
+    conn = sqlite3.connect(SQLITE_PATH)
+    try:
+        live = {row[0] for row in conn.execute("SELECT id FROM collections")}
+        stale = [
+            topic for (topic,) in conn.execute("SELECT DISTINCT topic FROM embeddings_queue")
+            if topic.rsplit("/", 1)[-1] not in live
+        ]
+        removed = 0
+        for topic in stale:
+            removed += conn.execute("SELECT COUNT(*) FROM embeddings_queue WHERE topic = ?", (topic,)).fetchone()[0]
+            if not dry_run:
+                conn.execute("DELETE FROM embeddings_queue WHERE topic = ?", (topic,))
+        conn.commit()
+    finally:
+        conn.close()
+    if removed:
+        print(f"{'Would purge' if dry_run else 'Purged'} {removed} log entries from {len(stale)} deleted collections")
+    return removed
+
+
+def compact_collection(client, name: str) -> int:
+    """Rebuild a collection's index from its stored records, dropping deleted/duplicate entries.
+
+    The rebuilt collection is bound to the shared encoder for its stamped model.
+    """
+    source = client.get_collection(name=name)
+    total = source.count()
+    tmp_name = f"{name}{COMPACT_SUFFIX}"
+    try:
+        client.delete_collection(name=tmp_name)
+    except Exception:
+        pass
+    target = client.create_collection(
+        name=tmp_name,
+        metadata=source.metadata or None,
+        embedding_function=get_embedding_function(collection_model_name(source))
+    )
+
+    for offset in range(0, total, COPY_BATCH_SIZE):
+        batch = source.get(
+            limit=COPY_BATCH_SIZE,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        target.add(
+            ids=batch["ids"],
+            embeddings=[list(e) for e in batch["embeddings"]],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"]
+        )
+
+    if target.count() != total:
+        client.delete_collection(name=tmp_name)
+        raise RuntimeError(f"Compaction of {name} copied {target.count()} of {total} chunks; original kept")
+
+    client.delete_collection(name=name)
+    target.modify(name=name)
+    print(f"Compacted {name}: {total} chunks")
+    return total
+
+
+def vacuum_sqlite() -> None:
+    conn = sqlite3.connect(SQLITE_PATH)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def check_integrity(client, chunk_size: int = 500) -> list[str]:
+    """Check every book in the content store has vectors, and every collection has content."""
+    problems = []
+    books = content_books()
+    aliases = load_aliases()
+    collections = set(collection_names(client))
+    live = {aliases.get(book_id, book_id) for book_id in books}
+
+    for book_id, content in books.items():
+        name = aliases.get(book_id, book_id)
+        if not content:
+            problems.append(f"{book_id}: summary.json has no content")
+            continue
+        if name not in collections:
+            problems.append(f"{book_id}: no collection {name}")
+            continue
+        count = client.get_collection(name=name).count()
+        expected = -(-len(content) // chunk_size)
+        if count == 0:
+            problems.append(f"{book_id}: collection is empty")
+        elif count < expected:
+            problems.append(f"{book_id}: {count} chunks stored, expected at least {expected}")
+
+    for name in sorted(collections - live):
+        if name.split("__", 1)[0] == GLOBAL_INDEX_NAME:
+            continue
+        if name.split("__", 1)[0] in books:
+            problems.append(f"{name}: superseded collection, no longer the live version of its book")
+        else:
+            problems.append(f"{name}: collection has no matching content in {DATA_DIR}")
+
+    for problem in problems:
+        print(f"⚠️  {problem}")
+    print(f"Integrity check: {len(books)} books, {len(collections)} collections, {len(problems)} problems")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorstore maintenance (run with the chat service stopped)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("report", help="List collections with chunk counts and disk usage")
+    gc_parser = sub.add_parser("gc", help="Remove orphaned segment directories")
+    gc_parser.add_argument("--dry-run", action="store_true")
+    compact_parser = sub.add_parser("compact", help="Rebuild fragmented collection indexes")
+    compact_parser.add_argument("--book", action="append", help="Only compact this book's live collection (repeatable)")
+    sub.add_parser("check", help="Verify content store and vectors match")
+    sub.add_parser("all", help="gc, compact, vacuum and check, with a before/after summary")
+    args = parser.parse_args()
+
+    client = get_client()
+
+    if args.command == "report":
+        report(client)
+    elif args.command == "gc":
+        reclaimed = collect_orphans(dry_run=args.dry_run)
+        purge_orphaned_log(dry_run=args.dry_run)
+        print(f"Reclaimable: {format_bytes(reclaimed)}" if args.dry_run else f"Reclaimed: {format_bytes(reclaimed)}")
+    elif args.command == "compact":
+        if args.book:
+            # A re-embedded book lives in a versioned collection; follow its alias to the live one
+            aliases = load_aliases()
+            names = [aliases.get(book_id, book_id) for book_id in args.book]
+        else:
+            names = collection_names(client)
+        for name in names:
+            compact_collection(client, name)
+    elif args.command == "check":
+        if check_integrity(client):
+            raise SystemExit(1)
+    elif args.command == "all":
+        names = collection_names(client)
+        size_before = dir_size(VECTORSTORE_DIR)
+        load_before = measure_load_time(names)
+
+        client = get_client()
+        for name in names:
+            compact_collection(client, name)
+        reset_client()
+        collect_orphans()
+        purge_orphaned_log()
+        vacuum_sqlite()
+
+        size_after = dir_size(VECTORSTORE_DIR)
+        load_after = measure_load_time(names)
+        client = get_client()
+        report(client)
+        problems = check_integrity(client)
+        print(f"Space reclaimed: {format_bytes(size_before - size_after)} "
+              f"({format_bytes(size_before)} -> {format_bytes(size_after)})")
+        print(f"Load time: {load_before:.2f}s -> {load_after:.2f}s")
+        if problems:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,14 @@
 import os
+import re
+import time
+import threading
 import google.generativeai as genai
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-from embedder import embed_book_content, VECTORSTORE_DIR
+from embedder import embed_book_content, get_book_collection, query_collection
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Setup ChromaDB and embedding model
-chroma_client = chromadb.Client(Settings(
-    persist_directory=VECTORSTORE_DIR,
-    is_persistent=True
-))
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
 # Initialize Gemini client
 api_key = os.getenv("GEMINI_API_KEY")
 if not api_key:
@@ -29,24 +22,159 @@ print("✅ GEMINI_API_KEY loaded successfully")
 genai.configure(api_key=api_key)
 gemini_model = genai.GenerativeModel("gemini-1.5-flash")
 
-def ensure_vectors_exist(book_id: str) -> bool:
-    """Check if vectors exist for a book, create them if they don't."""
+# Query routing: metadata and factoid questions are answered locally, the rest go to Gemini
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() != "false"
+EXTRACTIVE_QA_MODEL = os.getenv("EXTRACTIVE_QA_MODEL", "distilbert-base-cased-distilled-squad")
+EXTRACTIVE_QA_THRESHOLD = float(os.getenv("EXTRACTIVE_QA_THRESHOLD", "0.5"))
+
+METADATA_PATTERNS = [
+    ("authors", re.compile(r"\b(who (wrote|authored|is the author)|author of|written by)\b", re.I)),
+    ("published", re.compile(r"\b(when was (it|this|the book) (first )?(published|released|written)|publication (date|year)|what year was)\b", re.I)),
+    ("publisher", re.compile(r"\b(who published|publisher)\b", re.I)),
+    ("page_count", re.compile(r"\b(how many pages|page count|how long is (it|the book))\b", re.I)),
+    ("categories", re.compile(r"\b(what (genre|category|kind of book)|which genre)\b", re.I)),
+]
+FACTOID_PATTERN = re.compile(
+    r"^\s*(who|whom|when|where|which|what year|what is the name|what was the name|how many|how old|in what)\b", re.I
+)
+OPEN_ENDED_PATTERN = re.compile(r"\b(why|how does|how did|explain|describe|analy[sz]e|compare|opinion|think|meaning|theme|summar|plot|characters)", re.I)
+
+_qa_pipeline = {"pipe": None, "loaded": False}
+_qa_lock = threading.Lock()
+_router_stats = {route: {"count": 0, "seconds": 0.0} for route in ("metadata", "extractive", "llm")}
+_router_stats["escalated"] = 0
+_stats_lock = threading.Lock()
+
+def ready_collection(book_id: str):
+    """The book's collection, embedding the book first if it has no vectors yet. None on failure."""
     try:
-        collection = chroma_client.get_collection(name=book_id)
-        return collection.count() > 0
+        collection = get_book_collection(book_id)
+        if collection.count() > 0:
+            return collection
     except:
-        # Collection doesn't exist or is empty, try to create it
-        try:
-            result = embed_book_content(book_id)
-            return result["chunks_stored"] > 0
-        except Exception as e:
-            print(f"Error creating vectors for book {book_id}: {str(e)}")
-            return False
-
-def query_book(book_id: str, question: str, history: list[str], metadata: dict = None):
-    # Ensure vectors exist
-    if not ensure_vectors_exist(book_id):
-        return "Sorry, I couldn't find or create the necessary information for this book. Please try again later."
+        pass
+    # Collection doesn't exist or is empty, try to create it
+    try:
+        result = embed_book_content(book_id)
+        return get_book_collection(book_id) if result["chunks_stored"] > 0 else None
+    except Exception as e:
+        print(f"Error creating vectors for book {book_id}: {str(e)}")
+        return None
+
+def ensure_vectors_exist(book_id: str) -> bool:
+    """Check if vectors exist for a book, create them if they don't."""
+    return ready_collection(book_id) is not None
+
+def classify_question(question: str) -> str:
+    """Return "metadata:<field>", "factoid" or "open"."""
+    for field, pattern in METADATA_PATTERNS:
+        if pattern.search(question):
+            return f"metadata:{field}"
+    if FACTOID_PATTERN.search(question) and not OPEN_ENDED_PATTERN.search(question):
+        return "factoid"
+    return "open"
+
+def answer_from_metadata(field: str, metadata: dict = None):
+    if not metadata:
+        return None
+    title = metadata.get("title") or "The book"
+    if field == "authors" and metadata.get("authors"):
+        return f"{title} was written by {', '.join(metadata['authors'])}."
+    published = metadata.get("published_date") or metadata.get("publishedDate")
+    if field == "published" and published:
+        return f"{title} was published in {published}."
+    if field == "publisher" and metadata.get("publisher"):
+        return f"{title} was published by {metadata['publisher']}."
+    if field == "page_count" and metadata.get("page_count"):
+        return f"{title} has {metadata['page_count']} pages."
+    if field == "categories" and metadata.get("categories"):
+        return f"{title} is categorised as {', '.join(metadata['categories'])}."
+    return None
+
+def get_qa_pipeline():
+    """Small CPU extractive-QA model, loaded on first use. None if transformers is unavailable."""
+    with _qa_lock:
+        if not _qa_pipeline["loaded"]:
+            _qa_pipeline["loaded"] = True
+            try:
+                from transformers import pipeline
+                _qa_pipeline["pipe"] = pipeline("question-answering", model=EXTRACTIVE_QA_MODEL, device=-1)
+            except Exception as e:
+                print(f"Warning: extractive QA disabled: {str(e)}")
+        return _qa_pipeline["pipe"]
+
+def sentence_around(context: str, start: int, end: int) -> str:
+    """The sentence of `context` containing the answer span."""
+    left = max(context.rfind(". ", 0, start), context.rfind("\n", 0, start))
+    right_candidates = [i for i in (context.find(". ", end), context.find("\n", end)) if i != -1]
+    right = min(right_candidates) if right_candidates else len(context)
+    return context[left + 1:right + 1].strip()
+
+def answer_extractively(question: str, context: str):
+    """(answer, score) from the local QA model, or (None, 0.0)."""
+    pipe = get_qa_pipeline()
+    if pipe is None or not context:
+        return None, 0.0
+    result = pipe(question=question, context=context)
+    return sentence_around(context, result["start"], result["end"]), float(result["score"])
+
+def record_route(route: str, started: float, escalated: bool = False):
+    with _stats_lock:
+        _router_stats[route]["count"] += 1
+        _router_stats[route]["seconds"] += time.perf_counter() - started
+        if escalated:
+            _router_stats["escalated"] += 1
+
+def router_stats() -> dict:
+    """Traffic share and mean latency per route, and the LLM time the local routes avoided."""
+    with _stats_lock:
+        routes = {route: dict(_router_stats[route]) for route in ("metadata", "extractive", "llm")}
+        escalated = _router_stats["escalated"]
+    total = sum(r["count"] for r in routes.values())
+    llm_mean = routes["llm"]["seconds"] / routes["llm"]["count"] if routes["llm"]["count"] else None
+    saved = 0.0
+    for route, r in routes.items():
+        r["fraction"] = r["count"] / total if total else 0.0
+        r["mean_latency_ms"] = 1000 * r["seconds"] / r["count"] if r["count"] else None
+        if route != "llm" and llm_mean is not None:
+            saved += r["count"] * llm_mean - r["seconds"]
+    return {
+        "total": total,
+        "routes": routes,
+        "escalated_factoids": escalated,
+        "local_fraction": (routes["metadata"]["count"] + routes["extractive"]["count"]) / total if total else 0.0,
+        "estimated_seconds_saved": round(saved, 3) if llm_mean is not None else None,
+        "thresholds": {"extractive_qa": EXTRACTIVE_QA_THRESHOLD}
+    }
+
+def query_book(book_id: str, question: str, history: list[str], metadata: dict = None, record_stats: bool = True):
+    return answer_question(book_id, question, history, metadata, record_stats)["answer"]
+
+def answer_question(book_id: str, question: str, history: list[str], metadata: dict = None,
+                    record_stats: bool = True) -> dict:
+    """Route a question to metadata, local extractive QA or the LLM. Returns answer, route and confidence.
+
+    Offline callers (e.g. FAQ pack builds) pass record_stats=False so router stats only reflect user traffic.
+    """
+    started = time.perf_counter()
+    kind = classify_question(question) if ROUTER_ENABLED else "open"
+
+    if kind.startswith("metadata:"):
+        answer = answer_from_metadata(kind.split(":", 1)[1], metadata)
+        if answer:
+            if record_stats:
+                record_route("metadata", started)
+            return {"answer": answer, "route": "metadata", "confidence": 1.0}
+        kind = "factoid"
+
+    # Ensure vectors exist; the handle is reused below so each question is one cache lookup
+    collection = ready_collection(book_id)
+    if collection is None:
+        return {
+            "answer": "Sorry, I couldn't find or create the necessary information for this book. Please try again later.",
+            "route": "error",
+            "confidence": 0.0
+        }
 
     # Format metadata block if available
     meta_block = ""
@@ -62,13 +190,24 @@ Published: {metadata.get("publishedDate", "")}
 
     # Embed and retrieve context
     try:
-        question_embedding = model.encode([question]).tolist()[0]
-        collection = chroma_client.get_collection(name=book_id)
-        results = collection.query(query_embeddings=[question_embedding], n_results=3)
+        results = query_collection(collection, question, n_results=3)
         book_context = "\n\n".join(results["documents"][0])
     except Exception as e:
         print(f"Error retrieving context: {str(e)}")
-        return "Sorry, I encountered an error while retrieving the book information."
+        return {
+            "answer": "Sorry, I encountered an error while retrieving the book information.",
+            "route": "error",
+            "confidence": 0.0
+        }
+
+    escalated = False
+    if kind == "factoid":
+        answer, score = answer_extractively(question, book_context)
+        if answer and score >= EXTRACTIVE_QA_THRESHOLD:
+            if record_stats:
+                record_route("extractive", started)
+            return {"answer": answer, "route": "extractive", "confidence": score}
+        escalated = True
 
     history_text = "\n".join(history) if history else "No previous conversation."
 
@@ -91,13 +230,22 @@ Answer concisely in 2–3 sentences, based on the context and metadata.
 
     try:
         response = gemini_model.generate_content(prompt)
-        return response.text
+        if record_stats:
+            record_route("llm", started, escalated)
+        return {"answer": response.text, "route": "llm", "confidence": None}
     except Exception as e:
         print(f"Error generating response: {str(e)}")
-        return "Sorry, I encountered an error while generating the response."
+        return {
+            "answer": "Sorry, I encountered an error while generating the response.",
+            "route": "error",
+            "confidence": 0.0
+        }
 
 def compress_response(text: str) -> str:
     """Compress a response to a shorter version for history."""
+    # Local answers are already one sentence; don't pay an LLM call to shorten them
+    if len(text) <= 150:
+        return text
     try:
         prompt = f"Summarize this response in one short sentence: {text}"
         response = gemini_model.generate_content(prompt)
@@ -0,0 +1,216 @@
+"""
+Background re-embedding into a new model version.
+
+New-version vectors are written to a side collection (see collection_name_for)
+while queries keep reading the live one. Once a book's side collection holds
+every chunk, its alias is switched in one atomic write and queries move over.
+
+Run inside the API process via POST /admin/reembed, or standalone with the
+service stopped:
+
+    python reembed.py --model all-mpnet-base-v2 --chunks-per-second 20
+"""
+import time
+import argparse
+import threading
+from typing import Optional
+from embedder import (
+    DEFAULT_EMBEDDING_MODEL,
+    GLOBAL_INDEX_NAME,
+    add_to_global_index,
+    chroma_client,
+    get_model,
+    model_metadata,
+    collection_model_name,
+    collection_name_for,
+    resolve_collection_name,
+    set_alias,
+    get_embedding_function,
+    drop_collection,
+    collection_cache,
+)
+from maintenance import compact_collection
+from embedding_cache import encode_cached
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_CHUNKS_PER_SECOND = 20.0
+
+
+def list_books() -> list[str]:
+    """Book IDs that currently have a live collection."""
+    names = [c if isinstance(c, str) else c.name for c in chroma_client.list_collections()]
+    books = {name.split("__", 1)[0] for name in names} - {GLOBAL_INDEX_NAME}
+    return sorted(book_id for book_id in books if resolve_collection_name(book_id) in names)
+
+
+def stamp_legacy_collections() -> list[str]:
+    """Record the default model on collections created before stamping, after checking their dimension.
+
+    Each stamped collection is then rebuilt by compact_collection so it is bound to the shared encoder.
+    """
+    expected = model_metadata(DEFAULT_EMBEDDING_MODEL)
+    stamped = []
+    for c in chroma_client.list_collections():
+        collection = chroma_client.get_collection(name=c if isinstance(c, str) else c.name)
+        metadata = collection.metadata or {}
+        if "embedding_model" in metadata:
+            continue
+        sample = collection.get(limit=1, include=["embeddings"])
+        if len(sample["ids"]) and len(sample["embeddings"][0]) != expected["embedding_dim"]:
+            print(f"Skipping {collection.name}: dimension {len(sample['embeddings'][0])} does not match {DEFAULT_EMBEDDING_MODEL}")
+            continue
+        collection.modify(metadata={**metadata, **expected})
+        compact_collection(chroma_client, collection.name)
+        collection_cache.invalidate(collection.name)
+        stamped.append(collection.name)
+    return stamped
+
+
+class ReembedJob(threading.Thread):
+    def __init__(
+        self,
+        model_name: str,
+        book_ids: Optional[list[str]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        chunks_per_second: float = DEFAULT_CHUNKS_PER_SECOND,
+        drop_old: bool = False
+    ):
+        super().__init__(daemon=True, name=f"reembed-{model_name}")
+        self.model_name = model_name
+        self.book_ids = book_ids
+        self.batch_size = batch_size
+        self.chunks_per_second = chunks_per_second
+        self.drop_old = drop_old
+        self.stop_event = threading.Event()
+        self.status = {
+            "model": model_name,
+            "state": "pending",
+            "books_total": 0,
+            "books_done": 0,
+            "chunks_done": 0,
+            "current_book": None,
+            "errors": {}
+        }
+
+    def stop(self):
+        self.stop_event.set()
+
+    def throttle(self, started: float, chunks: int):
+        """Sleep so the job averages at most chunks_per_second."""
+        if self.chunks_per_second <= 0:
+            return
+        remaining = chunks / self.chunks_per_second - (time.perf_counter() - started)
+        if remaining > 0:
+            self.stop_event.wait(remaining)
+
+    def reembed_book(self, book_id: str) -> bool:
+        source_name = resolve_collection_name(book_id)
+        source = chroma_client.get_collection(name=source_name)
+        if collection_model_name(source) == self.model_name:
+            return False
+
+        target_name = collection_name_for(book_id, self.model_name)
+        target = chroma_client.get_or_create_collection(
+            name=target_name,
+            metadata=model_metadata(self.model_name),
+            embedding_function=get_embedding_function(self.model_name)
+        )
+        total = source.count()
+
+        for offset in range(0, total, self.batch_size):
+            if self.stop_event.is_set():
+                return False
+            started = time.perf_counter()
+            batch = source.get(limit=self.batch_size, offset=offset, include=["documents", "metadatas"])
+            embeddings = encode_cached(batch["documents"], self.model_name)
+            target.upsert(
+                ids=batch["ids"],
+                documents=batch["documents"],
+                embeddings=embeddings,
+                metadatas=batch["metadatas"]
+            )
+            add_to_global_index(book_id, batch["ids"], batch["documents"], embeddings, batch["metadatas"], self.model_name)
+            self.status["chunks_done"] += len(batch["ids"])
+            self.throttle(started, len(batch["ids"]))
+
+        if target.count() < total:
+            raise RuntimeError(f"{target_name} has {target.count()} of {total} chunks")
+
+        set_alias(book_id, target_name)
+        if self.drop_old and source_name != target_name:
+            drop_collection(source_name)
+        return True
+
+    def run(self):
+        books = self.book_ids or list_books()
+        self.status.update(state="running", books_total=len(books))
+        get_model(self.model_name)
+
+        for book_id in books:
+            if self.stop_event.is_set():
+                self.status["state"] = "stopped"
+                return
+            self.status["current_book"] = book_id
+            try:
+                self.reembed_book(book_id)
+            except Exception as e:
+                print(f"Re-embedding {book_id} failed: {str(e)}")
+                self.status["errors"][book_id] = str(e)
+            self.status["books_done"] += 1
+
+        self.status.update(state="stopped" if self.stop_event.is_set() else "done", current_book=None)
+
+
+_job: Optional[ReembedJob] = None
+
+
+def start_job(model_name: str, **kwargs) -> dict:
+    """Start a background job, unless one is already running."""
+    global _job
+    if _job is not None and _job.is_alive():
+        return {"status": "error", "message": f"Re-embedding to {_job.model_name} already running", "job": _job.status}
+    _job = ReembedJob(model_name, **kwargs)
+    _job.start()
+    return {"status": "success", "job": _job.status}
+
+
+def job_status() -> dict:
+    if _job is None:
+        return {"status": "success", "job": None}
+    return {"status": "success", "job": _job.status}
+
+
+def stop_job() -> dict:
+    if _job is not None:
+        _job.stop()
+    return job_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed every book collection with a new model")
+    parser.add_argument("--model", help="SentenceTransformer model name")
+    parser.add_argument("--stamp-legacy", action="store_true", help=f"Stamp unversioned collections as {DEFAULT_EMBEDDING_MODEL}")
+    parser.add_argument("--book", action="append", help="Only re-embed this book ID (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--chunks-per-second", type=float, default=0, help="0 disables throttling")
+    parser.add_argument("--drop-old", action="store_true", help="Delete the previous collection after switching")
+    args = parser.parse_args()
+
+    if args.stamp_legacy:
+        print("Stamped:", stamp_legacy_collections())
+    if not args.model:
+        return
+
+    job = ReembedJob(
+        args.model,
+        book_ids=args.book,
+        batch_size=args.batch_size,
+        chunks_per_second=args.chunks_per_second,
+        drop_old=args.drop_old
+    )
+    job.run()
+    print(job.status)
+
+
+if __name__ == "__main__":
+    main()
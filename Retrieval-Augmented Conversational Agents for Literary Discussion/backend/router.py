@@ -0,0 +1,95 @@
+"""
+Thin router in front of sharded chat nodes.
+
+    SHARD_URLS=http://node0:8000,http://node1:8000 uvicorn router:app --port 8080
+
+Book-scoped requests go to the node that owns the book (see sharding.py); each
+node must run with SHARD_COUNT equal to the number of URLs and SHARD_INDEX equal
+to its position in the list. /search-content fans out to every shard and merges.
+"""
+import os
+import requests
+from fastapi import FastAPI, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sharding import shard_for
+
+SHARD_URLS = [url.rstrip("/") for url in os.getenv("SHARD_URLS", "http://localhost:8000").split(",") if url]
+ROUTER_TIMEOUT = float(os.getenv("ROUTER_TIMEOUT", "120"))
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def shard_url(book_id: str) -> str:
+    return SHARD_URLS[shard_for(book_id, len(SHARD_URLS))]
+
+
+def forward(method: str, base_url: str, path: str, params=None, payload=None):
+    try:
+        response = requests.request(method, f"{base_url}{path}", params=params, json=payload, timeout=ROUTER_TIMEOUT)
+        return JSONResponse(status_code=response.status_code, content=response.json())
+    except (requests.RequestException, ValueError) as e:
+        return JSONResponse(status_code=502, content={"status": "error", "message": f"Shard {base_url} failed: {str(e)}"})
+
+
+@app.get("/shards")
+def list_shards():
+    shards = []
+    for index, url in enumerate(SHARD_URLS):
+        try:
+            info = requests.get(f"{url}/shard", timeout=5).json()
+            healthy = info.get("shard_index") == index and info.get("shard_count") == len(SHARD_URLS)
+        except (requests.RequestException, ValueError) as e:
+            info, healthy = {"error": str(e)}, False
+        shards.append({"index": index, "url": url, "healthy": healthy, "reported": info})
+    return {"shards": shards}
+
+
+@app.get("/search-books")
+def search_books(q: str = Query(...)):
+    # Google Books search holds no per-book state; any node can answer
+    return forward("GET", SHARD_URLS[0], "/search-books", params={"q": q})
+
+
+@app.get("/search-content")
+def search_content(q: str = Query(...), books: int = Query(5, ge=1, le=50), passages: int = Query(3, ge=1, le=10)):
+    merged, errors = [], []
+    for url in SHARD_URLS:
+        try:
+            data = requests.get(
+                f"{url}/search-content",
+                params={"q": q, "books": books, "passages": passages},
+                timeout=ROUTER_TIMEOUT
+            ).json()
+        except (requests.RequestException, ValueError) as e:
+            errors.append(f"{url}: {str(e)}")
+            continue
+        if data.get("status") == "error":
+            errors.append(f"{url}: {data.get('message')}")
+        merged.extend(data.get("results", []))
+    merged.sort(key=lambda book: book["score"])
+    result = {"status": "success", "query": q, "results": merged[:books]}
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+@app.api_route("/books/{action}", methods=["GET", "POST"])
+def route_book(action: str, request: Request, book_id: str = Query(...)):
+    return forward(request.method, shard_url(book_id), f"/books/{action}", params=dict(request.query_params))
+
+
+@app.post("/chat/query")
+def route_chat(payload: dict):
+    book_id = payload.get("book_id")
+    if not book_id:
+        return JSONResponse(status_code=422, content={"status": "error", "message": "book_id is required"})
+    return forward("POST", shard_url(book_id), "/chat/query", payload=payload)
@@ -0,0 +1,41 @@
+"""
+Book-ID hash sharding across chat nodes.
+
+Each node serves the books that hash to its shard:
+
+    SHARD_INDEX=1 SHARD_COUNT=4 uvicorn main:app
+
+and router.py sends every book-scoped request to the node that owns the book.
+The hash is stable across processes and machines (not Python's salted hash()),
+so nodes and the router always agree. Changing SHARD_COUNT moves books between
+shards; rebalance by restoring a snapshot on each node with --shard I/N.
+"""
+import os
+import hashlib
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+
+
+def shard_for(book_id: str, shard_count: int = SHARD_COUNT) -> int:
+    """The shard that owns a book, in [0, shard_count)."""
+    if shard_count <= 1:
+        return 0
+    digest = hashlib.sha1(book_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def owns_book(book_id: str, shard_index: int = SHARD_INDEX, shard_count: int = SHARD_COUNT) -> bool:
+    return shard_for(book_id, shard_count) == shard_index
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse an "I/N" shard spec, e.g. "0/4"."""
+    index, count = (int(part) for part in spec.split("/", 1))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}: expected I/N with 0 <= I < N")
+    return index, count
+
+
+def shard_info() -> dict:
+    return {"shard_index": SHARD_INDEX, "shard_count": SHARD_COUNT}
@@ -0,0 +1,284 @@
+"""
+Versioned snapshots of the vectorstore and content store, for bringing up chat nodes.
+
+A snapshot is a tar.gz holding every collection's stored vectors, documents and
+metadata, the book content under data/, the alias map and a manifest with
+counts and SHA-256 checksums. Restoring loads the stored vectors directly, so
+a new node comes up without re-fetching or re-encoding anything.
+
+    python snapshot.py create [--out snapshots/] [--shard I/N]
+    python snapshot.py restore snapshots/snapshot-20250101T000000Z.tar.gz [--shard I/N] [--force]
+    python snapshot.py inspect snapshots/snapshot-20250101T000000Z.tar.gz
+
+Each collection is read in pages and re-read if its count changes while it is
+being copied, so every collection in the archive is internally consistent.
+Pause preparation (or stop the service) for a snapshot that is consistent
+across books as well. Restore into a stopped node.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tarfile
+import argparse
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import chromadb
+from embedding_function import DEFAULT_EMBEDDING_MODEL, GLOBAL_INDEX_NAME, get_embedding_function
+from maintenance import (
+    DATA_DIR,
+    ALIASES_PATH,
+    COPY_BATCH_SIZE,
+    get_client,
+    collection_names,
+    load_aliases,
+    format_bytes,
+)
+from sharding import shard_for, parse_shard
+
+FORMAT_VERSION = 1
+SNAPSHOT_DIR = os.path.join(os.path.dirname(DATA_DIR), "snapshots")
+MAX_READ_ATTEMPTS = 3
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def book_of(collection_name: str) -> str:
+    return collection_name.split("__", 1)[0]
+
+
+def in_shard(book_id: str, shard) -> bool:
+    return shard is None or shard_for(book_id, shard[1]) == shard[0]
+
+
+def read_collection(collection, shard=None) -> dict:
+    """All records of a collection, retried if a writer changes it mid-read."""
+    for _ in range(MAX_READ_ATTEMPTS):
+        total = collection.count()
+        ids, documents, metadatas, embeddings = [], [], [], []
+        for offset in range(0, total, COPY_BATCH_SIZE):
+            batch = collection.get(
+                limit=COPY_BATCH_SIZE,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            ids.extend(batch["ids"])
+            documents.extend(batch["documents"])
+            metadatas.extend(batch["metadatas"])
+            embeddings.extend(batch["embeddings"])
+        if collection.count() == total and len(ids) == total:
+            break
+    else:
+        raise RuntimeError(f"Collection {collection.name} kept changing while being read; pause writes and retry")
+
+    if shard is not None and book_of(collection.name) == GLOBAL_INDEX_NAME:
+        keep = [i for i, m in enumerate(metadatas) if in_shard((m or {}).get("book_id", ""), shard)]
+        ids = [ids[i] for i in keep]
+        documents = [documents[i] for i in keep]
+        metadatas = [metadatas[i] for i in keep]
+        embeddings = [embeddings[i] for i in keep]
+
+    return {
+        "ids": ids,
+        "documents": documents,
+        "metadatas": metadatas,
+        "embeddings": np.asarray(embeddings, dtype=np.float32)
+    }
+
+
+def create_snapshot(out_dir: str = SNAPSHOT_DIR, shard=None) -> str:
+    """Write a snapshot archive and return its path."""
+    started = time.perf_counter()
+    client = get_client()
+    aliases = load_aliases()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    suffix = f"-shard{shard[0]}of{shard[1]}" if shard else ""
+    os.makedirs(out_dir, exist_ok=True)
+    archive_path = os.path.join(out_dir, f"snapshot-{stamp}{suffix}.tar.gz")
+
+    with tempfile.TemporaryDirectory() as staging:
+        collections = []
+        for name in collection_names(client):
+            book_id = book_of(name)
+            if book_id != GLOBAL_INDEX_NAME and not in_shard(book_id, shard):
+                continue
+            collection = client.get_collection(name=name)
+            records = read_collection(collection, shard)
+            target = os.path.join(staging, "collections", name)
+            os.makedirs(target)
+            np.save(os.path.join(target, "embeddings.npy"), records["embeddings"])
+            with open(os.path.join(target, "records.json"), "w") as f:
+                json.dump({k: records[k] for k in ("ids", "documents", "metadatas")}, f)
+            collections.append({
+                "name": name,
+                "book_id": book_id,
+                "metadata": collection.metadata or {},
+                "count": len(records["ids"]),
+                "dim": int(records["embeddings"].shape[1]) if len(records["ids"]) else None
+            })
+            print(f"Captured {name}: {len(records['ids'])} chunks")
+
+        books = []
+        if os.path.isdir(DATA_DIR):
+            for book_id in sorted(os.listdir(DATA_DIR)):
+                source = os.path.join(DATA_DIR, book_id)
+                if os.path.isdir(source) and in_shard(book_id, shard):
+                    shutil.copytree(source, os.path.join(staging, "data", book_id))
+                    books.append(book_id)
+
+        files = {}
+        for root, _, names in os.walk(staging):
+            for file_name in names:
+                path = os.path.join(root, file_name)
+                files[os.path.relpath(path, staging)] = sha256_file(path)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "chroma_version": chromadb.__version__,
+            "shard": {"index": shard[0], "count": shard[1]} if shard else None,
+            "collections": collections,
+            "books": books,
+            "aliases": {b: n for b, n in aliases.items() if in_shard(b, shard)},
+            "files": files
+        }
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        tmp_path = f"{archive_path}.tmp"
+        with tarfile.open(tmp_path, "w:gz") as tar:
+            tar.add(staging, arcname=".")
+        os.replace(tmp_path, archive_path)
+
+    print(f"✅ Snapshot {archive_path}: {len(collections)} collections, {len(books)} books, "
+          f"{format_bytes(os.path.getsize(archive_path))} in {time.perf_counter() - started:.1f}s")
+    return archive_path
+
+
+def read_manifest(archive_path: str) -> dict:
+    with tarfile.open(archive_path, "r:gz") as tar:
+        return json.load(tar.extractfile("./manifest.json"))
+
+
+def extract_verified(archive_path: str, target: str) -> dict:
+    """Extract an archive and check every file against the manifest checksums."""
+    with tarfile.open(archive_path, "r:gz") as tar:
+        for member in tar.getmembers():
+            path = os.path.normpath(member.name)
+            if path.startswith("..") or os.path.isabs(path) or not (member.isfile() or member.isdir()):
+                raise ValueError(f"Refusing unsafe archive member: {member.name}")
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(target, filter="data")
+        else:
+            tar.extractall(target)
+
+    with open(os.path.join(target, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Snapshot format {manifest['format_version']} is newer than supported ({FORMAT_VERSION})")
+    for rel_path, expected in manifest["files"].items():
+        if sha256_file(os.path.join(target, rel_path)) != expected:
+            raise ValueError(f"Checksum mismatch for {rel_path}; snapshot is corrupt")
+    return manifest
+
+
+def restore_snapshot(archive_path: str, shard=None, force: bool = False) -> dict:
+    """Load a snapshot into this node's vectorstore and content store."""
+    started = time.perf_counter()
+    client = get_client()
+    existing = set(collection_names(client))
+
+    with tempfile.TemporaryDirectory() as staging:
+        manifest = extract_verified(archive_path, staging)
+        wanted = [
+            c for c in manifest["collections"]
+            if c["book_id"] == GLOBAL_INDEX_NAME or in_shard(c["book_id"], shard)
+        ]
+        clashes = sorted(existing & {c["name"] for c in wanted})
+        if clashes and not force:
+            raise RuntimeError(f"{len(clashes)} collections already exist (e.g. {clashes[0]}); use --force to replace them")
+
+        restored_chunks = 0
+        for entry in wanted:
+            name = entry["name"]
+            if name in existing:
+                client.delete_collection(name=name)
+            collection = client.create_collection(
+                name=name,
+                metadata=entry["metadata"] or None,
+                embedding_function=get_embedding_function(
+                    (entry["metadata"] or {}).get("embedding_model", DEFAULT_EMBEDDING_MODEL)
+                )
+            )
+            source = os.path.join(staging, "collections", name)
+            embeddings = np.load(os.path.join(source, "embeddings.npy"))
+            with open(os.path.join(source, "records.json"), "r") as f:
+                records = json.load(f)
+
+            keep = range(len(records["ids"]))
+            if shard is not None and entry["book_id"] == GLOBAL_INDEX_NAME:
+                keep = [i for i, m in enumerate(records["metadatas"]) if in_shard((m or {}).get("book_id", ""), shard)]
+            keep = list(keep)
+            for start in range(0, len(keep), COPY_BATCH_SIZE):
+                rows = keep[start:start + COPY_BATCH_SIZE]
+                collection.add(
+                    ids=[records["ids"][i] for i in rows],
+                    documents=[records["documents"][i] for i in rows],
+                    metadatas=[records["metadatas"][i] for i in rows],
+                    embeddings=embeddings[rows].tolist()
+                )
+            restored_chunks += len(keep)
+            print(f"Restored {name}: {len(keep)} chunks")
+
+        books = [b for b in manifest["books"] if in_shard(b, shard)]
+        for book_id in books:
+            shutil.copytree(os.path.join(staging, "data", book_id), os.path.join(DATA_DIR, book_id), dirs_exist_ok=True)
+
+        aliases = dict(load_aliases())
+        aliases.update({b: n for b, n in manifest["aliases"].items() if in_shard(b, shard)})
+        tmp_path = f"{ALIASES_PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(aliases, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, ALIASES_PATH)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Restored {len(wanted)} collections ({restored_chunks} chunks) and {len(books)} books in {elapsed:.1f}s")
+    return {"collections": len(wanted), "chunks": restored_chunks, "books": len(books), "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorstore snapshot and restore")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create_parser = sub.add_parser("create", help="Write a snapshot archive")
+    create_parser.add_argument("--out", default=SNAPSHOT_DIR)
+    create_parser.add_argument("--shard", help="Only include books owned by shard I/N")
+    restore_parser = sub.add_parser("restore", help="Load a snapshot into this node (service stopped)")
+    restore_parser.add_argument("archive")
+    restore_parser.add_argument("--shard", help="Only restore books owned by shard I/N")
+    restore_parser.add_argument("--force", action="store_true", help="Replace collections that already exist")
+    inspect_parser = sub.add_parser("inspect", help="Print a snapshot's manifest summary")
+    inspect_parser.add_argument("archive")
+    args = parser.parse_args()
+
+    shard = parse_shard(args.shard) if getattr(args, "shard", None) else None
+    if args.command == "create":
+        create_snapshot(args.out, shard)
+    elif args.command == "restore":
+        restore_snapshot(args.archive, shard, force=args.force)
+    else:
+        manifest = read_manifest(args.archive)
+        manifest.pop("files")
+        manifest["collections"] = {c["name"]: c["count"] for c in manifest["collections"]}
+        print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
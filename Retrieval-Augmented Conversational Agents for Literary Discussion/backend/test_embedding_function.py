@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+
+import pytest
+
+from embedding_function import EmbeddingMismatchError, check_query_compatible
+
+
+def collection(metadata):
+    return SimpleNamespace(name="book", metadata=metadata)
+
+
+def test_query_with_the_collection_dimension_passes():
+    check_query_compatible(collection({"embedding_model": "m", "embedding_dim": 3}), [[0.1, 0.2, 0.3]])
+
+
+def test_query_with_another_dimension_is_refused():
+    with pytest.raises(EmbeddingMismatchError, match="3-d vectors, query has 2"):
+        check_query_compatible(collection({"embedding_dim": 3}), [[0.1, 0.2]])
+
+
+def test_legacy_collections_without_a_dimension_are_not_checked():
+    check_query_compatible(collection(None), [[0.1, 0.2]])
@@ -0,0 +1,68 @@
+from fastapi.testclient import TestClient
+
+import main
+import query_engine
+
+client = TestClient(main.app)
+
+METADATA = {"title": "Jane Eyre", "authors": ["Charlotte Brontë"], "publishedDate": "1847"}
+
+
+def no_retrieval(book_id):
+    raise AssertionError("metadata questions should not touch the vector store")
+
+
+def test_chat_query_answers_metadata_questions_from_request_metadata(monkeypatch):
+    monkeypatch.setattr(main, "match_faq", lambda book_id, question: None)
+    monkeypatch.setattr(query_engine, "ready_collection", no_retrieval)
+    before = query_engine.router_stats()["routes"]["metadata"]["count"]
+
+    response = client.post("/chat/query", json={
+        "book_id": "test-book", "question": "Who wrote this book?", "history": [], "metadata": METADATA
+    })
+
+    body = response.json()
+    assert body["status"] == "success"
+    assert body["source"] == "metadata"
+    assert body["response"] == "Jane Eyre was written by Charlotte Brontë."
+    assert query_engine.router_stats()["routes"]["metadata"]["count"] == before + 1
+
+
+def test_chat_query_without_metadata_falls_through_to_retrieval(monkeypatch):
+    monkeypatch.setattr(main, "match_faq", lambda book_id, question: None)
+    monkeypatch.setattr(query_engine, "ready_collection", lambda book_id: None)
+
+    response = client.post("/chat/query", json={"book_id": "test-book", "question": "Who wrote this book?"})
+
+    assert response.json()["source"] == "error"
+
+
+def refuse_shard(monkeypatch, stubbed: str, result=None) -> list:
+    """Make this node own no books and record calls to main.<stubbed>, which returns `result`."""
+    calls = []
+    monkeypatch.setattr(main, "owns_book", lambda book_id: False)
+    monkeypatch.setattr(main, stubbed, lambda *args: calls.append(args) or result)
+    return calls
+
+
+def assert_misrouted(body: dict):
+    assert body["status"] == "error"
+    assert f"shard {main.shard_for('test-book')} of {main.SHARD_COUNT}" in body["message"]
+
+
+def test_check_book_refuses_books_of_other_shards(monkeypatch):
+    calls = refuse_shard(monkeypatch, "ensure_vectors_exist", True)
+
+    body = client.get("/books/check", params={"book_id": "test-book"}).json()
+
+    assert_misrouted(body)
+    assert calls == []
+
+
+def test_prepare_faq_refuses_books_of_other_shards(monkeypatch):
+    calls = refuse_shard(monkeypatch, "build_faq_pack")
+
+    body = client.post("/books/faq", params={"book_id": "test-book", "book_title": "Jane Eyre"}).json()
+
+    assert_misrouted(body)
+    assert calls == []
@@ -0,0 +1,40 @@
+import pytest
+
+from query_engine import answer_from_metadata, classify_question
+
+METADATA = {
+    "title": "Dune", "authors": ["Frank Herbert"], "publishedDate": "1965",
+    "publisher": "Chilton Books", "page_count": 412, "categories": ["Fiction"]
+}
+
+
+@pytest.mark.parametrize("question, route", [
+    ("Who wrote this book?", "metadata:authors"),
+    ("When was the book published?", "metadata:published"),
+    ("Who published Dune?", "metadata:publisher"),
+    ("How many pages does it have?", "metadata:page_count"),
+    ("What genre is it?", "metadata:categories"),
+    ("Who is Paul's mother?", "factoid"),
+    ("Where does the story start?", "factoid"),
+    ("Why does Paul drink the water of life?", "open"),
+    ("Who are the main characters?", "open"),
+    ("Explain the ending", "open"),
+])
+def test_classify_question(question, route):
+    assert classify_question(question) == route
+
+
+@pytest.mark.parametrize("field, answer", [
+    ("authors", "Dune was written by Frank Herbert."),
+    ("published", "Dune was published in 1965."),
+    ("publisher", "Dune was published by Chilton Books."),
+    ("page_count", "Dune has 412 pages."),
+    ("categories", "Dune is categorised as Fiction."),
+])
+def test_answer_from_metadata(field, answer):
+    assert answer_from_metadata(field, METADATA) == answer
+
+
+def test_answer_from_metadata_needs_the_field():
+    assert answer_from_metadata("authors", None) is None
+    assert answer_from_metadata("publisher", {"title": "Dune"}) is None
@@ -1,12 +1,9 @@
-from embedder import chroma_client
+from embedder import get_book_collection, query_collection
 
 
 
-collection = chroma_client.get_or_create_collection(name="gCtazG4ZXlQC")
+collection = get_book_collection("gCtazG4ZXlQC")
 
-results = collection.query(
-    query_texts=["Who is the main character?"],
-    n_results=3
-)
+results = query_collection(collection, "Who is the main character?", n_results=3)
 
 print(results["documents"][0])
\ No newline at end of file
@@ -102,6 +102,11 @@ const BookChat = () => {
           history: messages.map(
             (m) => `${m.role === "user" ? "User" : "Bot"}: ${m.content}`
           ),
+          metadata: {
+            title: bookData.title,
+            authors: bookData.authors,
+            description: bookData.description,
+          },
         }
       );
 
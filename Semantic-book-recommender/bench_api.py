@@ -0,0 +1,75 @@
+"""
+Throughput of the recommendation API for batch sizes 1 through 256.
+
+Each batch size sends the same number of queries, either as that many
+single /recommend calls (batch size 1) or through /recommend/batch, and
+reports queries per second and per-request latency. Runs the app in-process
+with FastAPI's TestClient unless --url points at a running server.
+
+    python bench_api.py [--queries 512] [--url http://localhost:8001]
+"""
+import time
+import argparse
+import numpy as np
+
+from bench_recommend import QUERIES
+
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+TONES = ["All", "Happy", "Suspenseful", "Sad"]
+
+
+def make_client(url: str):
+    if url:
+        import httpx
+        return httpx.Client(base_url=url, timeout=300)
+    from fastapi.testclient import TestClient
+    from recommend_api import app
+    return TestClient(app)
+
+
+def make_requests(count: int) -> list[dict]:
+    # Vary the wording so a response cache anywhere in the path can't serve repeats
+    return [
+        {"query": f"{QUERIES[i % len(QUERIES)]} ({i})", "tone": TONES[i % len(TONES)]}
+        for i in range(count)
+    ]
+
+
+def run(client, requests: list[dict], batch_size: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for start in range(0, len(requests), batch_size):
+        batch = requests[start:start + batch_size]
+        sent = time.perf_counter()
+        if batch_size == 1:
+            response = client.post("/recommend", json=batch[0])
+        else:
+            response = client.post("/recommend/batch", json={"requests": batch})
+        response.raise_for_status()
+        latencies.append(1000 * (time.perf_counter() - sent))
+    elapsed = time.perf_counter() - started
+    return {
+        "qps": len(requests) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommendation API throughput benchmark")
+    parser.add_argument("--queries", type=int, default=512, help="Queries sent per batch size")
+    parser.add_argument("--url", help="Base URL of a running recommend_api server (default: in-process)")
+    args = parser.parse_args()
+
+    client = make_client(args.url)
+    requests = make_requests(args.queries)
+    run(client, requests[:8], 8)  # warm up the encoder and index
+    print(f"{args.queries} queries per batch size")
+    print(f"{'batch':>6} {'queries/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for batch_size in BATCH_SIZES:
+        row = run(client, requests, batch_size)
+        print(f"{batch_size:>6} {row['qps']:>10.1f} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Startup time and memory of the dashboard catalog: CSV vs memory-mapped Arrow.
+
+Starts --workers processes per mode, the way several dashboard workers would
+run on one machine. Each loads the catalog as the recommender does (old: parse
+the whole CSV and build the display columns; new: catalog.load_catalog with
+only the columns the recommender reads) and, once all are loaded, reports
+from /proc/self/smaps_rollup:
+
+    rss        resident pages, counting shared ones in full
+    pss        resident pages with shared ones split between the processes mapping them
+    anon       private heap, which cannot be shared
+
+    python bench_catalog.py [--workers 4] [--scale 20]
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+
+STARTED = time.perf_counter()
+
+import numpy as np
+import pandas as pd
+
+from catalog import CSV_PATH, DISPLAY_COLUMNS, add_display_columns, build_catalog, load_catalog
+from emotion_scoring import EMOTION_LABELS
+
+IMPORTED = time.perf_counter()
+
+
+def memory_mb() -> dict:
+    fields = {"Rss:": "rss", "Pss:": "pss", "Anonymous:": "anon"}
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in fields:
+                usage[fields[parts[0]]] = int(parts[1]) / 1024
+    return usage
+
+
+def child(mode: str, csv_path: str, arrow_path: str) -> None:
+    loaded = time.perf_counter()
+    if mode == "csv":
+        books = add_display_columns(pd.read_csv(csv_path)).drop_duplicates("isbn13")
+    else:
+        books = load_catalog(DISPLAY_COLUMNS + EMOTION_LABELS, csv_path, arrow_path)
+    books_by_isbn = books.set_index("isbn13", drop=False)
+    tone_scores = {column: books_by_isbn[column].to_numpy(dtype=np.float32) for column in EMOTION_LABELS}
+    # Touch the captions, as serving requests eventually would
+    total_chars = int(books_by_isbn["caption"].str.len().sum())
+    load_ms = 1000 * (time.perf_counter() - loaded)
+    startup_ms = 1000 * (time.perf_counter() - STARTED)
+    print(f"ready {load_ms:.1f} {startup_ms:.1f} {len(books_by_isbn)} {total_chars} {len(tone_scores)}", flush=True)
+    sys.stdin.readline()
+    usage = memory_mb()
+    print(f"mem {usage['rss']:.1f} {usage['pss']:.1f} {usage['anon']:.1f}", flush=True)
+    sys.stdin.readline()
+
+
+def run_workers(mode: str, workers: int, csv_path: str, arrow_path: str) -> dict:
+    procs = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--child", mode, "--csv", csv_path, "--arrow", arrow_path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(workers)
+    ]
+    ready = [proc.stdout.readline().split() for proc in procs]
+    # Measure only once every worker holds its catalog, so shared pages are split between them
+    for proc in procs:
+        proc.stdin.write("measure\n")
+        proc.stdin.flush()
+    usage = [proc.stdout.readline().split() for proc in procs]
+    for proc in procs:
+        proc.stdin.write("exit\n")
+        proc.stdin.flush()
+        proc.wait()
+    return {
+        "load_ms": float(np.median([float(r[1]) for r in ready])),
+        "startup_ms": float(np.median([float(r[2]) for r in ready])),
+        "books": int(ready[0][3]),
+        "rss": float(np.mean([float(u[1]) for u in usage])),
+        "pss": float(np.mean([float(u[2]) for u in usage])),
+        "anon": float(np.mean([float(u[3]) for u in usage])),
+        "pss_total": float(np.sum([float(u[2]) for u in usage])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog startup and memory benchmark")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--arrow")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the catalog N times to test larger files")
+    parser.add_argument("--child", choices=["csv", "arrow"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.csv, args.arrow)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_catalog_")
+    csv_path = args.csv
+    if args.scale > 1:
+        books = pd.read_csv(args.csv)
+        books = pd.concat([books.assign(isbn13=books["isbn13"] + i * 10**13) for i in range(args.scale)])
+        csv_path = os.path.join(workdir, "books.csv")
+        books.to_csv(csv_path, index=False)
+    arrow_path = os.path.join(workdir, "books.arrow")
+    started = time.perf_counter()
+    build_catalog(csv_path, arrow_path)
+    print(f"Arrow conversion: {time.perf_counter() - started:.2f}s, "
+          f"{os.path.getsize(csv_path) / 1e6:.1f} MB CSV -> {os.path.getsize(arrow_path) / 1e6:.1f} MB Arrow")
+    print(f"Imports: {1000 * (IMPORTED - STARTED):.0f} ms (both modes)")
+
+    print(f"{args.workers} workers per mode; memory columns are per-worker means in MB")
+    print(f"{'mode':<6} {'books':>7} {'load ms':>9} {'startup ms':>11} {'rss':>8} {'pss':>8} {'anon':>8} {'pss total':>10}")
+    for mode in ("csv", "arrow"):
+        row = run_workers(mode, args.workers, csv_path, arrow_path)
+        print(f"{mode:<6} {row['books']:>7} {row['load_ms']:>9.1f} {row['startup_ms']:>11.1f} {row['rss']:>8.1f} "
+              f"{row['pss']:>8.1f} {row['anon']:>8.1f} {row['pss_total']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency of numeric range filters at several selectivities.
+
+For each target share of the catalog, a `num_pages` range matching that
+share is timed three ways: a pandas scan of the column (what filtering the
+DataFrame per request costs), building the bitmap from the sorted column,
+and the cached bitmap plus the test of 50 vector candidates. --scale tiles the
+catalog's values to time these at a larger catalog size.
+
+Then filtered recommendations are timed end to end with pre-encoded queries.
+Each row reports how many of the 16 slots were filled, next to the old
+approach of filtering an unfiltered top 50, which comes back short for
+selective filters.
+
+    python bench_filters.py [--shares 0.5 0.2 0.05 0.01 0.002] [--scale 20] [--repeat 3]
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from bench_recommend import QUERIES
+from numeric_filters import NumericFilters, bitmap_count, contains
+from recommender import books_by_isbn, embed_queries, nearest_books, numeric_filters, retrieve_semantic_recommendations
+
+COLUMN = "num_pages"
+
+
+def share_range(values: np.ndarray, share: float) -> tuple:
+    """(low, high) around the median covering roughly `share` of the values."""
+    return tuple(np.nanquantile(values, [0.5 - share / 2, 0.5 + share / 2]).tolist())
+
+
+def timed(function, repeat: int) -> float:
+    """Median microseconds per call."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return 1e6 * float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Numeric filter benchmark")
+    parser.add_argument("--shares", type=float, nargs="+", default=[0.5, 0.2, 0.05, 0.01, 0.002])
+    parser.add_argument("--scale", type=int, default=20, help="Catalog copies for the filter-only timings")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    scaled = pd.DataFrame({COLUMN: np.tile(books_by_isbn[COLUMN].to_numpy(dtype=float), args.scale)})
+    scaled_filters = NumericFilters(scaled)
+    candidates = rng.integers(0, len(scaled), 50)
+    print(f"Filter only, {len(scaled)} books ({args.scale}x catalog), {COLUMN} ranges, median of {args.repeat * 20} calls")
+    print(f"{'share':>7} {'matching':>9} {'pandas scan us':>15} {'sorted->bitmap us':>18} {'cached+50 test us':>18}")
+    for share in args.shares:
+        low, high = share_range(scaled[COLUMN].to_numpy(), share)
+        scan = timed(lambda: scaled[COLUMN].between(low, high).to_numpy()[candidates], args.repeat * 20)
+        build = timed(lambda: scaled_filters._bitmap(COLUMN, low, high), args.repeat * 20)
+        scaled_filters.bitmap(COLUMN, low, high)
+        cached = timed(lambda: contains(scaled_filters.bitmap(COLUMN, low, high), candidates), args.repeat * 20)
+        matching = bitmap_count(scaled_filters.bitmap(COLUMN, low, high))
+        print(f"{share:>7.3f} {matching:>9} {scan:>15.1f} {build:>18.1f} {cached:>18.1f}")
+
+    embeddings = embed_queries(QUERIES)
+    print(f"\nEnd to end, {len(books_by_isbn)} books, {len(QUERIES)} pre-encoded queries x {args.repeat}")
+    print(f"{'share':>7} {'matching':>9} {'p50 ms':>8} {'p99 ms':>8} {'filled':>7} {'old filled':>11}")
+    unfiltered = [
+        timed(lambda: retrieve_semantic_recommendations(query, query_embedding=embedding), 1)
+        for _ in range(args.repeat) for query, embedding in zip(QUERIES, embeddings)
+    ]
+    print(f"{'none':>7} {len(books_by_isbn):>9} {np.percentile(unfiltered, 50) / 1000:>8.2f} "
+          f"{np.percentile(unfiltered, 99) / 1000:>8.2f} {16:>7.1f} {16:>11.1f}")
+    values = books_by_isbn[COLUMN].to_numpy(dtype=float)
+    for share in args.shares:
+        filters = {COLUMN: share_range(values, share)}
+        allowed = numeric_filters.mask(filters)
+        latencies, filled, old_filled = [], [], []
+        for _ in range(args.repeat):
+            for query, embedding in zip(QUERIES, embeddings):
+                started = time.perf_counter()
+                results = retrieve_semantic_recommendations(query, query_embedding=embedding, filters=filters)
+                latencies.append(1000 * (time.perf_counter() - started))
+                filled.append(len(results))
+                positions, _ = nearest_books(embedding, 50)
+                old_filled.append(min(16, int(contains(allowed, positions).sum())))
+        print(f"{share:>7.3f} {bitmap_count(allowed):>9} {np.percentile(latencies, 50):>8.2f} "
+              f"{np.percentile(latencies, 99):>8.2f} {np.mean(filled):>7.1f} {np.mean(old_filled):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Recall vs latency of vector index options for the recommender.
+
+Runs one fixed query set against the catalog embeddings with:
+
+    exact      float32 brute force in NumPy (the ground truth)
+    float16    half-precision vectors, upcast block by block at query time
+    int8       per-dimension scalar quantisation
+    binary     1 bit per dimension, Hamming top-R candidates reranked with the int8 codes
+    hnsw       Chroma's HNSW (what the dashboard uses) for several M / ef_search settings
+
+and reports recall@k against exact search, p50/p99 latency per query, build
+time and index memory. Each search fetches --fetch results, as the dashboard's
+`similarity_search(query, k=50)` does; recall is measured on the first k.
+
+Embeddings come from the persisted vector index (vectorstore/), or are random
+with --synthetic N. Queries are fixed-seed midpoints of two catalog books, so
+they sit between items like a free-text query does rather than on top of one.
+
+    python bench_index.py [--queries 200] [--k 16] [--fetch 50] [--output bench_index.csv]
+"""
+import os
+import time
+import shutil
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+from numeric_filters import popcount
+from similar_books import normalise
+
+HNSW_M = [8, 16, 32]
+HNSW_EF_SEARCH = [16, 32, 64, 128]
+HNSW_EF_CONSTRUCTION = 100
+BINARY_RERANK = 4
+BLOCK_ROWS = 8192
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(scores, len(scores) - k)[-k:]
+    return top[np.argsort(-scores[top])]
+
+
+class Exact:
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        return top_k(self.vectors @ query, k)
+
+    def memory(self) -> int:
+        return self.vectors.nbytes
+
+
+class Float16(Exact):
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors.astype(np.float16)
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        # NumPy has no half-precision BLAS, so blocks are upcast before the product
+        scores = np.concatenate([
+            self.vectors[start:start + BLOCK_ROWS].astype(np.float32) @ query
+            for start in range(0, len(self.vectors), BLOCK_ROWS)
+        ])
+        return top_k(scores, k)
+
+
+class Int8:
+    """x ~= offset + scale * code per dimension, so q.x ~= (q * scale).code + q.offset."""
+
+    def __init__(self, vectors: np.ndarray):
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        self.scale = np.maximum(high - low, 1e-12) / 255
+        self.offset = low + 128 * self.scale
+        self.codes = np.clip(np.rint((vectors - self.offset) / self.scale), -128, 127).astype(np.int8)
+
+    def scores(self, query: np.ndarray, rows=None) -> np.ndarray:
+        codes = self.codes if rows is None else self.codes[rows]
+        weights = query * self.scale
+        return np.concatenate([
+            codes[start:start + BLOCK_ROWS].astype(np.float32) @ weights
+            for start in range(0, len(codes), BLOCK_ROWS)
+        ]) + query @ self.offset
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        return top_k(self.scores(query), k)
+
+    def memory(self) -> int:
+        return self.codes.nbytes + self.scale.nbytes + self.offset.nbytes
+
+
+class Binary:
+    """Sign bits (relative to the catalog mean) searched by Hamming distance, then int8 rerank."""
+
+    def __init__(self, vectors: np.ndarray, rerank: int = BINARY_RERANK):
+        self.mean = vectors.mean(axis=0)
+        self.bits = np.packbits(vectors > self.mean, axis=1)
+        self.int8 = Int8(vectors)
+        self.rerank = rerank
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        query_bits = np.packbits(query > self.mean)
+        distance = popcount(self.bits ^ query_bits).sum(axis=1, dtype=np.int32)
+        candidates = top_k(-distance, min(len(distance), self.rerank * k))
+        return candidates[top_k(self.int8.scores(query, candidates), k)]
+
+    def memory(self) -> int:
+        return self.bits.nbytes + self.mean.nbytes + self.int8.memory()
+
+
+class ChromaHnsw:
+    def __init__(self, vectors: np.ndarray, m: int, ef_search: int, path: str):
+        import chromadb
+        self.path = path
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.create_collection(
+            "bench_index",
+            configuration={"hnsw": {"space": "ip", "ef_construction": HNSW_EF_CONSTRUCTION,
+                                    "ef_search": ef_search, "max_neighbors": m}},
+            embedding_function=None,
+        )
+        for start in range(0, len(vectors), 1000):
+            stop = min(start + 1000, len(vectors))
+            self.collection.add(ids=[str(i) for i in range(start, stop)], embeddings=vectors[start:stop])
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        result = self.collection.query(query_embeddings=[query], n_results=k, include=[])
+        return np.array(result["ids"][0], dtype=np.int64)
+
+    def memory(self) -> int:
+        # The HNSW segment files (graph links + vectors) are what the server holds in memory
+        total = 0
+        for root, _, files in os.walk(self.path):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files if not f.endswith(".sqlite3"))
+        return total
+
+
+def load_embeddings(synthetic: int, dim: int, seed: int) -> np.ndarray:
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        topics = rng.standard_normal((256, dim)).astype(np.float32)
+        noise = rng.standard_normal((synthetic, dim)).astype(np.float32)
+        return normalise(topics[rng.integers(0, len(topics), synthetic)] + 0.7 * noise)
+    from similar_books import read_store
+    return read_store()[2]
+
+
+def evaluate(index, queries: np.ndarray, truth: np.ndarray, k: int, fetch: int) -> dict:
+    latencies, recall = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = index.search(query, fetch)
+        latencies.append(1000 * (time.perf_counter() - started))
+        recall.append(len(np.intersect1d(found[:k], expected)) / k)
+    return {
+        f"recall@{k}": float(np.mean(recall)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index recall/latency benchmark")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=16)
+    parser.add_argument("--fetch", type=int, default=50)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of the index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the table to this CSV")
+    args = parser.parse_args()
+
+    vectors = load_embeddings(args.synthetic, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed)
+    pairs = rng.integers(0, len(vectors), size=(args.queries, 2))
+    queries = normalise(vectors[pairs[:, 0]] + vectors[pairs[:, 1]])
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, "
+          f"recall@{args.k}, fetching {args.fetch}")
+
+    exact = Exact(vectors)
+    truth = np.array([exact.search(query, args.k) for query in queries])
+    rows = []
+
+    def record(name: str, params: str, index, build_seconds: float):
+        row = {"index": name, "params": params, **evaluate(index, queries, truth, args.k, args.fetch),
+               "build_s": build_seconds, "memory_mb": index.memory() / 1e6}
+        rows.append(row)
+        print(f"  {name:<8} {params:<24} recall {row[f'recall@{args.k}']:.3f}  p50 {row['p50_ms']:.2f} ms  "
+              f"p99 {row['p99_ms']:.2f} ms  build {build_seconds:.2f} s  {row['memory_mb']:.1f} MB")
+
+    for name, params, factory in (
+        ("exact", "float32", lambda: Exact(vectors)),
+        ("float16", "", lambda: Float16(vectors)),
+        ("int8", "per-dim scalar", lambda: Int8(vectors)),
+        ("binary", f"rerank {BINARY_RERANK}k int8", lambda: Binary(vectors)),
+    ):
+        started = time.perf_counter()
+        index = factory()
+        record(name, params, index, time.perf_counter() - started)
+
+    workdir = tempfile.mkdtemp(prefix="bench_index_")
+    try:
+        # ef_search changed with collection.modify() is not applied to an index already loaded,
+        # so each setting gets its own collection
+        for m in HNSW_M:
+            for ef_search in HNSW_EF_SEARCH:
+                started = time.perf_counter()
+                index = ChromaHnsw(vectors, m, ef_search, os.path.join(workdir, f"m{m}_ef{ef_search}"))
+                record("hnsw", f"M={m} ef_search={ef_search}", index, time.perf_counter() - started)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    table = pd.DataFrame(rows)
+    print()
+    print(table.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of the ISBN lookup step in retrieve_semantic_recommendations.
+
+Compares the old path (parse the ISBN out of page_content, then an `isin` scan
+over the whole frame, which also loses similarity order) with the new one
+(`isbn13` metadata, then `.loc` on the ISBN-indexed frame). Vector hits are
+simulated with random catalog ISBNs, so no model or index is needed.
+
+    python bench_lookup.py [--csv books_with_emotions.csv] [--queries 2000] [--k 50]
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from langchain_core.documents import Document
+
+
+def lookup_by_scan(books: pd.DataFrame, recs: list, k: int) -> pd.DataFrame:
+    books_list = [int(rec.page_content.strip('"').split()[0]) for rec in recs]
+    return books[books["isbn13"].isin(books_list)].head(k)
+
+
+def lookup_by_index(books_by_isbn: pd.DataFrame, recs: list, k: int) -> pd.DataFrame:
+    isbns = [rec.metadata["isbn13"] for rec in recs if rec.metadata["isbn13"] in books_by_isbn.index]
+    return books_by_isbn.loc[isbns]
+
+
+def time_per_query(fn, queries) -> list[float]:
+    latencies = []
+    for recs in queries:
+        started = time.perf_counter()
+        fn(recs)
+        latencies.append(1e6 * (time.perf_counter() - started))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ISBN lookup micro-benchmark")
+    parser.add_argument("--csv", default="books_with_emotions.csv")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the catalog N times to test larger frames")
+    args = parser.parse_args()
+
+    books = pd.read_csv(args.csv)
+    if args.scale > 1:
+        copies = [books.assign(isbn13=books["isbn13"] + i * 10**13) for i in range(args.scale)]
+        books = pd.concat(copies, ignore_index=True)
+        # concat leaves Arrow-backed string columns in one chunk per copy; rebuild them contiguous like read_csv
+        books = books.apply(lambda column: pd.array(column.to_numpy(), dtype=column.dtype))
+    books_by_isbn = books.drop_duplicates("isbn13").set_index("isbn13", drop=False)
+
+    rng = np.random.default_rng(0)
+    catalog = books[["isbn13", "tagged_description"]].to_numpy()
+    queries = []
+    for _ in range(args.queries):
+        rows = catalog[rng.choice(len(catalog), size=args.k, replace=False)]
+        queries.append([Document(page_content=text, metadata={"isbn13": int(isbn)}) for isbn, text in rows])
+
+    # Order check: the index path must return hits in similarity order
+    sample = queries[0]
+    in_order = list(lookup_by_index(books_by_isbn, sample, args.k)["isbn13"]) == [d.metadata["isbn13"] for d in sample]
+
+    print(f"{len(books)} books, {args.queries} queries, k={args.k}")
+    print(f"{'path':<28} {'p50 us':>10} {'p99 us':>10} {'mean us':>10}")
+    for name, fn in (
+        ("page_content + isin scan", lambda recs: lookup_by_scan(books, recs, args.k)),
+        ("isbn13 metadata + .loc", lambda recs: lookup_by_index(books_by_isbn, recs, args.k)),
+    ):
+        latencies = time_per_query(fn, queries)
+        print(f"{name:<28} {np.percentile(latencies, 50):>10.1f} {np.percentile(latencies, 99):>10.1f} "
+              f"{np.mean(latencies):>10.1f}")
+    print(f"Index path keeps similarity order: {in_order}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare category/tone retrieval before and after pushing the filter into the vector search.
+
+The old path fetches 50 unfiltered neighbours, filters `simple_categories` in
+pandas and sorts the survivors by the tone column, so narrow categories come
+back short. The new path (recommender.retrieve_semantic_recommendations)
+filters inside the vector query and ranks similarity and tone together.
+
+    python bench_recommend.py [--repeat 3]
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from recommender import TONE_COLUMNS, books, books_by_isbn, db_books, retrieve_semantic_recommendations
+
+QUERIES = [
+    "A story about kindness",
+    "A book to teach children about nature",
+    "A fantasy book with vampires",
+    "A gripping murder mystery set in London",
+    "The history of the Roman empire",
+    "A memoir about overcoming addiction",
+    "A funny novel about family life",
+    "Space exploration and the future of humanity",
+    "A tragic love story during the war",
+    "Poems about loss and grief",
+]
+
+
+def legacy_recommendations(query, category, tone, initial_top_k=50, final_top_k=16) -> pd.DataFrame:
+    recs = db_books.similarity_search(query, k=initial_top_k)
+    isbns = [rec.metadata["isbn13"] for rec in recs if rec.metadata["isbn13"] in books_by_isbn.index]
+    book_recs = books_by_isbn.loc[isbns]
+    if category != "All":
+        book_recs = book_recs[book_recs["simple_categories"] == category].head(final_top_k)
+    else:
+        book_recs = book_recs.head(final_top_k)
+    if tone in TONE_COLUMNS:
+        book_recs = book_recs.sort_values(by=TONE_COLUMNS[tone], ascending=False)
+    return book_recs
+
+
+def run(fn, category, tone, repeat) -> dict:
+    latencies, counts = [], []
+    for _ in range(repeat):
+        for query in QUERIES:
+            started = time.perf_counter()
+            result = fn(query, category, tone)
+            latencies.append(1000 * (time.perf_counter() - started))
+            counts.append(len(result))
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "short": sum(count < 16 for count in counts) / len(counts),
+        "mean_results": float(np.mean(counts)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Category/tone retrieval benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    counts = books["simple_categories"].value_counts()
+    print("Catalog categories: " + ", ".join(f"{c} ({n})" for c, n in counts.items()))
+    print(f"{'category':<24} {'tone':<12} {'path':<8} {'p50 ms':>8} {'p99 ms':>8} {'mean n':>7} {'short':>6}")
+    for category in ["All"] + list(counts.index):
+        for tone in ["All", "Happy", "Suspenseful"]:
+            for name, fn in (("old", legacy_recommendations), ("new", retrieve_semantic_recommendations)):
+                row = run(fn, category, tone, args.repeat)
+                print(f"{category:<24} {tone:<12} {name:<8} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                      f"{row['mean_results']:>7.1f} {100 * row['short']:>5.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Build time, update time and lookup latency of the similar-books graph.
+
+Uses random unit vectors with the index's dimensionality, so no model or
+index is needed. For each catalog size it times a full build, then adds
+--add books and times the incremental update, and checks the update agrees
+with a rebuild.
+
+    python bench_similar.py [--sizes 10000 25000 50000 100000] [--add 500] [--dim 384]
+"""
+import time
+import tempfile
+import argparse
+import numpy as np
+
+from similar_books import NEIGHBOURS, SimilarBooks, build_graph, normalise, save_graph, update_graph
+
+
+def catalog(size: int, dim: int, rng) -> tuple:
+    isbns = np.arange(size, dtype=np.int64) + 9780000000000
+    hashes = np.array([f"h{i}" for i in range(size)])
+    # A few hundred topics, so neighbourhoods look more like real descriptions than pure noise
+    topics = rng.standard_normal((256, dim)).astype(np.float32)
+    embeddings = topics[rng.integers(0, len(topics), size)] + 0.7 * rng.standard_normal((size, dim)).astype(np.float32)
+    return isbns, hashes, normalise(embeddings)
+
+
+def agreement(graph_a: dict, graph_b: dict) -> float:
+    """Mean overlap of the two graphs' neighbour sets, row by row."""
+    overlap = [
+        len(np.intersect1d(a, b)) / len(a)
+        for a, b in zip(graph_a["neighbours"], graph_b["neighbours"])
+    ]
+    return float(np.mean(overlap))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similar-books graph benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 25000, 50000, 100000])
+    parser.add_argument("--add", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--neighbours", type=int, default=NEIGHBOURS)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"N={args.neighbours}, dim={args.dim}, +{args.add} books per update")
+    print(f"{'books':>8} {'build s':>9} {'update s':>9} {'agree':>7} {'graph MB':>9} {'lookup us':>10}")
+    for size in args.sizes:
+        isbns, hashes, embeddings = catalog(size + args.add, args.dim, rng)
+        base = slice(0, size)
+
+        started = time.perf_counter()
+        graph = build_graph(isbns[base], hashes[base], embeddings[base], args.neighbours)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        updated, _ = update_graph(graph, isbns, hashes, embeddings, args.neighbours)
+        update_seconds = time.perf_counter() - started
+        rebuilt = build_graph(isbns, hashes, embeddings, args.neighbours)
+
+        with tempfile.TemporaryDirectory() as path:
+            save_graph(updated, path)
+            similar = SimilarBooks(path)
+            queries = rng.choice(isbns, size=args.lookups).tolist()
+            started = time.perf_counter()
+            for isbn in queries:
+                similar.similar(isbn, 16)
+            lookup_us = 1e6 * (time.perf_counter() - started) / len(queries)
+
+        graph_mb = (updated["neighbours"].nbytes + updated["scores"].nbytes + updated["isbns"].nbytes) / 1e6
+        print(f"{size:>8} {build_seconds:>9.2f} {update_seconds:>9.2f} {agreement(updated, rebuilt):>7.3f} "
+              f"{graph_mb:>9.1f} {lookup_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
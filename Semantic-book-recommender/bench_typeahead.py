@@ -0,0 +1,117 @@
+"""
+Per-keystroke latency and hit rate of the typeahead index.
+
+Builds the index over --size synthetic titles (Zipf-distributed made-up words,
+a pool of author names, log-normal ratings) or over the real catalog with
+--catalog, then types sampled titles one character at a time and times every
+keystroke. Typo queries (one substituted, dropped or swapped letter) exercise
+the fuzzy fallback. A linear scan over the normalised titles is timed on the
+same keystrokes for comparison.
+
+    python bench_typeahead.py [--size 100000] [--samples 1000] [--catalog]
+"""
+import time
+import argparse
+import numpy as np
+
+from typeahead import TypeaheadIndex, normalise
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+SYLLABLES = [c + v for c in "bcdfghklmnprstvwz" for v in "aeiou"] + ["th", "sh", "ch", "st", "er", "an", "or"]
+
+
+def synthetic_catalog(size: int, rng) -> tuple:
+    words = np.unique(["".join(rng.choice(SYLLABLES, rng.integers(1, 4))) for _ in range(30000)])
+    # Zipf-like word frequencies, so some words start thousands of titles like real ones do
+    weights = 1 / np.arange(1, len(words) + 1) ** 0.9
+    weights /= weights.sum()
+    lengths = rng.integers(1, 8, size)
+    title_words = np.char.capitalize(rng.choice(words, size=lengths.sum(), p=weights)).tolist()
+    offsets = np.r_[0, np.cumsum(lengths)].tolist()
+    articles = rng.random(size) < 0.2
+    titles = [
+        ("The " if articles[i] else "") + " ".join(title_words[offsets[i]:offsets[i + 1]])
+        for i in range(size)
+    ]
+    first = np.array(["".join(rng.choice(SYLLABLES, 2)).title() for _ in range(2000)])
+    last = np.array(["".join(rng.choice(SYLLABLES, 3)).title() for _ in range(8000)])
+    authors = np.char.add(np.char.add(rng.choice(first, size), " "), rng.choice(last, size)).tolist()
+    isbns = np.arange(size, dtype=np.int64) + 9780000000000
+    ratings = np.round(rng.lognormal(4, 2, size))
+    return isbns, titles, authors, ratings
+
+
+def typo(text: str, rng) -> str:
+    positions = [i for i, c in enumerate(text) if c.isalpha()]
+    if len(positions) < 4:
+        return text
+    i = positions[rng.integers(1, len(positions) - 1)]
+    kind = rng.integers(3)
+    if kind == 0:
+        return text[:i] + rng.choice(list(LETTERS)) + text[i + 1:]
+    if kind == 1:
+        return text[:i] + text[i + 1:]
+    return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+
+
+def percentiles(latencies: list) -> str:
+    values = 1e6 * np.array(latencies)
+    return f"p50 {np.percentile(values, 50):7.1f} us  p99 {np.percentile(values, 99):7.1f} us  max {values.max():8.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typeahead latency benchmark")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=1000, help="Titles typed per run")
+    parser.add_argument("--max-chars", type=int, default=20, help="Keystrokes typed per title")
+    parser.add_argument("--scan-samples", type=int, default=20, help="Titles typed against the linear scan")
+    parser.add_argument("--catalog", action="store_true", help="Index the real catalog instead")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.catalog:
+        started = time.perf_counter()
+        index = TypeaheadIndex.from_catalog()
+    else:
+        books = synthetic_catalog(args.size, rng)
+        started = time.perf_counter()
+        index = TypeaheadIndex(*books)
+    build_seconds = time.perf_counter() - started
+    print(f"{len(index)} works: built in {build_seconds:.2f}s, {len(index.keys)} prefix keys, "
+          f"{len(index.heavy)} precomputed prefixes, {index.memory() / 1e6:.1f} MB")
+
+    sample = rng.choice(len(index), size=min(args.samples, len(index)), replace=False)
+    keystrokes, found = [], 0
+    for book in sample:
+        query = normalise(index.titles[book])[:args.max_chars]
+        for end in range(1, len(query) + 1):
+            started = time.perf_counter()
+            results = index.search(query[:end], args.k)
+            keystrokes.append(time.perf_counter() - started)
+        found += any(result["isbn13"] == index.isbns[book] for result in results)
+    print(f"prefix keystrokes ({len(keystrokes)}):  {percentiles(keystrokes)}  "
+          f"title found after {args.max_chars} chars: {found / len(sample):.1%}")
+
+    typo_latency, found = [], 0
+    for book in sample:
+        query = typo(normalise(index.titles[book])[:args.max_chars], rng)
+        started = time.perf_counter()
+        results = index.search(query, args.k)
+        typo_latency.append(time.perf_counter() - started)
+        found += any(result["isbn13"] == index.isbns[book] for result in results)
+    print(f"typo queries ({len(typo_latency)}):        {percentiles(typo_latency)}  "
+          f"title found: {found / len(sample):.1%}")
+
+    scan_latency = []
+    for book in sample[:args.scan_samples]:
+        query = normalise(index.titles[book])[:args.max_chars]
+        for end in range(1, len(query) + 1):
+            started = time.perf_counter()
+            [text for text in index.text if text.startswith(query[:end])][:args.k]
+            scan_latency.append(time.perf_counter() - started)
+    print(f"linear scan ({len(scan_latency)}):        {percentiles(scan_latency)}")
+
+
+if __name__ == "__main__":
+    main()
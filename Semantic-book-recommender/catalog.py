@@ -0,0 +1,117 @@
+"""
+Columnar, memory-mapped catalog for the recommender.
+
+books_with_emotions.csv is converted once into an uncompressed Arrow IPC
+(Feather v2) file, with the dashboard's display columns (large_thumbnail,
+caption) precomputed and duplicate ISBNs dropped. Loading memory-maps that
+file and reads only the requested columns. String columns are returned as
+Arrow-backed (pd.ArrowDtype) columns over the mapped pages, so dashboard
+worker processes on one machine share them through the page cache instead of
+each parsing the CSV into a private copy; numeric columns are NumPy views of
+the mapped buffers where they have no missing values.
+
+    python catalog.py build     # also happens automatically when the CSV is newer
+    python catalog.py info
+"""
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import ipc, feather
+
+CSV_PATH = "books_with_emotions.csv"
+ARROW_PATH = "books_with_emotions.arrow"
+# What the dashboard shows; the tone/emotion columns are requested separately
+DISPLAY_COLUMNS = ["isbn13", "simple_categories", "large_thumbnail", "caption"]
+
+
+def format_authors(authors) -> str:
+    """"A", "A and B" or "A, B, and C" from the semicolon-separated authors field."""
+    if pd.isna(authors) or not str(authors):
+        return "Unknown Author"
+    names = str(authors).split(";")
+    if len(names) == 2:
+        return f"{names[0]} and {names[1].strip()}"
+    if len(names) > 2:
+        names = [name.strip() for name in names]
+        return f"{', '.join(names[:-1])}, and {names[-1]}"
+    return names[0].strip() or "Unknown Author"
+
+
+def build_captions(books: pd.DataFrame) -> pd.Series:
+    """Gallery caption per book: "<title> by <authors>: <description>..."."""
+    # Authors repeat across books, so each distinct value is formatted once
+    authors = books["authors"].map({a: format_authors(a) for a in books["authors"].unique()})
+    description = books["description"].fillna("").astype(str).str.split().str.join(" ")
+    description = (description + "...").where(description != "", "No description available.")
+    return books["title"].astype(str) + " by " + authors + ": " + description
+
+
+def add_display_columns(books: pd.DataFrame) -> pd.DataFrame:
+    books["large_thumbnail"] = books["thumbnail"] + "&fife=w800"
+    books["large_thumbnail"] = np.where(
+        books["large_thumbnail"].isna(),
+        "cover-not-found.jpg",
+        books["large_thumbnail"],
+    )
+    books["caption"] = build_captions(books)
+    return books
+
+
+def build_catalog(csv_path: str = CSV_PATH, arrow_path: str = ARROW_PATH) -> int:
+    """Convert the CSV catalog to the Arrow file; returns the number of books written."""
+    books = add_display_columns(pd.read_csv(csv_path).drop_duplicates("isbn13").reset_index(drop=True))
+    if "representative_isbn13" not in books:
+        # Not deduplicated yet (dedup.py): every book is its own work
+        books["representative_isbn13"] = books["isbn13"]
+    table = pa.Table.from_pandas(books, preserve_index=False)
+    tmp_path = f"{arrow_path}.tmp"
+    # Uncompressed, so the mapped pages are the column buffers themselves
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, arrow_path)
+    return len(books)
+
+
+def is_stale(csv_path: str = CSV_PATH, arrow_path: str = ARROW_PATH) -> bool:
+    if not os.path.exists(arrow_path):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(arrow_path)
+
+
+def arrow_strings(arrow_type):
+    """types_mapper for to_pandas: keep strings in Arrow, since converting them builds a Python object per value."""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def load_catalog(columns: list[str] = None, csv_path: str = CSV_PATH, arrow_path: str = ARROW_PATH) -> pd.DataFrame:
+    """Memory-map the Arrow catalog and return only `columns` (all when None), rebuilding it if the CSV is newer."""
+    if is_stale(csv_path, arrow_path):
+        print(f"Converting {csv_path} to {arrow_path}")
+        build_catalog(csv_path, arrow_path)
+    # Reading the whole mapped file is zero-copy; only pages of the selected columns are ever touched.
+    # (feather.read_table(columns=...) copies the selected columns into private memory instead.)
+    table = ipc.open_file(pa.memory_map(arrow_path)).read_all()
+    return (table.select(columns) if columns else table).to_pandas(types_mapper=arrow_strings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the memory-mapped book catalog")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--arrow", default=ARROW_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"Wrote {build_catalog(args.csv, args.arrow)} books to {args.arrow}")
+    else:
+        schema = ipc.open_file(pa.memory_map(args.arrow)).schema
+        print(f"{args.arrow}: {os.path.getsize(args.arrow) / 1e6:.1f} MB, stale: {is_stale(args.csv, args.arrow)}")
+        for field in schema:
+            print(f"  {field.name}: {field.type}")
+
+
+if __name__ == "__main__":
+    main()
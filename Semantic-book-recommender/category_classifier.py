@@ -0,0 +1,169 @@
+"""
+Batched zero-shot Fiction/Nonfiction classifier (the job from text-classification.ipynb).
+
+Books whose Google Books category is in CATEGORY_MAPPING get their simple
+category from it; the rest are classified with one zero-shot pass per
+distinct description. Descriptions are sent to the pipeline in batches, so
+the (description, hypothesis) pairs for many books go through the model
+together. Predictions are cached by model and description hash in
+.category_cache.sqlite, so a rerun only classifies new or edited descriptions.
+
+    python category_classifier.py                        # books_cleaned.csv -> books_with_categories.csv
+    python category_classifier.py --device cpu --batch-size 16
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+import pandas as pd
+
+from emotion_scoring import pick_device
+
+MODEL_NAME = "facebook/bart-large-mnli"
+FICTION_CATEGORIES = ["Fiction", "Nonfiction"]
+INPUT_PATH = "books_cleaned.csv"
+OUTPUT_PATH = "books_with_categories.csv"
+CACHE_PATH = ".category_cache.sqlite"
+
+CATEGORY_MAPPING = {
+    "Fiction": "Fiction",
+    "Juvenile Fiction": "Children's Fiction",
+    "Biography & Autobiography": "Nonfiction",
+    "History": "Nonfiction",
+    "Literary Criticism": "Nonfiction",
+    "Philosophy": "Nonfiction",
+    "Religion": "Nonfiction",
+    "Comics & Graphic Novels": "Fiction",
+    "Drama": "Fiction",
+    "Juvenile Nonfiction": "Children's Nonfiction",
+    "Science": "Nonfiction",
+    "Poetry": "Fiction",
+}
+
+
+def description_hash(text: str) -> str:
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+def open_cache(path: str = CACHE_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS predictions ("
+        "model TEXT NOT NULL, hash TEXT NOT NULL, label TEXT NOT NULL, score REAL NOT NULL, "
+        "PRIMARY KEY (model, hash))"
+    )
+    return conn
+
+
+def cached_predictions(conn: sqlite3.Connection, model_key: str, hashes: list[str]) -> dict:
+    found = {}
+    for start in range(0, len(hashes), 500):
+        batch = hashes[start:start + 500]
+        rows = conn.execute(
+            f"SELECT hash, label FROM predictions WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+            [model_key, *batch]
+        )
+        found.update(rows)
+    return found
+
+
+def load_classifier(model_name: str = MODEL_NAME, device: str = "auto", threads: int = 0):
+    from transformers import pipeline
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return pipeline("zero-shot-classification", model=model_name, device=pick_device(device))
+
+
+def classify_descriptions(
+    descriptions: pd.Series,
+    model_name: str = MODEL_NAME,
+    labels: list[str] = FICTION_CATEGORIES,
+    batch_size: int = 16,
+    chunk_size: int = 256,
+    device: str = "auto",
+    threads: int = 0,
+    cache_path: str = CACHE_PATH,
+) -> pd.Series:
+    """Predicted label per description (same index), classifying each distinct uncached description once."""
+    # Labels are part of the key: the same text can get a different answer from another label set
+    model_key = f"{model_name}|{'|'.join(labels)}"
+    hashes = descriptions.map(description_hash)
+    conn = open_cache(cache_path)
+    predictions = cached_predictions(conn, model_key, list(hashes.unique()))
+    pending = (
+        pd.DataFrame({"hash": hashes, "description": descriptions})
+        .drop_duplicates("hash")
+        .loc[lambda frame: ~frame["hash"].isin(predictions.keys())]
+    )
+    print(f"{len(descriptions)} descriptions: {len(predictions)} cached, {len(pending)} to classify")
+
+    if len(pending):
+        classifier = load_classifier(model_name, device, threads)
+        started = time.perf_counter()
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending.iloc[start:start + chunk_size]
+            results = classifier(
+                chunk["description"].astype(str).tolist(),
+                candidate_labels=labels,
+                batch_size=batch_size,
+                truncation=True,
+            )
+            # Labels come back sorted by score, so the first one is the prediction
+            rows = [(model_key, h, result["labels"][0], result["scores"][0]) for h, result in zip(chunk["hash"], results)]
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", rows)
+            predictions.update((h, label) for _, h, label, _ in rows)
+            done = min(start + chunk_size, len(pending))
+            print(f"  {done}/{len(pending)} books  {done / (time.perf_counter() - started):.2f} books/s")
+    conn.close()
+    return hashes.map(predictions)
+
+
+def classify_catalog(
+    input_path: str = INPUT_PATH,
+    output_path: str = OUTPUT_PATH,
+    **kwargs
+) -> pd.DataFrame:
+    """Write `output_path` with `simple_categories` mapped where possible and predicted everywhere else."""
+    books = pd.read_csv(input_path)
+    started = time.perf_counter()
+    books["simple_categories"] = books["categories"].map(CATEGORY_MAPPING)
+    missing = books["simple_categories"].isna()
+    if missing.any():
+        books.loc[missing, "simple_categories"] = classify_descriptions(books.loc[missing, "description"], **kwargs)
+
+    tmp_path = f"{output_path}.tmp"
+    books.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {len(books)} books to {output_path}: {(~missing).sum()} mapped, {missing.sum()} predicted "
+          f"in {elapsed:.1f}s ({missing.sum() / elapsed:.2f} predicted books/s)")
+    return books
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill in simple_categories with zero-shot classification")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--batch-size", type=int, default=16, help="Descriptions per forward pass")
+    parser.add_argument("--device", default="auto", help="auto, cpu, cuda or mps")
+    parser.add_argument("--threads", type=int, default=0, help="Torch CPU threads (0 = torch default)")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    args = parser.parse_args()
+
+    classify_catalog(
+        args.input,
+        args.output,
+        model_name=args.model,
+        batch_size=args.batch_size,
+        device=args.device,
+        threads=args.threads,
+        cache_path=args.cache,
+    )
+
+
+if __name__ == "__main__":
+    main()
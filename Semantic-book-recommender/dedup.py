@@ -0,0 +1,208 @@
+"""
+Near-duplicate edition detection for the recommender catalog.
+
+The 7k-books dataset lists many works several times under different ISBNs
+(hardback, paperback, reissues). Two books are put in the same cluster when
+
+  * their normalised title and first author match, or
+  * their descriptions are near-duplicates (MinHash estimate of word-trigram
+    Jaccard >= DESCRIPTION_THRESHOLD) and either their first authors or their
+    normalised titles match. Text alone is not enough: reprint publishers use
+    one boilerplate description for hundreds of unrelated books.
+
+Candidate description pairs come from MinHash LSH (banded signatures), so no
+all-pairs comparison is made. Each cluster's representative is the edition
+with the most ratings; the vector index keeps only representatives, and
+`representative_isbn13` maps every ISBN to its cluster's representative.
+
+    python dedup.py            # report on books_with_emotions.csv
+    python dedup.py --apply    # also add the representative_isbn13 column to it
+
+pipeline.py runs this as its dedup stage.
+"""
+import os
+import re
+import time
+import zlib
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_WORDS = 3
+DESCRIPTION_THRESHOLD = 0.7
+# Buckets larger than this are boilerplate ("no description", publisher blurbs) and are not expanded to pairs
+MAX_BUCKET = 50
+# Mersenne prime for the universal hash family (a * x + b) mod P
+PRIME = (1 << 61) - 1
+CHUNK_SHINGLES = 50_000
+EMBEDDING_DIM = 384
+
+_words = re.compile(r"[a-z0-9]+")
+_bracketed = re.compile(r"\(.*?\)|\[.*?\]")
+
+
+def normalise_title(title) -> str:
+    """Lower-case main title without subtitle, bracketed edition notes, punctuation or a leading article."""
+    if pd.isna(title):
+        return ""
+    title = _bracketed.sub(" ", str(title).lower()).split(":")[0]
+    words = _words.findall(title)
+    if words and words[0] in ("the", "a", "an"):
+        words = words[1:]
+    return " ".join(words)
+
+
+def normalise_author(authors) -> str:
+    """First author as letters only, so "J.R.R. Tolkien" and "J. R. R. Tolkien" match."""
+    if pd.isna(authors):
+        return ""
+    return "".join(_words.findall(str(authors).split(";")[0].lower()))
+
+
+def shingle_hashes(text) -> np.ndarray:
+    words = _words.findall(str(text).lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words + [""] * (SHINGLE_WORDS - len(words))
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signatures(texts, num_perm: int = NUM_PERM, seed: int = 1) -> np.ndarray:
+    """(books, num_perm) MinHash signatures of the texts' word-trigram sets."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+    per_book = [shingle_hashes(text) for text in texts]
+    signatures = np.empty((len(per_book), num_perm), dtype=np.uint64)
+    start = 0
+    while start < len(per_book):
+        # Group books so each (num_perm x shingles) block stays bounded, then one reduceat per block
+        stop, total = start, 0
+        while stop < len(per_book) and (total == 0 or total + len(per_book[stop]) <= CHUNK_SHINGLES):
+            total += len(per_book[stop])
+            stop += 1
+        hashes = np.concatenate(per_book[start:stop])
+        # Products wrap modulo 2^64 before the mod; still a fine hash family for 32-bit inputs
+        permuted = (a[:, None] * hashes[None, :] + b[:, None]) % PRIME
+        offsets = np.cumsum([0] + [len(h) for h in per_book[start:stop - 1]])
+        signatures[start:stop] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = stop
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """(pairs, 2) row pairs that share at least one LSH band."""
+    rows = signatures.shape[1] // bands
+    pairs = []
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(f"V{8 * rows}").ravel()
+        _, bucket, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        for bucket_id in np.flatnonzero((counts > 1) & (counts <= MAX_BUCKET)):
+            members = np.flatnonzero(bucket == bucket_id)
+            first, second = np.triu_indices(len(members), k=1)
+            pairs.append(np.stack([members[first], members[second]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def matches(values: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Whether both books of each pair have the same non-empty value."""
+    return (values[pairs[:, 0]] == values[pairs[:, 1]]) & (values[pairs[:, 0]] != "")
+
+
+def find_editions(books: pd.DataFrame, threshold: float = DESCRIPTION_THRESHOLD) -> tuple:
+    """Per-book cluster representative ISBN (Series aligned to `books`) and a stats dict."""
+    started = time.perf_counter()
+    titles = books["title"].map(normalise_title)
+    authors = books["authors"].map(normalise_author)
+
+    edges = []
+    # Same normalised title and first author
+    keyed = pd.DataFrame({"key": titles + "\x1f" + authors, "row": np.arange(len(books))})
+    keyed = keyed[(titles != "").to_numpy() & (authors != "").to_numpy()]
+    first_row = keyed.groupby("key")["row"].transform("first")
+    edges.append(np.stack([first_row.to_numpy(), keyed["row"].to_numpy()], axis=1))
+    key_pairs = int((first_row != keyed["row"]).sum())
+
+    # Near-duplicate descriptions from MinHash LSH, confirmed by the signature agreement
+    signatures = minhash_signatures(books["description"].fillna("").tolist())
+    pairs = candidate_pairs(signatures)
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1) if len(pairs) else np.empty(0)
+    same_author = matches(authors.to_numpy(), pairs)
+    same_title = matches(titles.to_numpy(), pairs)
+    confirmed = pairs[(similarity >= threshold) & (same_author | same_title)]
+    edges.append(confirmed)
+
+    edges = np.concatenate(edges)
+    graph = coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(len(books), len(books)))
+    n_clusters, labels = connected_components(graph, directed=False)
+
+    # Representative: most-rated edition, then the longest description, then the lowest ISBN
+    ranking = pd.DataFrame({
+        "cluster": labels,
+        "ratings": books["ratings_count"].fillna(0).to_numpy() if "ratings_count" in books else 0,
+        "length": books["description"].fillna("").str.len().to_numpy(),
+        "isbn13": books["isbn13"].to_numpy(),
+    }).sort_values(["cluster", "ratings", "length", "isbn13"], ascending=[True, False, False, True])
+    representative_of_cluster = ranking.drop_duplicates("cluster").set_index("cluster")["isbn13"]
+    representatives = pd.Series(representative_of_cluster.reindex(labels).to_numpy(), index=books.index,
+                                name="representative_isbn13")
+
+    duplicates = len(books) - n_clusters
+    stats = {
+        "books": len(books),
+        "clusters": int(n_clusters),
+        "multi_edition_clusters": int((np.bincount(labels) > 1).sum()),
+        "duplicates_removed": int(duplicates),
+        "title_author_pairs": key_pairs,
+        "lsh_candidate_pairs": int(len(pairs)),
+        "description_pairs": int(len(confirmed)),
+        "index_reduction": duplicates / len(books) if len(books) else 0.0,
+        "vector_mb_saved": duplicates * EMBEDDING_DIM * 4 / 1e6,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return representatives, stats
+
+
+def print_report(books: pd.DataFrame, representatives: pd.Series, stats: dict, examples: int = 5) -> None:
+    print(f"{stats['books']} books -> {stats['clusters']} works in {stats['seconds']:.2f}s")
+    print(f"  {stats['multi_edition_clusters']} works with several editions, "
+          f"{stats['duplicates_removed']} duplicate ISBNs")
+    print(f"  pairs: {stats['title_author_pairs']} by title/author, {stats['description_pairs']} by description "
+          f"(from {stats['lsh_candidate_pairs']} LSH candidates)")
+    print(f"  vector index: {stats['books']} -> {stats['clusters']} documents "
+          f"(-{100 * stats['index_reduction']:.1f}%, ~{stats['vector_mb_saved']:.1f} MB of {EMBEDDING_DIM}-d float32 vectors)")
+    grouped = books.assign(representative_isbn13=representatives).groupby("representative_isbn13")
+    largest = grouped.size().sort_values(ascending=False).head(examples)
+    for representative, size in largest[largest > 1].items():
+        group = grouped.get_group(representative)
+        print(f"  {representative} ({size} editions): " + "; ".join(
+            f"{isbn} {title!s:.40}" for isbn, title in zip(group["isbn13"], group["title"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster book editions and report the index-size reduction")
+    parser.add_argument("--input", default="books_with_emotions.csv")
+    parser.add_argument("--apply", action="store_true", help="Add representative_isbn13 to the input CSV")
+    parser.add_argument("--threshold", type=float, default=DESCRIPTION_THRESHOLD,
+                        help="Minimum description similarity for same-author editions")
+    args = parser.parse_args()
+
+    books = pd.read_csv(args.input)
+    representatives, stats = find_editions(books, args.threshold)
+    print_report(books, representatives, stats)
+    if args.apply:
+        books["representative_isbn13"] = representatives
+        tmp_path = f"{args.input}.tmp"
+        books.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, args.input)
+        print(f"Added representative_isbn13 to {args.input}; run `python vector_index.py build` to drop duplicates")
+
+
+if __name__ == "__main__":
+    main()
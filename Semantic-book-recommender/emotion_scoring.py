@@ -0,0 +1,221 @@
+"""
+Batched, resumable emotion scoring (the job from sentiment-analysis.ipynb).
+
+Every description is split into sentences, sentences from many books are
+flattened into large batches for the classifier, and each book gets the
+per-emotion maximum over its sentences. Finished chunks of books are
+checkpointed, so an interrupted run resumes where it stopped, and books
+already present in the output are not scored again.
+
+    python emotion_scoring.py                                  # books_with_categories.csv -> books_with_emotions.csv
+    python emotion_scoring.py --workers 4 --batch-size 64
+    python emotion_scoring.py --rescore                        # score every book again
+"""
+import os
+import glob
+import time
+import hashlib
+import argparse
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+MODEL_NAME = "j-hartmann/emotion-english-distilroberta-base"
+EMOTION_LABELS = ["anger", "disgust", "fear", "joy", "sadness", "surprise", "neutral"]
+INPUT_PATH = "books_with_categories.csv"
+OUTPUT_PATH = "books_with_emotions.csv"
+CHECKPOINT_DIR = ".emotion_checkpoint"
+
+_classifier = None
+
+
+def pick_device(device: str = "auto") -> str:
+    """Resolve "auto" to cuda, then mps, then cpu, whichever is available."""
+    if device != "auto":
+        return device
+    import torch
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def split_sentences(description) -> list[str]:
+    # Same split as the notebook, minus empty fragments (e.g. after the final period)
+    sentences = [s.strip() for s in str(description).split(".")]
+    return [s for s in sentences if s] or [str(description)]
+
+
+def load_classifier(model_name: str = MODEL_NAME, device: str = "auto", threads: int = 0):
+    from transformers import pipeline
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return pipeline("text-classification", model=model_name, top_k=None, device=pick_device(device))
+
+
+def init_worker(model_name: str, device: str, threads: int) -> None:
+    global _classifier
+    _classifier = load_classifier(model_name, device, threads)
+
+
+def score_sentences(classifier, sentences: list[str], batch_size: int) -> np.ndarray:
+    """(n_sentences, len(EMOTION_LABELS)) score matrix, columns in EMOTION_LABELS order."""
+    column = {label: i for i, label in enumerate(EMOTION_LABELS)}
+    scores = np.zeros((len(sentences), len(EMOTION_LABELS)), dtype=np.float32)
+    predictions = classifier(sentences, batch_size=batch_size, truncation=True)
+    for row, prediction in enumerate(predictions):
+        for entry in prediction:
+            scores[row, column[entry["label"]]] = entry["score"]
+    return scores
+
+
+def score_chunk(chunk: tuple, classifier=None) -> tuple:
+    """Max emotion scores per book for one chunk of (isbns, descriptions)."""
+    isbns, descriptions, batch_size = chunk
+    per_book = [split_sentences(d) for d in descriptions]
+    counts = np.array([len(s) for s in per_book])
+    sentences = [s for book in per_book for s in book]
+    scores = score_sentences(classifier or _classifier, sentences, batch_size)
+    # Each book's sentences are contiguous, so one reduceat gives every book's maxima
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return np.asarray(isbns), np.maximum.reduceat(scores, offsets, axis=0), len(sentences)
+
+
+def chunk_path(checkpoint_dir: str, isbns) -> str:
+    digest = hashlib.sha1(",".join(str(i) for i in isbns).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(checkpoint_dir, f"part-{digest}.npz")
+
+
+def load_checkpoint(checkpoint_dir: str, model_name: str) -> pd.DataFrame:
+    frames = []
+    for path in sorted(glob.glob(os.path.join(checkpoint_dir, "part-*.npz"))):
+        part = np.load(path, allow_pickle=False)
+        if str(part["model"]) != model_name:
+            continue
+        frame = pd.DataFrame(part["scores"], columns=EMOTION_LABELS)
+        frame.insert(0, "isbn13", part["isbn13"])
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["isbn13"] + EMOTION_LABELS)
+
+
+def clear_checkpoint(checkpoint_dir: str = CHECKPOINT_DIR) -> None:
+    for path in glob.glob(os.path.join(checkpoint_dir, "part-*.npz")):
+        os.remove(path)
+
+
+def score_books(
+    books: pd.DataFrame,
+    model_name: str = MODEL_NAME,
+    workers: int = 1,
+    batch_size: int = 64,
+    chunk_books: int = 200,
+    device: str = "auto",
+    checkpoint_dir: str = CHECKPOINT_DIR,
+) -> pd.DataFrame:
+    """isbn13 + max emotion scores for `books`, resuming from any checkpointed chunks."""
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    done = load_checkpoint(checkpoint_dir, model_name)
+    done = done[done["isbn13"].isin(books["isbn13"])]
+    pending = books[~books["isbn13"].isin(done["isbn13"])]
+    if len(done):
+        print(f"Resuming: {len(done)} books already checkpointed, {len(pending)} to go")
+
+    isbns = pending["isbn13"].to_numpy()
+    descriptions = pending["description"].to_numpy()
+    chunks = [
+        (isbns[start:start + chunk_books], descriptions[start:start + chunk_books], batch_size)
+        for start in range(0, len(pending), chunk_books)
+    ]
+
+    started = time.perf_counter()
+    scored_books = scored_sentences = 0
+
+    def save(result):
+        nonlocal scored_books, scored_sentences
+        chunk_isbns, scores, n_sentences = result
+        np.savez(chunk_path(checkpoint_dir, chunk_isbns), isbn13=chunk_isbns, scores=scores, model=model_name)
+        scored_books += len(chunk_isbns)
+        scored_sentences += n_sentences
+        elapsed = time.perf_counter() - started
+        print(f"  {scored_books}/{len(pending)} books  {scored_books / elapsed:.1f} books/s  "
+              f"{scored_sentences / elapsed:.1f} sentences/s")
+
+    if chunks and workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=init_worker, initargs=(model_name, device, threads)) as pool:
+            for result in pool.imap_unordered(score_chunk, chunks):
+                save(result)
+    elif chunks:
+        classifier = load_classifier(model_name, device)
+        for chunk in chunks:
+            save(score_chunk(chunk, classifier))
+
+    return load_checkpoint(checkpoint_dir, model_name).drop_duplicates("isbn13", keep="last")
+
+
+def update_emotions(
+    input_path: str = INPUT_PATH,
+    output_path: str = OUTPUT_PATH,
+    rescore: bool = False,
+    checkpoint_dir: str = CHECKPOINT_DIR,
+    **kwargs
+) -> pd.DataFrame:
+    """Write `output_path` as the input catalog plus emotion columns, scoring only books not already scored."""
+    books = pd.read_csv(input_path)
+    known = pd.DataFrame(columns=["isbn13"] + EMOTION_LABELS)
+    if os.path.exists(output_path) and not rescore:
+        previous = pd.read_csv(output_path, usecols=["isbn13"] + EMOTION_LABELS)
+        known = previous[previous["isbn13"].isin(books["isbn13"])]
+
+    to_score = books[~books["isbn13"].isin(known["isbn13"])]
+    print(f"{len(books)} books in {input_path}: {len(known)} already scored, {len(to_score)} to score")
+    started = time.perf_counter()
+    emotions = known
+    if len(to_score):
+        scored = score_books(to_score, checkpoint_dir=checkpoint_dir, **kwargs)
+        emotions = pd.concat([known, scored], ignore_index=True)
+
+    result = pd.merge(books.drop(columns=EMOTION_LABELS, errors="ignore"), emotions, on="isbn13")
+    tmp_path = f"{output_path}.tmp"
+    result.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    # The output now holds every scored book, so the checkpoint is no longer needed
+    clear_checkpoint(checkpoint_dir)
+
+    elapsed = time.perf_counter() - started
+    rate = f" ({len(to_score) / elapsed:.1f} books/s)" if len(to_score) and elapsed else ""
+    print(f"Wrote {len(result)} books to {output_path}; scored {len(to_score)} in {elapsed:.1f}s{rate}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score book descriptions for emotions")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own model copy")
+    parser.add_argument("--batch-size", type=int, default=64, help="Sentences per classifier batch")
+    parser.add_argument("--chunk-books", type=int, default=200, help="Books per checkpointed chunk")
+    parser.add_argument("--device", default="auto", help="auto, cpu, cuda or mps")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--rescore", action="store_true", help="Ignore existing output and score every book")
+    args = parser.parse_args()
+
+    update_emotions(
+        args.input,
+        args.output,
+        rescore=args.rescore,
+        checkpoint_dir=args.checkpoint_dir,
+        model_name=args.model,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        chunk_books=args.chunk_books,
+        device=args.device,
+    )
+
+
+if __name__ == "__main__":
+    main()
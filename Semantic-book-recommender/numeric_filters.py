@@ -0,0 +1,100 @@
+"""
+Range filters on the catalog's numeric columns (publication year, pages, rating).
+
+Each column is sorted once at load, keeping every value's catalog position,
+so the books with low <= value <= high are one contiguous slice found by two
+binary searches. The slice is turned into a bitmap over catalog positions
+(one bit per book, packed little-endian) and cached per (column, low, high),
+since dashboard and API ranges repeat. Several filters are combined by ANDing
+their bitmaps, and a vector-search candidate passes when its bit is set, so
+filtering k candidates is k bit lookups and never a scan of the DataFrame.
+Books with a missing value never match a range.
+"""
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ["published_year", "num_pages", "average_rating"]
+BITMAP_CACHE_SIZE = int(os.getenv("FILTER_CACHE_SIZE", "128"))
+
+
+def to_bitmap(mask: np.ndarray) -> np.ndarray:
+    """Packed bitmap of a boolean array over catalog positions."""
+    return np.packbits(mask, bitorder="little")
+
+
+def contains(bitmap: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Whether each catalog position's bit is set."""
+    positions = np.asarray(positions, dtype=np.int64)
+    return ((bitmap[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1).astype(bool)
+
+
+def bitmap_positions(bitmap: np.ndarray, size: int) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(bitmap, count=size, bitorder="little"))
+
+
+# Set bits per byte value; np.bitwise_count needs NumPy 2, the requirements allow 1.24
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Set bits in each byte of a uint8 array."""
+    return _POPCOUNT[bits]
+
+
+def bitmap_count(bitmap: np.ndarray) -> int:
+    return int(popcount(bitmap).sum(dtype=np.int64))
+
+
+class SortedColumn:
+    """A column's known values in ascending order, with the catalog position of each."""
+
+    def __init__(self, values):
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+        known = np.flatnonzero(~np.isnan(values))
+        order = known[np.argsort(values[known], kind="stable")]
+        self.values = values[order]
+        self.positions = order.astype(np.int32)
+
+    def between(self, low=None, high=None) -> np.ndarray:
+        """Catalog positions with low <= value <= high; either bound may be None."""
+        start = 0 if low is None else np.searchsorted(self.values, low, "left")
+        stop = len(self.values) if high is None else np.searchsorted(self.values, high, "right")
+        return self.positions[start:stop]
+
+
+class NumericFilters:
+    def __init__(self, books: pd.DataFrame, columns: list[str] = NUMERIC_COLUMNS):
+        self.size = len(books)
+        self.columns = {column: SortedColumn(books[column]) for column in columns if column in books}
+        # Per instance, so the cache goes away with the catalog it was built from
+        self.bitmap = lru_cache(maxsize=BITMAP_CACHE_SIZE)(self._bitmap)
+
+    def _bitmap(self, column: str, low, high) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.columns[column].between(low, high)] = True
+        bitmap = to_bitmap(mask)
+        bitmap.flags.writeable = False
+        return bitmap
+
+    def ranges(self, filters: dict) -> dict:
+        """{column: (low, high)} for the filters that constrain anything; raises ValueError on bad input."""
+        ranges = {}
+        for column, bounds in (filters or {}).items():
+            if column not in self.columns:
+                raise ValueError(f"Unknown filter column {column!r}; expected one of {list(self.columns)}")
+            low, high = bounds if bounds is not None else (None, None)
+            if low is not None and high is not None and low > high:
+                raise ValueError(f"Empty range for {column}: {low} > {high}")
+            if low is not None or high is not None:
+                ranges[column] = (low, high)
+        return ranges
+
+    def mask(self, filters: dict) -> np.ndarray:
+        """Bitmap of the books passing every range in `filters`, or None when nothing is filtered."""
+        combined = None
+        for column, (low, high) in sorted(self.ranges(filters).items()):
+            bitmap = self.bitmap(column, low, high)
+            combined = bitmap if combined is None else combined & bitmap
+        return combined
@@ -0,0 +1,256 @@
+"""
+Scripted data pipeline replacing the notebook chain
+data-exploration -> text-classification -> sentiment-analysis -> vector-search.
+
+    python pipeline.py run --source path/to/books.csv   # or omit --source to download the Kaggle dataset
+    python pipeline.py run --force                      # rerun every stage
+    python pipeline.py status
+
+Stages write Parquet to data/. Each stage is fingerprinted by the sha256 of
+its inputs plus its parameters (model names); when neither changed and its
+outputs are intact, it is skipped. A stage that does run only pushes new or
+changed rows through the model: rows whose isbn13 and inputs match the
+stage's previous output keep their previous categories or emotion scores,
+and the embed stage updates the vector index by content hash (and the
+similar-books graph for the books that changed). The dedup stage clusters
+editions of the same work (dedup.py) so the index keeps one per work. Adding 500
+books therefore classifies, scores and embeds just those 500.
+
+The last stage also writes tagged_description.txt, books_with_emotions.csv and
+its Arrow conversion (catalog.py), which vector_index.py and the dashboard read.
+"""
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import dedup
+import catalog
+import vector_index
+import similar_books
+import emotion_scoring
+import category_classifier
+from vector_index import file_sha256
+
+DATA_DIR = "data"
+RAW_PATH = os.path.join(DATA_DIR, "books_raw.parquet")
+CLEANED_PATH = os.path.join(DATA_DIR, "books_cleaned.parquet")
+CATEGORIES_PATH = os.path.join(DATA_DIR, "books_with_categories.parquet")
+EMOTIONS_PATH = os.path.join(DATA_DIR, "books_with_emotions.parquet")
+DEDUP_PATH = os.path.join(DATA_DIR, "books_deduplicated.parquet")
+MANIFEST_PATH = os.path.join(DATA_DIR, "pipeline_manifest.json")
+KAGGLE_DATASET = "dylanjcastillo/7k-books-with-metadata"
+MIN_DESCRIPTION_WORDS = 25
+STAGES = ["clean", "classify", "emotions", "dedup", "embed"]
+
+
+def read_manifest() -> dict:
+    if not os.path.exists(MANIFEST_PATH):
+        return {"stages": {}}
+    with open(MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: dict) -> None:
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def write_parquet(frame: pd.DataFrame, path: str) -> None:
+    tmp_path = f"{path}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def previous_values(current: pd.DataFrame, previous_path: str, compare: list[str], carried: list[str]):
+    """Previous `carried` values aligned to `current`, and a mask of rows that must be recomputed.
+
+    A row is reused when the previous output has its isbn13 with the same `compare` values;
+    with no previous output (or `previous_path=None`) every row is recomputed.
+    """
+    if previous_path is None or not os.path.exists(previous_path):
+        return pd.DataFrame(index=current.index, columns=carried), np.ones(len(current), dtype=bool)
+    previous = (
+        pd.read_parquet(previous_path, columns=["isbn13", *compare, *carried])
+        .drop_duplicates("isbn13")
+        .set_index("isbn13")
+    )
+    aligned = previous.reindex(current["isbn13"]).set_axis(current.index)
+    same = current["isbn13"].isin(previous.index).to_numpy()
+    for column in compare:
+        equal = (current[column] == aligned[column]) | (current[column].isna() & aligned[column].isna())
+        same = same & equal.fillna(False).to_numpy(dtype=bool)
+    return aligned[carried], ~same
+
+
+def stage_fingerprint(inputs: list[str], params: dict) -> dict:
+    return {"inputs": {path: file_sha256(path) for path in inputs}, "params": params}
+
+
+def run_stage(name: str, fn, inputs: list[str], outputs: list[str], params: dict, manifest: dict, force: bool) -> bool:
+    """Run one stage unless its inputs, parameters and outputs match the last recorded run."""
+    fingerprint = stage_fingerprint(inputs, params)
+    recorded = manifest["stages"].get(name)
+    if (not force and recorded and recorded["fingerprint"] == fingerprint
+            and all(os.path.exists(path) and file_sha256(path) == recorded["outputs"].get(path) for path in outputs)):
+        print(f"[{name}] unchanged, skipped")
+        return False
+
+    print(f"[{name}] running")
+    started = time.perf_counter()
+    stats = fn()
+    elapsed = time.perf_counter() - started
+    manifest["stages"][name] = {
+        "fingerprint": fingerprint,
+        "outputs": {path: file_sha256(path) for path in outputs},
+        "stats": stats,
+        "seconds": round(elapsed, 3),
+        "finished_at": datetime.now(timezone.utc).isoformat()
+    }
+    write_manifest(manifest)
+    print(f"[{name}] done in {elapsed:.1f}s: {stats}")
+    return True
+
+
+def fetch_source(source: str = None) -> None:
+    """Snapshot the raw catalog as Parquet, so later fingerprints don't depend on where it came from."""
+    if source is None:
+        import kagglehub
+        source = os.path.join(kagglehub.dataset_download(KAGGLE_DATASET), "books.csv")
+    books = pd.read_csv(source)
+    if os.path.exists(RAW_PATH) and pd.read_parquet(RAW_PATH).equals(books):
+        return
+    write_parquet(books, RAW_PATH)
+
+
+def clean_books() -> dict:
+    """Filter and tag the raw catalog as in data-exploration.ipynb."""
+    books = pd.read_parquet(RAW_PATH)
+    complete = books.dropna(subset=["description", "num_pages", "average_rating", "published_year"])
+    cleaned = complete[complete["description"].str.split().str.len() >= MIN_DESCRIPTION_WORDS].copy()
+    cleaned["title_and_subtitle"] = cleaned["title"].where(
+        cleaned["subtitle"].isna(),
+        cleaned["title"].astype(str) + ": " + cleaned["subtitle"].astype(str)
+    )
+    cleaned["tagged_description"] = cleaned["isbn13"].astype(str) + " " + cleaned["description"].astype(str)
+    write_parquet(cleaned.drop(columns=["subtitle"]), CLEANED_PATH)
+    return {"raw": len(books), "cleaned": len(cleaned)}
+
+
+def classify_books(reuse: bool = True, **kwargs) -> dict:
+    books = pd.read_parquet(CLEANED_PATH)
+    previous, stale = previous_values(
+        books, CATEGORIES_PATH if reuse else None, ["categories", "description"], ["simple_categories"]
+    )
+    books["simple_categories"] = previous["simple_categories"]
+    books.loc[stale, "simple_categories"] = books.loc[stale, "categories"].map(category_classifier.CATEGORY_MAPPING)
+    to_predict = stale & books["simple_categories"].isna().to_numpy()
+    if to_predict.any():
+        books.loc[to_predict, "simple_categories"] = category_classifier.classify_descriptions(
+            books.loc[to_predict, "description"], **kwargs
+        )
+    write_parquet(books, CATEGORIES_PATH)
+    return {"books": len(books), "reused": int((~stale).sum()), "mapped": int((stale & ~to_predict).sum()),
+            "predicted": int(to_predict.sum())}
+
+
+def score_emotions(reuse: bool = True, **kwargs) -> dict:
+    books = pd.read_parquet(CATEGORIES_PATH)
+    labels = emotion_scoring.EMOTION_LABELS
+    previous, stale = previous_values(books, EMOTIONS_PATH if reuse else None, ["description"], labels)
+    books[labels] = previous.astype(np.float32)
+    if stale.any():
+        scored = emotion_scoring.score_books(books.loc[stale, ["isbn13", "description"]], **kwargs)
+        scored = scored.set_index("isbn13").reindex(books.loc[stale, "isbn13"])
+        books.loc[stale, labels] = scored[labels].to_numpy(dtype=np.float32)
+    write_parquet(books, EMOTIONS_PATH)
+    emotion_scoring.clear_checkpoint(kwargs.get("checkpoint_dir", emotion_scoring.CHECKPOINT_DIR))
+    return {"books": len(books), "reused": int((~stale).sum()), "scored": int(stale.sum())}
+
+
+def deduplicate_editions() -> dict:
+    books = pd.read_parquet(EMOTIONS_PATH)
+    books["representative_isbn13"], stats = dedup.find_editions(books)
+    write_parquet(books, DEDUP_PATH)
+    dedup.print_report(books, books["representative_isbn13"], stats)
+    return stats
+
+
+def export_and_embed(rebuild: bool = False) -> dict:
+    """Write the files vector_index.py and the dashboard read, then update the index incrementally."""
+    books = pd.read_parquet(DEDUP_PATH)
+    # Same call as vector-search.ipynb, so the text file (and its content hashes) is unchanged
+    books["tagged_description"].to_csv(vector_index.SOURCE_PATH, sep="\n", index=False, header=False)
+    books.to_csv(vector_index.CATALOG_PATH, index=False)
+    catalog.build_catalog(vector_index.CATALOG_PATH)
+    result = vector_index.build_index(rebuild=rebuild)
+    graph = similar_books.build(rebuild=rebuild)
+    stats = {key: value for key, value in result.items() if key != "seconds"}
+    stats["similar_books"] = graph["mode"]
+    return stats
+
+
+def run_pipeline(source: str = None, force: bool = False, stages: list[str] = STAGES, device: str = "auto",
+                 workers: int = 1) -> dict:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    manifest = read_manifest()
+    if "clean" in stages:
+        fetch_source(source)
+    plan = {
+        "clean": (clean_books, [RAW_PATH], [CLEANED_PATH], {"min_description_words": MIN_DESCRIPTION_WORDS}),
+        "classify": (
+            lambda: classify_books(reuse=not force, device=device),
+            [CLEANED_PATH], [CATEGORIES_PATH],
+            {"model": category_classifier.MODEL_NAME, "labels": category_classifier.FICTION_CATEGORIES,
+             "mapping": category_classifier.CATEGORY_MAPPING}
+        ),
+        "emotions": (
+            lambda: score_emotions(reuse=not force, device=device, workers=workers),
+            [CATEGORIES_PATH], [EMOTIONS_PATH], {"model": emotion_scoring.MODEL_NAME}
+        ),
+        "dedup": (
+            deduplicate_editions, [EMOTIONS_PATH], [DEDUP_PATH],
+            {"threshold": dedup.DESCRIPTION_THRESHOLD, "num_perm": dedup.NUM_PERM, "bands": dedup.BANDS}
+        ),
+        "embed": (
+            lambda: export_and_embed(rebuild=force),
+            [DEDUP_PATH],
+            [vector_index.SOURCE_PATH, vector_index.CATALOG_PATH, catalog.ARROW_PATH, vector_index.MANIFEST_PATH,
+             os.path.join(similar_books.GRAPH_DIR, "neighbours.npy")],
+            {"model": vector_index.MODEL_NAME, "format": vector_index.INDEX_FORMAT}
+        ),
+    }
+    ran = {}
+    for name in STAGES:
+        if name in stages:
+            fn, inputs, outputs, params = plan[name]
+            ran[name] = run_stage(name, fn, inputs, outputs, params, manifest, force)
+    return ran
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean, classify, score and embed the book catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Run the stages whose inputs changed")
+    run_parser.add_argument("--source", help="Raw books.csv (default: download the Kaggle dataset)")
+    run_parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    run_parser.add_argument("--force", action="store_true", help="Rerun the stages and recompute every row")
+    run_parser.add_argument("--device", default="auto", help="auto, cpu, cuda or mps")
+    run_parser.add_argument("--workers", type=int, default=1, help="Emotion scoring worker processes")
+    sub.add_parser("status", help="Show the recorded stage fingerprints")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_pipeline(args.source, args.force, args.stages, args.device, args.workers)
+    else:
+        print(json.dumps(read_manifest(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
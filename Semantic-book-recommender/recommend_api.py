@@ -0,0 +1,163 @@
+"""
+HTTP API for the semantic recommender, for callers other than the Gradio UI.
+
+    uvicorn recommend_api:app --port 8001
+
+    POST /recommend        {"query": "...", "category": "Fiction", "tone": "Happy", "k": 16,
+                            "min_year": 1990, "max_pages": 400, "min_rating": 4}
+    POST /recommend/batch  {"requests": [{"query": "..."}, {"query": "...", "tone": "Sad"}]}
+    GET  /similar/9780002005883?k=16
+    GET  /typeahead?q=harry%20pot&k=10
+
+A batch encodes all its queries in one encoder call, then runs one vector
+search per query. Each hit carries its ISBN-13, category, `score` (what the
+list is ordered by), vector `distance` and the emotion scores. /similar
+serves the precomputed graph from `python similar_books.py build`.
+/typeahead completes titles and authors from an in-memory index, without
+the embedding model.
+"""
+import os
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+
+from emotion_scoring import EMOTION_LABELS
+from numeric_filters import NUMERIC_COLUMNS
+from recommender import (TONE_COLUMNS, books, books_by_isbn, category_share, embed_queries, numeric_filters,
+                         retrieve_semantic_recommendations)
+from similar_books import GRAPH_DIR, SimilarBooks
+from typeahead import MAX_RESULTS, TypeaheadIndex
+
+MAX_K = 100
+MAX_BATCH = 256
+similar_graph = SimilarBooks() if os.path.exists(os.path.join(GRAPH_DIR, "manifest.json")) else None
+typeahead_index = TypeaheadIndex.from_catalog()
+
+
+class RecommendRequest(BaseModel):
+    query: str
+    category: str = "All"
+    tone: str = "All"
+    k: int = 16
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    min_pages: Optional[int] = None
+    max_pages: Optional[int] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+
+    def filters(self) -> dict:
+        return {
+            "published_year": (self.min_year, self.max_year),
+            "num_pages": (self.min_pages, self.max_pages),
+            "average_rating": (self.min_rating, self.max_rating),
+        }
+
+
+class BatchRecommendRequest(BaseModel):
+    requests: list[RecommendRequest]
+
+
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def validate(request: RecommendRequest) -> None:
+    if not request.query.strip():
+        raise HTTPException(status_code=422, detail="query must not be empty")
+    if not 1 <= request.k <= MAX_K:
+        raise HTTPException(status_code=422, detail=f"k must be between 1 and {MAX_K}")
+    if request.category != "All" and request.category not in category_share:
+        raise HTTPException(status_code=422, detail=f"Unknown category {request.category!r}")
+    if request.tone != "All" and request.tone not in TONE_COLUMNS:
+        raise HTTPException(status_code=422, detail=f"Unknown tone {request.tone!r}")
+    try:
+        numeric_filters.ranges(request.filters())
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+
+def recommend(request: RecommendRequest, query_embedding: list[float] = None) -> list[dict]:
+    recommendations = retrieve_semantic_recommendations(
+        request.query,
+        request.category,
+        request.tone,
+        initial_top_k=max(50, request.k),
+        final_top_k=request.k,
+        query_embedding=query_embedding,
+        filters=request.filters(),
+    )
+    columns = ["isbn13", "simple_categories", "score", "distance", *NUMERIC_COLUMNS, *EMOTION_LABELS]
+    return [
+        {"isbn13": str(row["isbn13"]), "category": row["simple_categories"],
+         **{column: float(row[column]) for column in columns[2:]}}
+        for row in recommendations[columns].to_dict("records")
+    ]
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "books": len(books), "categories": sorted(category_share), "tones": list(TONE_COLUMNS)}
+
+
+@app.post("/recommend")
+def recommend_one(request: RecommendRequest):
+    validate(request)
+    return {"query": request.query, "results": recommend(request)}
+
+
+@app.post("/recommend/batch")
+def recommend_batch(batch: BatchRecommendRequest):
+    if not 1 <= len(batch.requests) <= MAX_BATCH:
+        raise HTTPException(status_code=422, detail=f"A batch holds between 1 and {MAX_BATCH} requests")
+    for request in batch.requests:
+        validate(request)
+    embeddings = embed_queries([request.query for request in batch.requests])
+    return {
+        "results": [
+            {"query": request.query, "results": recommend(request, embedding)}
+            for request, embedding in zip(batch.requests, embeddings)
+        ]
+    }
+
+
+@app.get("/similar/{isbn13}")
+def similar(isbn13: int, k: int = 16):
+    if similar_graph is None:
+        raise HTTPException(status_code=503, detail="No similar-books graph; run `python similar_books.py build`")
+    # Other editions of a work share its representative's neighbours
+    if isbn13 in books_by_isbn.index:
+        isbn13 = int(books_by_isbn.at[isbn13, "representative_isbn13"])
+    if isbn13 not in similar_graph:
+        raise HTTPException(status_code=404, detail=f"Unknown ISBN {isbn13}")
+    width = similar_graph.neighbours.shape[1]
+    if not 1 <= k <= width:
+        raise HTTPException(status_code=422, detail=f"k must be between 1 and {width}")
+    neighbours = similar_graph.similar(isbn13, k)
+    emotions = books_by_isbn.reindex([isbn for isbn, _ in neighbours])[EMOTION_LABELS].to_dict("records")
+    return {
+        "isbn13": str(isbn13),
+        "results": [
+            {"isbn13": str(isbn), "score": score, **{label: float(value) for label, value in row.items()}}
+            for (isbn, score), row in zip(neighbours, emotions)
+        ]
+    }
+
+
+@app.get("/typeahead")
+def typeahead(q: str, k: int = 10):
+    if not 1 <= k <= MAX_RESULTS:
+        raise HTTPException(status_code=422, detail=f"k must be between 1 and {MAX_RESULTS}")
+    return {
+        "query": q,
+        "results": [{**suggestion, "isbn13": str(suggestion["isbn13"])} for suggestion in typeahead_index.search(q, k)],
+    }
@@ -0,0 +1,168 @@
+import os
+from functools import lru_cache
+import pandas as pd
+import numpy as np
+from dotenv import load_dotenv
+
+from catalog import DISPLAY_COLUMNS, load_catalog
+from emotion_scoring import EMOTION_LABELS
+from numeric_filters import NUMERIC_COLUMNS, NumericFilters, bitmap_count, bitmap_positions, contains, to_bitmap
+from vector_index import distance_metric, load_index
+
+load_dotenv()
+
+TONE_COLUMNS = {
+    "Happy": "joy",
+    "Surprising": "surprise",
+    "Angry": "anger",
+    "Suspenseful": "fear",
+    "Sad": "sadness",
+}
+# Share of the final ranking given to the tone score; the rest is query similarity
+TONE_WEIGHT = float(os.getenv("TONE_WEIGHT", "0.5"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+# Only these columns are read from the memory-mapped catalog
+books = load_catalog(DISPLAY_COLUMNS + ["representative_isbn13"] + EMOTION_LABELS + NUMERIC_COLUMNS)
+# Indexed by ISBN so vector hits are looked up in O(k) and keep their similarity order;
+# duplicate ISBNs are dropped when the catalog file is built
+books_by_isbn = books.set_index("isbn13", drop=False)
+tone_scores = {column: books_by_isbn[column].to_numpy(dtype=np.float32) for column in TONE_COLUMNS.values()}
+# Plain object array (missing as None) so == comparisons against it give booleans
+categories_by_position = books_by_isbn["simple_categories"].to_numpy(dtype=object, na_value=None)
+category_share = books_by_isbn["simple_categories"].value_counts(normalize=True).to_dict()
+numeric_filters = NumericFilters(books_by_isbn)
+category_bitmaps = {category: to_bitmap(categories_by_position == category) for category in category_share}
+
+# Built ahead of time by `python vector_index.py build`
+db_books = load_index()
+# Distance -> [0, 1] relevance per HNSW space, the conversions langchain's Chroma store documents
+# (l2 distances between unit vectors lie in [0, 2], so are scaled by sqrt(2))
+RELEVANCE = {
+    "l2": lambda distances: 1.0 - distances / np.sqrt(2),
+    "cosine": lambda distances: 1.0 - distances,
+    "ip": lambda distances: 1.0 - distances,
+}
+relevance = RELEVANCE[distance_metric()]
+
+
+def blend_tone(distances: np.ndarray, tone_values: np.ndarray) -> np.ndarray:
+    """Ranking score: a blend of query similarity (min-max scaled distance) and tone score."""
+    spread = distances.max() - distances.min()
+    similarity = (distances.max() - distances) / spread if spread > 0 else np.ones_like(distances)
+    return (1 - TONE_WEIGHT) * similarity + TONE_WEIGHT * tone_values
+
+
+def embed_queries(queries: list[str]) -> list[list[float]]:
+    """Query vectors for a batch of queries, in one encoder call."""
+    return db_books.embeddings.embed_documents(queries)
+
+
+def nearest_books(query_embedding: list[float], k: int, category: str = None, isbns=None):
+    """Catalog positions and distances of the k nearest books, optionally within one category or ISBN list."""
+    if isbns is not None:
+        search_filter = {"isbn13": {"$in": [int(isbn) for isbn in isbns]}}
+    else:
+        search_filter = {"simple_categories": category} if category else None
+    recs = db_books.similarity_search_by_vector_with_relevance_scores(query_embedding, k=k, filter=search_filter)
+    positions = books_by_isbn.index.get_indexer([doc.metadata["isbn13"] for doc, _ in recs])
+    distances = np.array([distance for _, distance in recs], dtype=np.float32)
+    found = positions >= 0
+    return positions[found], distances[found]
+
+
+def filtered_books(query_embedding: list[float], k: int, allowed: np.ndarray, initial_top_k: int, final_top_k: int):
+    """Nearest books among those set in the `allowed` bitmap.
+
+    Like the category filter: when enough books pass, an unfiltered top-initial_top_k is checked
+    against the bitmap; otherwise the passing ISBNs are sent with the vector query.
+    """
+    matching = bitmap_count(allowed)
+    if not matching:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if matching / len(books_by_isbn) * initial_top_k >= final_top_k:
+        positions, distances = nearest_books(query_embedding, initial_top_k)
+        passing = contains(allowed, positions)
+        if passing.sum() >= min(final_top_k, matching):
+            return positions[passing][:k], distances[passing][:k]
+    isbns = books_by_isbn.index[bitmap_positions(allowed, len(books_by_isbn))]
+    return nearest_books(query_embedding, min(k, matching), isbns=isbns)
+
+
+def retrieve_semantic_recommendations(
+        query: str,
+        category: str = None,
+        tone: str = None,
+        initial_top_k: int = 50,
+        final_top_k: int = 16,
+        query_embedding: list[float] = None,
+        filters: dict = None,
+) -> pd.DataFrame:
+    """Top `final_top_k` books for a query, with the category filter applied during the vector search.
+
+    Adds `distance` (vector distance, lower is closer) and `score` (what the rows are ordered by:
+    relevance from the distance, or the similarity/tone blend when a tone is given) columns.
+    Pass `query_embedding` when the query was already encoded, e.g. as part of a batch.
+    `filters` maps numeric columns to inclusive (low, high) ranges, either end None,
+    e.g. {"published_year": (1990, None), "average_rating": (4, None)}.
+    """
+    if query_embedding is None:
+        query_embedding = db_books.embeddings.embed_query(query)
+    tone_column = TONE_COLUMNS.get(tone)
+    # Without a tone the similarity order is final, so only final_top_k neighbours are needed
+    k = initial_top_k if tone_column else final_top_k
+
+    allowed = numeric_filters.mask(filters)
+    if allowed is not None:
+        if category and category != "All":
+            allowed = allowed & category_bitmaps.get(category, np.zeros_like(allowed))
+        positions, distances = filtered_books(query_embedding, k, allowed, initial_top_k, final_top_k)
+    elif not category or category == "All":
+        positions, distances = nearest_books(query_embedding, k)
+    elif category_share.get(category, 0.0) * initial_top_k >= final_top_k:
+        # Broad category: filtering an unfiltered top-initial_top_k is cheaper than Chroma's filtered
+        # search, which enumerates every matching ID first. Fall back to it if too few survive.
+        positions, distances = nearest_books(query_embedding, initial_top_k)
+        in_category = categories_by_position[positions] == category
+        positions, distances = positions[in_category], distances[in_category]
+        if len(positions) < final_top_k:
+            positions, distances = nearest_books(query_embedding, k, category)
+    else:
+        positions, distances = nearest_books(query_embedding, k, category)
+
+    if tone_column and len(positions):
+        scores = blend_tone(distances, tone_scores[tone_column][positions])
+        order = np.argsort(-scores, kind="stable")
+        positions, distances, scores = positions[order], distances[order], scores[order]
+    else:
+        scores = relevance(distances).astype(np.float32)
+    top = slice(0, final_top_k)
+    return books_by_isbn.iloc[positions[top]].assign(distance=distances[top], score=scores[top])
+
+
+def normalise_request(query: str, category: str = None, tone: str = None) -> tuple:
+    """Cache key: whitespace-collapsed, case-folded query; missing category/tone mean "All"."""
+    return " ".join(str(query or "").split()).casefold(), category or "All", tone or "All"
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _cached_gallery(query: str, category: str, tone: str) -> tuple:
+    recommendations = retrieve_semantic_recommendations(query, category, tone)
+    return tuple(zip(recommendations["large_thumbnail"], recommendations["caption"]))
+
+
+def gallery_recommendations(query: str, category: str = None, tone: str = None) -> list:
+    """(thumbnail, caption) pairs for the dashboard, served from an LRU cache of recent requests."""
+    return list(_cached_gallery(*normalise_request(query, category, tone)))
+
+
+def cache_stats() -> dict:
+    info = _cached_gallery.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+        "size": info.currsize,
+        "max_size": info.maxsize
+    }
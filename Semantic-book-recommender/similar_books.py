@@ -0,0 +1,238 @@
+"""
+Precomputed "more like this" graph: the top-N most similar books for every ISBN.
+
+Built offline from the description embeddings already stored in the vector
+index, so no model is loaded:
+
+    python similar_books.py build              # incremental when a graph exists
+    python similar_books.py build --rebuild
+    python similar_books.py show 9780002005883
+
+Similarities are cosine, computed block by block (a block of rows against
+the whole catalog per matrix multiplication) so memory stays bounded. The
+graph is stored as four arrays in vectorstore/similar_books/: ISBNs,
+content hashes, int32 neighbour positions (books x N) and float16 scores
+(books x N). They are memory-mapped at load and a dict maps ISBN -> row, so
+a lookup is one dict access plus one row slice.
+
+On an update, only new or edited books get full rows. Existing rows are
+merged with those books' columns, and rows that pointed at a removed or
+edited book are recomputed. Adding m books to a catalog of n costs
+O(n * m) instead of O(n^2).
+"""
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+import vector_index
+
+GRAPH_DIR = os.path.join(vector_index.INDEX_DIR, "similar_books")
+NEIGHBOURS = int(os.getenv("SIMILAR_BOOKS_N", "32"))
+# Upper bound on the float32 similarity block (rows x catalog) held at once
+BLOCK_BYTES = 256 * 1024 * 1024
+# Above this share of added/changed books an update is slower than a rebuild
+REBUILD_SHARE = 0.3
+
+
+def read_store() -> tuple:
+    """(isbns int64, content hashes, unit-norm float32 embeddings) from the persisted vector index."""
+    collection = vector_index.open_collection()
+    stored = collection.get(include=["embeddings", "metadatas"])
+    isbns = np.array([int(isbn) for isbn in stored["ids"]], dtype=np.int64)
+    hashes = np.array([metadata.get("content_hash", "") for metadata in stored["metadatas"]])
+    return isbns, hashes, normalise(np.asarray(stored["embeddings"], dtype=np.float32))
+
+
+def normalise(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def top_neighbours(queries: np.ndarray, corpus: np.ndarray, n: int, self_positions: np.ndarray = None) -> tuple:
+    """Top-n corpus positions (int32) and cosine scores (float32) for every query row, best first.
+
+    `self_positions` gives each query's own corpus position (or -1), which is excluded.
+    """
+    n = min(n, len(corpus))
+    positions = np.empty((len(queries), n), dtype=np.int32)
+    scores = np.empty((len(queries), n), dtype=np.float32)
+    block_rows = max(1, BLOCK_BYTES // (4 * max(1, len(corpus))))
+    for start in range(0, len(queries), block_rows):
+        stop = min(start + block_rows, len(queries))
+        similarity = queries[start:stop] @ corpus.T
+        if self_positions is not None:
+            rows = np.arange(stop - start)
+            own = self_positions[start:stop]
+            similarity[rows[own >= 0], own[own >= 0]] = -np.inf
+        # argpartition finds the top n in linear time; only those n are then sorted
+        if n < len(corpus):
+            top = np.argpartition(similarity, len(corpus) - n, axis=1)[:, -n:]
+        else:
+            top = np.tile(np.arange(n), (stop - start, 1))
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        positions[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+    return positions, scores
+
+
+def merge_neighbours(positions_a, scores_a, positions_b, scores_b, n: int) -> tuple:
+    """Row-wise top-n of two neighbour lists (positions in the same catalog), best first."""
+    positions = np.concatenate([positions_a, positions_b], axis=1)
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :n]
+    return np.take_along_axis(positions, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def build_graph(isbns: np.ndarray, hashes: np.ndarray, embeddings: np.ndarray, n: int = NEIGHBOURS) -> dict:
+    n = min(n, len(isbns) - 1)
+    positions, scores = top_neighbours(embeddings, embeddings, n + 1, np.arange(len(isbns)))
+    # The excluded self entry scores -inf, so it is always last in the n + 1 candidates
+    return {"isbns": isbns, "hashes": hashes, "neighbours": positions[:, :n], "scores": scores[:, :n].astype(np.float16)}
+
+
+def update_graph(graph: dict, isbns: np.ndarray, hashes: np.ndarray, embeddings: np.ndarray,
+                 n: int = NEIGHBOURS) -> tuple:
+    """Bring `graph` in line with the current catalog; returns (graph, stats)."""
+    n = min(n, len(isbns) - 1)
+    old_row = {isbn: row for row, isbn in enumerate(graph["isbns"].tolist())}
+    # Current position of each old row's book, or -1 if it was removed or its description changed
+    new_position = np.full(len(graph["isbns"]), -1, dtype=np.int64)
+    added = []
+    for position, (isbn, content) in enumerate(zip(isbns.tolist(), hashes.tolist())):
+        row = old_row.get(isbn)
+        if row is not None and graph["hashes"][row] == content:
+            new_position[row] = position
+        else:
+            added.append(position)
+    added = np.array(added, dtype=np.int64)
+    if len(added) > REBUILD_SHARE * len(isbns) or graph["neighbours"].shape[1] != n:
+        return build_graph(isbns, hashes, embeddings, n), {"mode": "rebuild", "books": len(isbns)}
+
+    kept_rows = np.flatnonzero(new_position >= 0)
+    kept_positions = new_position[kept_rows]
+    neighbours = new_position[graph["neighbours"][kept_rows]]
+    scores = graph["scores"][kept_rows].astype(np.float32)
+    # A row that lost a neighbour can't be repaired from its remaining N - 1, so it is recomputed
+    intact = (neighbours >= 0).all(axis=1)
+
+    new_neighbours = np.empty((len(isbns), n), dtype=np.int32)
+    new_scores = np.empty((len(isbns), n), dtype=np.float32)
+    merge_positions = kept_positions[intact]
+    if len(added) and len(merge_positions):
+        candidates, candidate_scores = top_neighbours(embeddings[merge_positions], embeddings[added], n)
+        new_neighbours[merge_positions], new_scores[merge_positions] = merge_neighbours(
+            neighbours[intact], scores[intact], added[candidates], candidate_scores, n
+        )
+    elif len(merge_positions):
+        new_neighbours[merge_positions], new_scores[merge_positions] = neighbours[intact], scores[intact]
+
+    recompute = np.concatenate([added, kept_positions[~intact]])
+    if len(recompute):
+        positions, row_scores = top_neighbours(embeddings[recompute], embeddings, n + 1, recompute)
+        new_neighbours[recompute], new_scores[recompute] = positions[:, :n], row_scores[:, :n]
+
+    stats = {
+        "mode": "update",
+        "books": len(isbns),
+        "added_or_changed": len(added),
+        "removed": len(old_row.keys() - set(isbns.tolist())),
+        "recomputed_rows": len(recompute),
+    }
+    return {"isbns": isbns, "hashes": hashes, "neighbours": new_neighbours, "scores": new_scores.astype(np.float16)}, stats
+
+
+def save_graph(graph: dict, path: str = GRAPH_DIR, info: dict = None) -> None:
+    os.makedirs(path, exist_ok=True)
+    for name in ("isbns", "hashes", "neighbours", "scores"):
+        tmp_path = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp_path, graph[name])
+        os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(info or {}, f, indent=2)
+
+
+def load_arrays(path: str = GRAPH_DIR, mmap_mode: str = "r") -> dict:
+    return {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in ("isbns", "hashes", "neighbours", "scores")
+    }
+
+
+class SimilarBooks:
+    """Read-only "more like this" lookups over a saved graph."""
+
+    def __init__(self, path: str = GRAPH_DIR):
+        arrays = load_arrays(path)
+        self.isbns = arrays["isbns"]
+        self.neighbours = arrays["neighbours"]
+        self.scores = arrays["scores"]
+        self.row = {isbn: row for row, isbn in enumerate(self.isbns.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.isbns)
+
+    def __contains__(self, isbn) -> bool:
+        return int(isbn) in self.row
+
+    def similar(self, isbn, k: int = 16) -> list[tuple]:
+        """(isbn13, cosine score) of the k most similar books; empty for an unknown ISBN."""
+        row = self.row.get(int(isbn))
+        if row is None:
+            return []
+        neighbours = self.isbns[self.neighbours[row, :k]]
+        return list(zip(neighbours.tolist(), self.scores[row, :k].astype(float).tolist()))
+
+
+def build(rebuild: bool = False, n: int = NEIGHBOURS) -> dict:
+    started = time.perf_counter()
+    isbns, hashes, embeddings = read_store()
+    manifest_path = os.path.join(GRAPH_DIR, "manifest.json")
+    existing = None
+    if not rebuild and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            info = json.load(f)
+        if info.get("model") == vector_index.MODEL_NAME:
+            existing = load_arrays(mmap_mode=None)
+        else:
+            print(f"Graph was built for {info.get('model')}; rebuilding")
+    if existing is None:
+        graph, stats = build_graph(isbns, hashes, embeddings, n), {"mode": "rebuild", "books": len(isbns)}
+    else:
+        graph, stats = update_graph(existing, isbns, hashes, embeddings, n)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    save_graph(graph, info={
+        "model": vector_index.MODEL_NAME,
+        "neighbours": int(graph["neighbours"].shape[1]),
+        "books": len(isbns),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "last_build": stats,
+    })
+    print(f"Similar-books graph: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the precomputed similar-books graph")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Build the graph, or update it for added/changed/removed books")
+    build_parser.add_argument("--rebuild", action="store_true")
+    build_parser.add_argument("--neighbours", type=int, default=NEIGHBOURS)
+    show_parser = sub.add_parser("show", help="Print the books most similar to an ISBN-13")
+    show_parser.add_argument("isbn")
+    show_parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.rebuild, args.neighbours)
+    else:
+        for isbn, score in SimilarBooks().similar(args.isbn, args.k):
+            print(f"{isbn}  {score:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from dedup import candidate_pairs, find_editions, minhash_signatures, normalise_author, normalise_title
+
+STORY = ("A young farm boy discovers a hidden map in his grandfather's attic and sets out across the mountains "
+         "with a stubborn mule, a borrowed compass and a letter he is forbidden to open until the last village.")
+BOILERPLATE = ("This is a reproduction of a book published before 1923. This book may have occasional imperfections "
+               "such as missing or blurred pages, poor pictures, errant marks, etc. that were either part of the "
+               "original artifact, or were introduced by the scanning process.")
+
+
+def test_normalise_title_drops_subtitle_article_and_edition_notes():
+    assert normalise_title("The Hobbit: Or There and Back Again (Deluxe Edition)") == "hobbit"
+    assert normalise_title("A Tale of Two Cities [Illustrated]") == "tale of two cities"
+    assert normalise_title(np.nan) == ""
+
+
+def test_normalise_author_uses_first_author_letters_only():
+    assert normalise_author("J.R.R. Tolkien;Christopher Tolkien") == normalise_author("J. R. R. Tolkien")
+    assert normalise_author(None) == ""
+
+
+def test_similar_descriptions_share_an_lsh_band():
+    signatures = minhash_signatures([STORY, STORY + " A classic.", BOILERPLATE])
+    assert (signatures[0] == signatures[1]).mean() > 0.7
+    assert [0, 1] in candidate_pairs(signatures).tolist()
+
+
+def test_find_editions_clusters_editions_and_keeps_boilerplate_apart():
+    books = pd.DataFrame([
+        # Same work by title and author, different descriptions
+        (9780000000001, "The Map: A Novel", "Ann Lee", "First edition text.", 10),
+        (9780000000002, "Map (Anniversary Edition)", "Ann Lee;Tom Ray", "Reissue with a new foreword.", 500),
+        # Same work by description and author, retitled
+        (9780000000003, "The Mule and the Map", "Ann Lee", STORY, 5),
+        (9780000000004, "Mountains", "Ann Lee", STORY + " Now in paperback.", 50),
+        # Shared reprint boilerplate, unrelated books
+        (9780000000005, "Old Sermons", "P. Smith", BOILERPLATE, 1),
+        (9780000000006, "Bee Keeping", "R. Jones", BOILERPLATE, 2),
+    ], columns=["isbn13", "title", "authors", "description", "ratings_count"])
+
+    representatives, stats = find_editions(books)
+
+    assert representatives.tolist() == [
+        9780000000002, 9780000000002, 9780000000004, 9780000000004, 9780000000005, 9780000000006
+    ]
+    assert stats["clusters"] == 4
+    assert stats["duplicates_removed"] == 2
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from numeric_filters import NumericFilters, SortedColumn, bitmap_count, bitmap_positions, contains, to_bitmap
+
+BOOKS = pd.DataFrame({
+    "published_year": [1999, 2005, np.nan, 2010, 1850, 2005, 2021, 1999, 2015, 1980, 2005],
+    "num_pages": [320, 150, 800, np.nan, 412, 96, 288, 1040, 230, 310, 500],
+    "average_rating": [4.1, 3.2, 4.8, 3.9, np.nan, 4.5, 2.9, 4.0, 3.7, 4.2, 4.4],
+})
+
+
+def expected(filters: dict) -> np.ndarray:
+    """Brute-force reference: the positions passing every range, via pandas."""
+    mask = np.ones(len(BOOKS), dtype=bool)
+    for column, (low, high) in filters.items():
+        values = BOOKS[column]
+        if low is not None:
+            mask &= (values >= low).to_numpy()
+        if high is not None:
+            mask &= (values <= high).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def test_bitmap_round_trip():
+    mask = np.random.default_rng(0).random(1001) < 0.3
+    bitmap = to_bitmap(mask)
+    assert bitmap_count(bitmap) == mask.sum()
+    assert np.array_equal(bitmap_positions(bitmap, len(mask)), np.flatnonzero(mask))
+    assert np.array_equal(contains(bitmap, np.arange(len(mask))), mask)
+
+
+def test_sorted_column_skips_missing_values():
+    column = SortedColumn([3.0, np.nan, 1.0, 2.0])
+    assert sorted(column.between().tolist()) == [0, 2, 3]
+    assert sorted(column.between(2, None).tolist()) == [0, 3]
+    assert column.between(1.5, 1.9).tolist() == []
+
+
+@pytest.mark.parametrize("filters", [
+    {"published_year": (2000, 2010)},
+    {"published_year": (2005, 2005)},
+    {"num_pages": (None, 300)},
+    {"average_rating": (4.0, None)},
+    {"published_year": (1990, None), "num_pages": (200, 600), "average_rating": (3.5, 5)},
+    {"published_year": (3000, None)},
+])
+def test_mask_matches_pandas(filters):
+    bitmap = NumericFilters(BOOKS).mask(filters)
+    assert np.array_equal(bitmap_positions(bitmap, len(BOOKS)), expected(filters))
+    assert bitmap_count(bitmap) == len(expected(filters))
+
+
+def test_mask_without_constraints_is_none():
+    filters = NumericFilters(BOOKS)
+    assert filters.mask({}) is None
+    assert filters.mask({"num_pages": (None, None)}) is None
+
+
+def test_cached_bitmaps_are_read_only():
+    filters = NumericFilters(BOOKS)
+    bitmap = filters.bitmap("num_pages", 100, 400)
+    assert filters.bitmap("num_pages", 100, 400) is bitmap
+    with pytest.raises(ValueError):
+        bitmap[0] = 0
+
+
+@pytest.mark.parametrize("bad", [{"isbn13": (1, 2)}, {"num_pages": (500, 100)}])
+def test_invalid_filters_raise(bad):
+    with pytest.raises(ValueError):
+        NumericFilters(BOOKS).mask(bad)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from similar_books import SimilarBooks, build_graph, normalise, save_graph, top_neighbours, update_graph
+
+N = 8
+
+
+def catalog(size: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    isbns = np.arange(size, dtype=np.int64) + 9780000000000
+    hashes = np.array([f"h{i}" for i in range(size)])
+    return isbns, hashes, normalise(rng.standard_normal((size, 32)).astype(np.float32))
+
+
+def brute_force(embeddings: np.ndarray, n: int) -> np.ndarray:
+    similarity = embeddings @ embeddings.T
+    np.fill_diagonal(similarity, -np.inf)
+    return np.argsort(-similarity, axis=1, kind="stable")[:, :n]
+
+
+def test_top_neighbours_matches_brute_force_and_skips_self():
+    _, _, embeddings = catalog(200)
+    positions, scores = top_neighbours(embeddings, embeddings, N, np.arange(len(embeddings)))
+    assert np.array_equal(positions, brute_force(embeddings, N))
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_update_matches_a_full_rebuild():
+    isbns, hashes, embeddings = catalog(400)
+    graph = build_graph(isbns, hashes, embeddings, N)
+
+    rng = np.random.default_rng(1)
+    keep = np.sort(rng.choice(len(isbns), 370, replace=False))
+    isbns, hashes, embeddings = isbns[keep], hashes[keep].copy(), embeddings[keep].copy()
+    # Changed descriptions: new hash and new vector under the same ISBN
+    changed = rng.choice(len(isbns), 10, replace=False)
+    hashes[changed] = [f"changed{i}" for i in changed]
+    embeddings[changed] = catalog(10, seed=2)[2]
+    _, _, added = catalog(30, seed=3)
+    isbns = np.concatenate([isbns, np.arange(30, dtype=np.int64) + 9790000000000])
+    hashes = np.concatenate([hashes, [f"new{i}" for i in range(30)]])
+    embeddings = np.concatenate([embeddings, added])
+
+    updated, stats = update_graph(graph, isbns, hashes, embeddings, N)
+
+    assert stats["mode"] == "update"
+    assert stats["added_or_changed"] == 40
+    assert stats["removed"] == 30
+    assert np.array_equal(updated["isbns"], isbns)
+    assert np.array_equal(updated["neighbours"], brute_force(embeddings, N))
+
+
+def test_large_changes_fall_back_to_a_rebuild():
+    isbns, hashes, embeddings = catalog(100)
+    graph = build_graph(isbns, hashes, embeddings, N)
+    _, stats = update_graph(graph, isbns, np.array([f"x{i}" for i in range(100)]), embeddings, N)
+    assert stats["mode"] == "rebuild"
+
+
+def test_saved_graph_lookups(tmp_path):
+    isbns, hashes, embeddings = catalog(50)
+    save_graph(build_graph(isbns, hashes, embeddings, N), str(tmp_path))
+    similar = SimilarBooks(str(tmp_path))
+
+    assert len(similar) == 50 and isbns[0] in similar
+    results = similar.similar(isbns[0], k=3)
+    assert [isbn for isbn, _ in results] == isbns[brute_force(embeddings, 3)[0]].tolist()
+    assert similar.similar(1, k=3) == []
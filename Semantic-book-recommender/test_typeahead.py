@@ -0,0 +1,78 @@
+import numpy as np
+
+from typeahead import KEY_BYTES, TypeaheadIndex, normalise
+
+BOOKS = [
+    (9780000000001, "The Lord of the Rings", "J. R. R. Tolkien", 5000),
+    (9780000000002, "The Hobbit", "J. R. R. Tolkien", 3000),
+    (9780000000003, "Harry Potter and the Philosopher's Stone", "J. K. Rowling", 9000),
+    (9780000000004, "Harry Potter and the Chamber of Secrets", "J. K. Rowling", 7000),
+    (9780000000005, "Jane Eyre", "Charlotte Brontë", 2000),
+    (9780000000006, "Lord Jim", "Joseph Conrad", 4000),
+    (9780000000007, "Untitled", np.nan, np.nan),
+]
+
+
+def build() -> TypeaheadIndex:
+    return TypeaheadIndex(*zip(*BOOKS))
+
+
+def titles(results: list[dict]) -> list[str]:
+    return [result["title"] for result in results]
+
+
+def test_normalise():
+    assert normalise("Brontë's Jane-Eyre") == "bronte s jane eyre"
+    assert normalise(np.nan) == ""
+
+
+def test_prefix_matches_rank_title_starts_then_popularity():
+    index = build()
+    assert titles(index.search("harry pot")) == [
+        "Harry Potter and the Philosopher's Stone", "Harry Potter and the Chamber of Secrets"
+    ]
+    # "The Lord of the Rings" has more ratings, but only matches from its second word
+    assert titles(index.search("lord"))[0] == "Lord Jim"
+    assert set(titles(index.search("lord"))) == {"Lord Jim", "The Lord of the Rings"}
+
+
+def test_prefix_matches_cover_inner_words_and_authors():
+    index = build()
+    assert titles(index.search("chamber")) == ["Harry Potter and the Chamber of Secrets"]
+    assert set(titles(index.search("tolkien"))) == {"The Lord of the Rings", "The Hobbit"}
+    assert all(result["match"] == "prefix" for result in index.search("rowling"))
+
+
+def test_queries_longer_than_the_keys_are_checked_against_the_full_text():
+    index = build()
+    query = "harry potter and the philosopher"
+    assert len(query) > KEY_BYTES
+    assert titles(index.search(query)) == ["Harry Potter and the Philosopher's Stone"]
+    assert all(result["match"] == "fuzzy" for result in index.search("harry potter and the philosophers"))
+
+
+def test_typos_fall_back_to_fuzzy_matches():
+    results = build().search("tolkein hobit")
+    assert results[0]["title"] == "The Hobbit"
+    assert results[0]["match"] == "fuzzy"
+
+
+def test_short_or_empty_queries():
+    index = build()
+    assert index.search("") == []
+    assert index.search("zq") == []
+
+
+def test_missing_values_serialise_as_empty_strings():
+    result = build().search("untitled")[0]
+    assert result == {"isbn13": 9780000000007, "title": "Untitled", "authors": "", "match": "prefix"}
+
+
+def test_heavy_prefixes_match_a_live_ranking():
+    rng = np.random.default_rng(0)
+    size = 3000
+    popularity = rng.permutation(size)
+    index = TypeaheadIndex(np.arange(size), [f"Common Title {i}" for i in range(size)], ["A. Writer"] * size, popularity)
+    assert b"c" in index.heavy
+    top = [result["isbn13"] for result in index.search("c", 5)]
+    assert top == np.argsort(-popularity, kind="stable")[:5].tolist()
@@ -0,0 +1,223 @@
+"""
+Title/author typeahead over the catalog, without the embedding model.
+
+    python typeahead.py "harry pot"
+    python typeahead.py "tolkein" -k 5
+
+Prefix matches come from one sorted array of keys: every word-suffix of each
+normalised title ("the lord of the rings", "lord of the rings", "rings") and
+of each author's name, truncated to KEY_BYTES. A query is a binary search for
+the range of keys starting with it, and that range is ranked by popularity
+(log ratings, plus a bonus for matching the start of the title). Ranges too
+large to rank per keystroke (one- or two-letter prefixes) have their top
+results precomputed at build time.
+
+When no key starts with the query, a trigram index over "title authors"
+supplies fuzzy matches instead, so typos and reordered words still find the
+book. Only one edition per work (representative_isbn13)
+is indexed.
+"""
+import re
+import math
+import time
+import argparse
+import unicodedata
+import numpy as np
+import pandas as pd
+
+from catalog import load_catalog
+
+KEY_BYTES = 24
+# Word-suffix keys per title/author beyond the first few words only bloat the index
+MAX_WORD_STARTS = 6
+STOPWORDS = {"a", "an", "and", "the", "of", "in", "on", "to", "for", "with", "at", "by"}
+TITLE_START_BONUS = 2.0
+# Key ranges longer than this have their ranking precomputed
+HEAVY_RANGE = 512
+MAX_RESULTS = 20
+# Trigrams found in more than this share of books say little and cost the most to count
+STOP_TRIGRAM_SHARE = 0.1
+MIN_CONTAINMENT = 0.5
+MIN_FUZZY_CHARS = 3
+
+_words = re.compile(r"[a-z0-9]+")
+# Trigram alphabet: space, a-z, 0-9; anything else (the separator between books) is -1
+_alphabet = np.full(256, -1, dtype=np.int64)
+_alphabet[ord(" ")] = 0
+_alphabet[np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8)] = np.arange(1, 37)
+
+
+def normalise(text) -> str:
+    """Lower-case ASCII words separated by single spaces ("Brontë's Jane-Eyre" -> "bronte s jane eyre")."""
+    if pd.isna(text):
+        return ""
+    ascii_text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return " ".join(_words.findall(ascii_text.lower()))
+
+
+def word_suffixes(words: list[str], limit: int = MAX_WORD_STARTS):
+    """(start, key) for the text from each word onwards, skipping starts on stopwords after the first."""
+    for start, word in enumerate(words[:limit]):
+        if start == 0 or word not in STOPWORDS:
+            yield start, " ".join(words[start:])[:KEY_BYTES]
+
+
+def trigram_ids(text: bytes) -> np.ndarray:
+    """Trigram ids (base 37) of every window of `text`; windows containing a non-alphabet byte are -1."""
+    codes = _alphabet[np.frombuffer(text, dtype=np.uint8)]
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.int64)
+    ids = codes[:-2] * 37 * 37 + codes[1:-1] * 37 + codes[2:]
+    return np.where((codes[:-2] < 0) | (codes[1:-1] < 0) | (codes[2:] < 0), -1, ids)
+
+
+class TypeaheadIndex:
+    def __init__(self, isbns, titles, authors, popularity=None):
+        self.isbns = np.asarray(isbns, dtype=np.int64)
+        # Missing values become "" so suggestions serialise cleanly
+        self.titles = pd.Series(titles, dtype=object).fillna("").to_numpy()
+        self.authors = pd.Series(authors, dtype=object).fillna("").to_numpy()
+        popularity = np.zeros(len(self.isbns)) if popularity is None else np.nan_to_num(np.asarray(popularity, dtype=float))
+        self.popularity = np.log1p(np.maximum(popularity, 0)).astype(np.float32)
+        titles = [normalise(title) for title in self.titles]
+        authors = [[normalise(name) for name in str(names).split(";")] if names else [] for names in self.authors]
+        self.text = [" ".join([title, *names]).strip() for title, names in zip(titles, authors)]
+        self._build_prefix_index(titles, authors)
+        self._build_trigram_index()
+
+    @classmethod
+    def from_catalog(cls, **kwargs) -> "TypeaheadIndex":
+        books = load_catalog(["isbn13", "title", "authors", "ratings_count", "representative_isbn13"], **kwargs)
+        books = books[books["isbn13"] == books["representative_isbn13"]]
+        return cls(books["isbn13"], books["title"], books["authors"], books["ratings_count"])
+
+    def __len__(self) -> int:
+        return len(self.isbns)
+
+    def _build_prefix_index(self, titles: list[str], authors: list[list[str]]) -> None:
+        keys, books, weights = [], [], []
+        for book, (title, names) in enumerate(zip(titles, authors)):
+            for start, key in word_suffixes(title.split()):
+                keys.append(key)
+                books.append(book)
+                weights.append(self.popularity[book] + (TITLE_START_BONUS if start == 0 else 0.0))
+            for name in names:
+                for _, key in word_suffixes(name.split()):
+                    keys.append(key)
+                    books.append(book)
+                    weights.append(self.popularity[book])
+        keys = np.array(keys, dtype=f"S{KEY_BYTES}")
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.key_books = np.array(books, dtype=np.int32)[order]
+        self.key_weights = np.array(weights, dtype=np.float32)[order]
+
+        # Precomputed top results for every prefix whose key range is too long to rank per keystroke
+        self.heavy = {}
+        for length in range(1, KEY_BYTES + 1):
+            truncated = self.keys.astype(f"S{length}")
+            starts = np.flatnonzero(np.r_[True, truncated[1:] != truncated[:-1]])
+            stops = np.r_[starts[1:], len(truncated)]
+            long_ranges = np.flatnonzero(stops - starts > HEAVY_RANGE)
+            if not len(long_ranges):
+                break
+            for i in long_ranges:
+                self.heavy[truncated[starts[i]]] = self._rank(starts[i], stops[i], MAX_RESULTS)
+
+    def _build_trigram_index(self) -> None:
+        # All books in one buffer, padded with spaces and separated by newlines, so one pass yields every trigram
+        buffer = "\n".join(f" {text} " for text in self.text).encode("ascii")
+        ids = trigram_ids(buffer)
+        book_of_window = np.cumsum(np.frombuffer(buffer, dtype=np.uint8) == ord("\n"))[:len(ids)]
+        valid = ids >= 0
+        # Sort-based dedupe: np.unique's hash path is far slower on millions of int64 keys
+        pairs = np.sort(ids[valid] * len(self) + book_of_window[valid])
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+        trigrams = pairs // len(self)
+        self.postings = (pairs % len(self)).astype(np.int32)
+        self.trigram_offsets = np.searchsorted(trigrams, np.arange(37 ** 3 + 1))
+
+    def _rank(self, start: int, stop: int, k: int) -> np.ndarray:
+        """Distinct books of keys[start:stop], highest weight first, at most k."""
+        weights = self.key_weights[start:stop]
+        # A book can own several keys in the range (title and author), so look a little past k
+        take = min(len(weights), 4 * k)
+        top = np.argpartition(-weights, take - 1)[:take] if take < len(weights) else np.arange(len(weights))
+        top = top[np.argsort(-weights[top], kind="stable")]
+        books = pd.unique(self.key_books[start:stop][top])
+        return books[:k]
+
+    def prefix_matches(self, query: str, k: int) -> np.ndarray:
+        prefix = query.encode("ascii")[:KEY_BYTES]
+        if prefix in self.heavy:
+            return self.heavy[prefix][:k]
+        start = np.searchsorted(self.keys, prefix, "left")
+        # A full-width prefix + b"\xff" would be truncated back to the prefix by the S dtype
+        stop = np.searchsorted(self.keys, prefix if len(prefix) == KEY_BYTES else prefix + b"\xff",
+                               "right" if len(prefix) == KEY_BYTES else "left")
+        if start == stop:
+            return np.empty(0, dtype=np.int32)
+        if len(query) <= KEY_BYTES:
+            return self._rank(start, stop, k)
+        # Keys are truncated, so longer queries are checked against the full text
+        books = self._rank(start, stop, stop - start)
+        return np.array([book for book in books if query in self.text[book]][:k], dtype=np.int32)
+
+    def posting(self, trigram: int) -> np.ndarray:
+        """Sorted positions of the books containing `trigram`."""
+        return self.postings[self.trigram_offsets[trigram]:self.trigram_offsets[trigram + 1]]
+
+    def fuzzy_matches(self, query: str, k: int) -> np.ndarray:
+        """Books containing the largest share of the query's trigrams, then the most popular."""
+        ids = np.unique(trigram_ids(f" {query} ".encode("ascii")))
+        ids = ids[ids >= 0]
+        sizes = self.trigram_offsets[ids + 1] - self.trigram_offsets[ids]
+        ids, sizes = ids[sizes > 0], sizes[sizes > 0]
+        if not len(ids):
+            return np.empty(0, dtype=np.int32)
+        common = sizes > STOP_TRIGRAM_SHARE * len(self)
+        if common.all():
+            # Every trigram is common: keep the rarest few rather than counting them all
+            ids = ids[np.argsort(sizes)[:3]]
+        elif common.any():
+            ids = ids[~common]
+        shared = np.bincount(np.concatenate([self.posting(trigram) for trigram in ids]), minlength=len(self))
+        candidates = np.flatnonzero(shared >= max(1, math.ceil(MIN_CONTAINMENT * len(ids))))
+        order = np.lexsort((-self.popularity[candidates], -shared[candidates]))
+        return candidates[order[:k]].astype(np.int32)
+
+    def search(self, query: str, k: int = 10) -> list[dict]:
+        """Up to k suggestions: prefix matches, or fuzzy ones when no key starts with the query."""
+        query = normalise(query)
+        if not query:
+            return []
+        k = min(k, MAX_RESULTS)
+        books, match = self.prefix_matches(query, k), "prefix"
+        if not len(books) and len(query) >= MIN_FUZZY_CHARS:
+            books, match = self.fuzzy_matches(query, k), "fuzzy"
+        return [
+            {"isbn13": int(self.isbns[book]), "title": self.titles[book], "authors": self.authors[book], "match": match}
+            for book in books.tolist()
+        ]
+
+    def memory(self) -> int:
+        """Bytes held by the index arrays (not the title/author strings)."""
+        arrays = (self.keys, self.key_books, self.key_weights, self.postings, self.trigram_offsets, self.popularity)
+        return sum(array.nbytes for array in arrays) + sum(array.nbytes for array in self.heavy.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Title/author typeahead over the catalog")
+    parser.add_argument("query")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = TypeaheadIndex.from_catalog()
+    print(f"Indexed {len(index)} works in {time.perf_counter() - started:.2f}s")
+    for suggestion in index.search(args.query, args.k):
+        print(f"{suggestion['isbn13']}  [{suggestion['match']}]  {suggestion['title']} - {suggestion['authors']}")
+
+
+if __name__ == "__main__":
+    main()
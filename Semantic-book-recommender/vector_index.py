@@ -0,0 +1,248 @@
+"""
+Persistent vector index over tagged_description.txt for the dashboard.
+
+Build or update it once, outside the dashboard:
+
+    python vector_index.py build             # embeds only added or changed descriptions
+    python vector_index.py build --rebuild   # start from scratch
+    python vector_index.py status
+
+Each description is stored with its ISBN-13 as document ID and `isbn13`
+metadata, plus a hash of its text, so a rebuild re-embeds only books whose
+description changed and deletes books that were removed. Each document also
+carries its `simple_categories` from the catalog so searches can filter on it;
+a category change is written to the metadata without re-embedding. When the
+catalog has a `representative_isbn13` column (dedup.py), only one edition per
+work is indexed.
+vectorstore/index_manifest.json records the hashes of both input files and the
+model name; when none has changed, build returns without loading the model.
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+
+import chromadb
+import pandas as pd
+from langchain_chroma import Chroma
+from langchain_huggingface import HuggingFaceEmbeddings
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SOURCE_PATH = "tagged_description.txt"
+CATALOG_PATH = "books_with_emotions.csv"
+INDEX_DIR = "vectorstore"
+MANIFEST_PATH = os.path.join(INDEX_DIR, "index_manifest.json")
+COLLECTION_NAME = "books"
+BATCH_SIZE = 256
+# Bumped when document IDs or metadata change shape; older indexes are rebuilt
+INDEX_FORMAT = 2
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def read_descriptions(path: str = SOURCE_PATH) -> dict:
+    """ISBN-13 -> tagged description line ("<isbn13> <description>")."""
+    descriptions = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            text = line.strip()
+            if text:
+                descriptions[text.strip('"').split()[0]] = text
+    return descriptions
+
+
+def read_categories(path: str = CATALOG_PATH) -> dict:
+    """ISBN-13 -> simple category, for the books that have one."""
+    if not os.path.exists(path):
+        print(f"Warning: {path} not found; documents are indexed without categories")
+        return {}
+    catalog = pd.read_csv(path, usecols=["isbn13", "simple_categories"]).dropna()
+    return {str(isbn): category for isbn, category in zip(catalog["isbn13"], catalog["simple_categories"])}
+
+
+def read_duplicate_editions(path: str = CATALOG_PATH) -> set:
+    """ISBN-13s that dedup.py mapped to another edition of the same work."""
+    if not os.path.exists(path) or "representative_isbn13" not in pd.read_csv(path, nrows=0).columns:
+        return set()
+    catalog = pd.read_csv(path, usecols=["isbn13", "representative_isbn13"])
+    return set(catalog.loc[catalog["isbn13"] != catalog["representative_isbn13"], "isbn13"].astype(str))
+
+
+def catalog_sha256() -> str:
+    return file_sha256(CATALOG_PATH) if os.path.exists(CATALOG_PATH) else None
+
+
+def document_metadata(isbn: str, text: str, categories: dict) -> dict:
+    metadata = {"isbn13": int(isbn), "content_hash": content_hash(text)}
+    if isbn in categories:
+        metadata["simple_categories"] = categories[isbn]
+    return metadata
+
+
+def read_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: dict) -> None:
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def open_store(embeddings=None) -> Chroma:
+    return Chroma(
+        collection_name=COLLECTION_NAME,
+        embedding_function=embeddings or HuggingFaceEmbeddings(model_name=MODEL_NAME),
+        persist_directory=INDEX_DIR
+    )
+
+
+def open_collection():
+    """The persisted Chroma collection itself, for reads and metadata updates that need no model."""
+    return chromadb.PersistentClient(path=INDEX_DIR).get_collection(COLLECTION_NAME)
+
+
+def distance_metric() -> str:
+    """HNSW space of the persisted collection: "l2" (Chroma's default), "cosine" or "ip"."""
+    collection = open_collection()
+    hnsw = (collection.configuration or {}).get("hnsw") or {}
+    return hnsw.get("space") or (collection.metadata or {}).get("hnsw:space", "l2")
+
+
+def build_index(rebuild: bool = False) -> dict:
+    """Bring the persisted index in line with SOURCE_PATH, embedding only what changed."""
+    started = time.perf_counter()
+    source_hash = file_sha256(SOURCE_PATH)
+    catalog_hash = catalog_sha256()
+    manifest = read_manifest()
+    if manifest and manifest["model"] != MODEL_NAME:
+        print(f"Model changed ({manifest['model']} -> {MODEL_NAME}); rebuilding")
+        rebuild = True
+    if manifest and manifest.get("format", 1) != INDEX_FORMAT:
+        print(f"Index format changed ({manifest.get('format', 1)} -> {INDEX_FORMAT}); rebuilding")
+        rebuild = True
+    if (not rebuild and manifest and manifest["source_sha256"] == source_hash
+            and manifest.get("catalog_sha256") == catalog_hash):
+        print(f"Index is up to date ({manifest['documents']} documents)")
+        return {"added": 0, "removed": 0, "retagged": 0, "documents": manifest["documents"], "seconds": 0.0}
+
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    db = open_store()
+    if rebuild:
+        db.delete_collection()
+        db = open_store(db.embeddings)
+
+    duplicates = read_duplicate_editions()
+    descriptions = {isbn: text for isbn, text in read_descriptions().items() if isbn not in duplicates}
+    categories = read_categories()
+    if duplicates:
+        print(f"Indexing one edition per work: {len(duplicates)} duplicate editions skipped")
+    stored = db.get(include=["metadatas"])
+    existing = dict(zip(stored["ids"], stored["metadatas"]))
+    to_add = [isbn for isbn, text in descriptions.items() if existing.get(isbn, {}).get("content_hash") != content_hash(text)]
+    to_remove = sorted(existing.keys() - descriptions.keys())
+    to_retag = [
+        isbn for isbn in descriptions.keys() & existing.keys()
+        if isbn not in to_add and existing[isbn].get("simple_categories") != categories.get(isbn)
+    ]
+
+    if to_remove:
+        db.delete(ids=to_remove)
+    for start in range(0, len(to_add), BATCH_SIZE):
+        batch = to_add[start:start + BATCH_SIZE]
+        texts = [descriptions[isbn] for isbn in batch]
+        # add_texts upserts, so a changed description replaces its ISBN's old vector
+        db.add_texts(
+            texts,
+            metadatas=[document_metadata(isbn, text, categories) for isbn, text in zip(batch, texts)],
+            ids=batch
+        )
+        print(f"  embedded {min(start + BATCH_SIZE, len(to_add))}/{len(to_add)}")
+    # Metadata-only updates go straight to the collection, so the stored vectors are reused
+    collection = open_collection() if to_retag else None
+    for start in range(0, len(to_retag), BATCH_SIZE):
+        batch = to_retag[start:start + BATCH_SIZE]
+        collection.update(
+            ids=batch,
+            metadatas=[document_metadata(isbn, descriptions[isbn], categories) for isbn in batch]
+        )
+
+    write_manifest({
+        "format": INDEX_FORMAT,
+        "model": MODEL_NAME,
+        "source": SOURCE_PATH,
+        "source_sha256": source_hash,
+        "catalog_sha256": catalog_hash,
+        "documents": len(descriptions),
+        "built_at": datetime.now(timezone.utc).isoformat()
+    })
+    elapsed = time.perf_counter() - started
+    print(f"Index built: {len(to_add)} added, {len(to_remove)} removed, {len(to_retag)} recategorised, "
+          f"{len(descriptions)} documents in {elapsed:.1f}s")
+    return {
+        "added": len(to_add),
+        "removed": len(to_remove),
+        "retagged": len(to_retag),
+        "documents": len(descriptions),
+        "seconds": elapsed
+    }
+
+
+def load_index() -> Chroma:
+    """Open the persisted index for querying. Fails if it was never built or was built with another model."""
+    manifest = read_manifest()
+    if manifest is None:
+        raise RuntimeError(f"No vector index in {INDEX_DIR}/; run `python vector_index.py build` first")
+    if manifest["model"] != MODEL_NAME or manifest.get("format", 1) != INDEX_FORMAT:
+        raise RuntimeError(
+            f"Index was built with {manifest['model']} (format {manifest.get('format', 1)}), "
+            f"this code needs {MODEL_NAME} (format {INDEX_FORMAT}); run `python vector_index.py build`"
+        )
+    if manifest["source_sha256"] != file_sha256(SOURCE_PATH) or manifest.get("catalog_sha256") != catalog_sha256():
+        print(f"Warning: {SOURCE_PATH} or {CATALOG_PATH} changed since the index was built; "
+              f"run `python vector_index.py build`")
+    return open_store()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dashboard's persistent vector index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Embed added/changed descriptions and drop removed ones")
+    build_parser.add_argument("--rebuild", action="store_true", help="Discard the index and embed everything")
+    sub.add_parser("status", help="Show the manifest and whether the input changed")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(rebuild=args.rebuild)
+    else:
+        manifest = read_manifest()
+        if manifest is None:
+            print("No index built yet")
+            return
+        manifest["up_to_date"] = (
+            manifest["source_sha256"] == file_sha256(SOURCE_PATH)
+            and manifest.get("catalog_sha256") == catalog_sha256()
+            and manifest["model"] == MODEL_NAME
+            and manifest.get("format", 1) == INDEX_FORMAT
+        )
+        print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()